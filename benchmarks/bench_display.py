@@ -0,0 +1,66 @@
+"""Micro-benchmark of the epd7in5_V2.display host-side work: building the inverted old-data plane.
+
+Run from the repository root:  python -m benchmarks.bench_display
+Compares the legacy list loop (``image1[i] = ~image[i]``) with epdbuffer.inverted
+and reports wall time, peak Python allocations and how many lists were created.
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lib.waveshare_epd import epdbuffer
+
+WIDTH, HEIGHT = 800, 480
+
+
+def legacy_inverted_plane(image, width=WIDTH, height=HEIGHT):
+    """The per-refresh loop epd7in5_V2.display used before epdbuffer.inverted."""
+    Width = width // 8
+    image1 = [0xFF] * int(width * height / 8)
+    for j in range(height):
+        for i in range(Width):
+            image1[i + j * Width] = ~image[i + j * Width]
+    return image1
+
+
+def count_lists():
+    return sum(1 for o in gc.get_objects() if type(o) is list)
+
+
+def measure(fn, frame, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(frame)
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    gc.disable()
+    try:
+        lists_before = count_lists()
+        tracemalloc.start()
+        result = fn(frame)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        lists_created = count_lists() - lists_before
+    finally:
+        gc.enable()
+    return best, peak, lists_created, result
+
+
+def main():
+    frame = bytearray(os.urandom(WIDTH * HEIGHT // 8))
+    t_old, peak_old, lists_old, old = measure(legacy_inverted_plane, frame)
+    t_new, peak_new, lists_new, new = measure(epdbuffer.inverted, frame)
+    if bytes(b & 0xFF for b in old) != new:
+        raise SystemExit("inverted plane differs from the legacy loop")
+    print("%-10s %10s %12s %14s" % ("path", "ms", "peak KiB", "lists created"))
+    print("%-10s %10.2f %12.1f %14d" % ("legacy", t_old * 1000, peak_old / 1024, lists_old))
+    print("%-10s %10.3f %12.1f %14d" % ("translate", t_new * 1000, peak_new / 1024, lists_new))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""End-to-end throughput of EPaperDisplay.draw (epaper_service) on the simulated panel.
+
+Run from the repository root:  python -m benchmarks.bench_draw [frames] [time_scale]
+time_scale multiplies the modelled BUSY and delay_ms times (default 0: host
+work only, 1: real panel timing). The last frame is decoded from the
+simulated controller RAM and written to bench_draw.png.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main(frames=20, time_scale=0.0):
+    os.environ["EPD_PLATFORM"] = "simulated"
+    os.environ["EPD_SIM_PANEL"] = "epd7in5_V2"
+    os.environ["EPD_SIM_TIME_SCALE"] = str(time_scale)
+    os.environ["EPAPER_PANEL"] = "7in5_V2"
+    os.environ.pop("EPAPER_PANELS", None)
+    sys.path.insert(0, ROOT)
+    png = os.path.join(os.getcwd(), "bench_draw.png")
+    # epaper_service creates uploaded/epaper and the SQLite file in the working directory
+    os.chdir(tempfile.mkdtemp())
+    import epaper_service
+    from lib.waveshare_epd import epdconfig
+    display = epaper_service.default_display
+
+    rng = np.random.default_rng(0)
+    images = [Image.fromarray(rng.integers(0, 256, (480, 800), dtype=np.uint8), "L").convert("RGB")
+              for _ in range(4)]
+    times = []
+    modes = {}
+    for i in range(frames):
+        start = time.perf_counter()
+        result = display.draw(images[i % len(images)])
+        times.append(time.perf_counter() - start)
+        modes[result["mode"]] = modes.get(result["mode"], 0) + 1
+
+    panel = display.epd.config
+    if panel is epdconfig:
+        # the default panel drives the epdconfig module; its counters live on the backend
+        panel = epdconfig.get_implementation()
+    spi = panel.transport.stats()
+    busy = panel.busy_waiter.stats()
+    print("frames          %d (refreshes seen by the panel: %d)" % (frames, panel.refreshes))
+    print("modes           %s" % ", ".join("%s %d" % item for item in sorted(modes.items())))
+    print("draw ms         min %.1f  median %.1f  max %.1f" % (
+        min(times) * 1000, statistics.median(times) * 1000, max(times) * 1000))
+    print("frames/s        %.2f" % (frames / sum(times)))
+    print("spi             %d bytes, %.1f ms" % (spi["bytes"], spi["seconds"] * 1000))
+    print("busy waits      %d, %.1f ms, %d timeouts" % (busy["waits"], busy["seconds"] * 1000, busy["timeouts"]))
+    print("last frame      %s" % panel.save_png(png))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 0.0)
@@ -0,0 +1,184 @@
+"""Per-frame getbuffer benchmark: legacy per-pixel loops vs lib.waveshare_epd.epdbuffer.
+
+Run from the repository root:  python -m benchmarks.bench_getbuffer
+Every packed buffer is also compared byte-for-byte against the legacy loop.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lib.waveshare_epd import epdbuffer
+
+PANELS = [
+    ("epd1in54", 200, 200),
+    ("epd2in13", 122, 250),
+    ("epd2in9", 128, 296),
+    ("epd2in7", 176, 264),
+    ("epd4in2", 400, 300),
+    ("epd3in7", 280, 480),
+    ("epd5in83_V2", 648, 480),
+    ("epd7in5_V2", 800, 480),
+    ("epd7in5_HD", 880, 528),
+    ("epd13in3k", 960, 680),
+]
+
+PANELS_4GRAY = [
+    ("epd2in9_V2", 128, 296),
+    ("epd2in7", 176, 264),
+    ("epd4in2", 400, 300),
+    ("epd3in7", 280, 480),
+    ("epd5in79", 792, 272),
+    ("epd5in83_V2", 648, 480),
+    ("epd4in26", 800, 480),
+    ("epd7in5_V2", 800, 480),
+    ("epd13in3k", 960, 680),
+]
+
+PANELS_4COLOR = [
+    ("epd2in13g", 122, 250),
+    ("epd1in64g", 168, 168),
+    ("epd2in15g", 160, 296),
+    ("epd2in36g", 168, 296),
+    ("epd2in66g", 184, 360),
+    ("epd3in0g", 168, 400),
+    ("epd4in37g", 512, 368),
+    ("epd5in79g", 792, 272),
+    ("epd7in3g", 800, 480),
+]
+
+PALETTE_4COLOR = ((0, 0, 0), (255, 255, 255), (255, 255, 0), (255, 0, 0))
+
+
+def legacy_getbuffer(image, width, height):
+    """The per-pixel loop the mono drivers used before epdbuffer."""
+    linewidth = (width + 7) // 8
+    buf = [0xFF] * (linewidth * height)
+    image_monocolor = image.convert('1')
+    imwidth, imheight = image_monocolor.size
+    pixels = image_monocolor.load()
+    if imwidth == width and imheight == height:
+        for y in range(imheight):
+            for x in range(imwidth):
+                if pixels[x, y] == 0:
+                    buf[int(x / 8) + y * linewidth] &= ~(0x80 >> (x % 8))
+    elif imwidth == height and imheight == width:
+        for y in range(imheight):
+            for x in range(imwidth):
+                newx = y
+                newy = height - x - 1
+                if pixels[x, y] == 0:
+                    buf[int(newx / 8) + newy * linewidth] &= ~(0x80 >> (y % 8))
+    return buf
+
+
+def legacy_getbuffer_4gray(image, width, height):
+    """The per-pixel 4-gray loop (rotating variant) used before epdbuffer."""
+    buf = [0xFF] * (int(width / 4) * height)
+    image_monocolor = image.convert('L')
+    imwidth, imheight = image_monocolor.size
+    pixels = image_monocolor.load()
+    i = 0
+    if imwidth == width and imheight == height:
+        for y in range(imheight):
+            for x in range(imwidth):
+                if pixels[x, y] == 0xC0:
+                    pixels[x, y] = 0x80
+                elif pixels[x, y] == 0x80:
+                    pixels[x, y] = 0x40
+                i = i + 1
+                if i % 4 == 0:
+                    buf[int((x + (y * width)) / 4)] = ((pixels[x-3, y] & 0xc0) | (pixels[x-2, y] & 0xc0) >> 2 | (pixels[x-1, y] & 0xc0) >> 4 | (pixels[x, y] & 0xc0) >> 6)
+    elif imwidth == height and imheight == width:
+        for x in range(imwidth):
+            for y in range(imheight):
+                newx = y
+                newy = height - x - 1
+                if pixels[x, y] == 0xC0:
+                    pixels[x, y] = 0x80
+                elif pixels[x, y] == 0x80:
+                    pixels[x, y] = 0x40
+                i = i + 1
+                if i % 4 == 0:
+                    buf[int((newx + (newy * width)) / 4)] = ((pixels[x, y-3] & 0xc0) | (pixels[x, y-2] & 0xc0) >> 2 | (pixels[x, y-1] & 0xc0) >> 4 | (pixels[x, y] & 0xc0) >> 6)
+    return buf
+
+
+def legacy_getbuffer_4color(image, width, height):
+    """The "G" series getbuffer: palette quantize, then a per-pixel 2-bit packing loop."""
+    pal_image = Image.new("P", (1, 1))
+    pal_image.putpalette((0, 0, 0, 255, 255, 255, 255, 255, 0, 255, 0, 0) + (0, 0, 0) * 252)
+    imwidth, imheight = image.size
+    if imwidth == width and imheight == height:
+        image_temp = image
+    else:
+        image_temp = image.rotate(90, expand=True)
+    buf_4color = bytearray(image_temp.convert("RGB").quantize(palette=pal_image).tobytes('raw'))
+    Width = (width + 3) // 4
+    buf = [0x00] * (Width * height)
+    idx = 0
+    for j in range(height):
+        for i in range(Width):
+            if i == Width - 1 and width % 4:
+                buf[i + j * Width] = (buf_4color[idx] << 6) + (buf_4color[idx+1] << 4)
+                idx = idx + 2
+            else:
+                buf[i + j * Width] = (buf_4color[idx] << 6) + (buf_4color[idx+1] << 4) + (buf_4color[idx+2] << 2) + buf_4color[idx+3]
+                idx = idx + 4
+    return buf
+
+
+def getbuffer_4color(image, width, height):
+    return epdbuffer.getbuffer_palette(image, width, height, PALETTE_4COLOR, bpp=2)
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def compare(title, panels, legacy, packer, make_image, repeat):
+    print(title)
+    print("%-12s %-9s %-10s %12s %12s %9s" % ("panel", "size", "layout", "legacy ms", "numpy ms", "speedup"))
+    for name, width, height in panels:
+        for layout, (w, h) in (("landscape", (width, height)), ("portrait", (height, width))):
+            image = make_image(w, h)
+            t_old, old = timeit(lambda: legacy(image, width, height), 1)
+            t_new, new = timeit(lambda: packer(image, width, height), repeat)
+            if bytes(old) != bytes(new):
+                raise SystemExit("%s %s: packed buffer differs from the legacy loop" % (name, layout))
+            print("%-12s %-9s %-10s %12.1f %12.2f %8.0fx" % (
+                name, "%dx%d" % (width, height), layout, t_old * 1000, t_new * 1000, t_old / t_new))
+    print()
+
+
+def main(repeat=3):
+    rng = np.random.default_rng(0)
+
+    def noise(w, h):
+        return Image.fromarray(rng.integers(0, 256, (h, w), dtype=np.uint8), 'L')
+
+    def gray_levels(w, h):
+        levels = np.array([0x00, 0x40, 0x80, 0xC0, 0xFF], dtype=np.uint8)
+        return Image.fromarray(rng.choice(levels, (h, w)), 'L')
+
+    compare("getbuffer (1 bpp)", PANELS, legacy_getbuffer, epdbuffer.getbuffer_1bpp, noise, repeat)
+    compare("getbuffer_4Gray (2 bpp)", PANELS_4GRAY, legacy_getbuffer_4gray, epdbuffer.getbuffer_4gray,
+            gray_levels, repeat)
+
+    def rgb_noise(w, h):
+        return Image.fromarray(rng.integers(0, 256, (h, w, 3), dtype=np.uint8), 'RGB')
+
+    compare("getbuffer 4-color G series (2 bpp)", PANELS_4COLOR, legacy_getbuffer_4color, getbuffer_4color,
+            rgb_noise, repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""GPIO dispatch benchmark: digital_write toggles per second for each EPD_GPIO path.
+
+Run from the repository root:  python -m benchmarks.bench_gpio [toggles]
+Every path drives a mock chip, so this measures the Python layers between
+the driver's digital_write and the GPIO library, not the pin itself:
+gpiozero LED objects (MockFactory) behind RaspberryPi's if/elif dispatch,
+and the lgpio / gpiod line handles bound directly as digital_write.
+"""
+import enum
+import os
+import sys
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lib.waveshare_epd import epdconfig  # noqa: E402
+
+PINS = epdconfig.RaspberryPi
+OUTPUTS = (PINS.RST_PIN, PINS.DC_PIN, PINS.PWR_PIN)
+
+
+def mock_lgpio():
+    levels = {}
+
+    def gpio_write(handle, gpio, level):
+        levels[gpio] = level
+        return 0
+
+    return types.SimpleNamespace(
+        BOTH_EDGES=3, RISING_EDGE=1, FALLING_EDGE=2,
+        gpiochip_open=lambda chip: 0,
+        gpio_claim_output=lambda handle, gpio, level=0: 0,
+        gpio_claim_alert=lambda handle, gpio, edge: 0,
+        gpio_write=gpio_write,
+        gpio_read=lambda handle, gpio: levels.get(gpio, 0),
+    )
+
+
+def mock_gpiod():
+    Value = enum.Enum('Value', 'INACTIVE ACTIVE')
+
+    class Request:
+        def __init__(self):
+            self.levels = {}
+
+        def set_value(self, line, value):
+            self.levels[line] = value
+
+        def get_value(self, line):
+            return self.levels.get(line, Value.INACTIVE)
+
+    return types.SimpleNamespace(
+        line=types.SimpleNamespace(Direction=enum.Enum('Direction', 'INPUT OUTPUT'),
+                                   Edge=enum.Enum('Edge', 'NONE BOTH'), Value=Value),
+        LineSettings=lambda **kwargs: kwargs,
+        request_lines=lambda path, consumer, config: Request(),
+    )
+
+
+def gpiozero_write():
+    from gpiozero import Button, Device, LED
+    from gpiozero.pins.mock import MockFactory
+    Device.pin_factory = MockFactory()
+    backend = types.SimpleNamespace(
+        RST_PIN=PINS.RST_PIN, DC_PIN=PINS.DC_PIN, CS_PIN=PINS.CS_PIN, PWR_PIN=PINS.PWR_PIN,
+        GPIO_RST_PIN=LED(PINS.RST_PIN), GPIO_DC_PIN=LED(PINS.DC_PIN), GPIO_PWR_PIN=LED(PINS.PWR_PIN),
+        GPIO_BUSY_PIN=Button(PINS.BUSY_PIN, pull_up=False))
+    return lambda pin, value: PINS.digital_write(backend, pin, value)
+
+
+PATHS = [
+    ("gpiozero", gpiozero_write),
+    ("lgpio", lambda: epdconfig.LgpioLines(OUTPUTS, PINS.BUSY_PIN, chip=0, lgpio=mock_lgpio()).write),
+    ("gpiod", lambda: epdconfig.GpiodLines(OUTPUTS, PINS.BUSY_PIN, chip=0, gpiod=mock_gpiod()).write),
+]
+
+
+def toggles_per_sec(write, toggles):
+    dc = PINS.DC_PIN
+    start = time.perf_counter()
+    for _ in range(toggles // 2):
+        write(dc, 0)
+        write(dc, 1)
+    return toggles / (time.perf_counter() - start)
+
+
+def main(toggles=200000):
+    print("%-10s %15s %12s" % ("path", "toggles/s", "us/toggle"))
+    for name, make in PATHS:
+        try:
+            write = make()
+        except ImportError as e:
+            print("%-10s skipped: %s" % (name, e))
+            continue
+        rate = toggles_per_sec(write, toggles)
+        print("%-10s %15.0f %12.2f" % (name, rate, 1e6 / rate))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
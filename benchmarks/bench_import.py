@@ -0,0 +1,55 @@
+"""Startup benchmark: cold ``import`` time of epaper_service and the e-Paper driver stack.
+
+Run from the repository root:  python -m benchmarks.bench_import [runs]
+Every sample is a fresh interpreter, started in a scratch directory so the
+import side effects (uploaded/epaper, smartframe.db) stay out of the tree.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "lib.waveshare_epd.epdconfig",
+    "lib.waveshare_epd.epd7in5_V2",
+    "epaper_service",
+]
+
+SNIPPET = """
+import time
+start = time.perf_counter()
+import %s
+print(time.perf_counter() - start)
+"""
+
+
+def sample(module, cwd):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proc = subprocess.run([sys.executable, "-c", SNIPPET % module], cwd=cwd, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None, proc.stderr.strip().splitlines()[-1]
+    return float(proc.stdout.strip().splitlines()[-1]), None
+
+
+def main(runs=10):
+    print("%-30s %10s %10s %10s" % ("module", "min ms", "median ms", "max ms"))
+    with tempfile.TemporaryDirectory() as cwd:
+        for module in MODULES:
+            times = []
+            for _ in range(runs):
+                t, error = sample(module, cwd)
+                if error:
+                    break
+                times.append(t * 1000)
+            if not times:
+                print("%-30s skipped: %s" % (module, error))
+                continue
+            print("%-30s %10.1f %10.1f %10.1f" % (module, min(times), statistics.median(times), max(times)))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,151 @@
+import itertools, threading, time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+# Ile zakończonych zadań trzymamy do odpytywania po id
+JOB_HISTORY = 100
+
+
+class QueueFull(RuntimeError):
+    """Kolejka poleceń matrycy jest pełna."""
+
+
+class DisplayJob:
+    """Uchwyt do jednego polecenia dla matrycy: można na nie czekać albo je odpytywać.
+
+    Stany: queued -> running -> done/failed, albo superseded (zastąpione
+    nowszą klatką, zanim doszło do matrycy). Zadania z `progress` zamiast
+    "running" raportują fazy (preparing, transferring, refreshing);
+    `timings` sumuje czas spędzony w każdym stanie.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, fn, args, kwargs, coalesce, label=None):
+        self.id = next(self._ids)
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.coalesce = coalesce
+        self.label = label
+        self.progress = False
+        self.state = "queued"
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.error = None
+        self.timings = {}
+        self.state_since = self.created
+        self.future = Future()
+
+    def set_state(self, state):
+        now = time.time()
+        self.timings[self.state] = self.timings.get(self.state, 0) + now - self.state_since
+        self.state = state
+        self.state_since = now
+
+    def wait(self, timeout=None):
+        """Blokuje do zakończenia; zwraca wynik (dla superseded: opis zastąpienia)."""
+        return self.future.result(timeout)
+
+    def _finish(self, state, result=None, error=None):
+        self.set_state(state)
+        self.finished = self.state_since
+        if error is not None:
+            self.error = str(error)
+            self.future.set_exception(error)
+        else:
+            self.future.set_result(result)
+
+    def status(self):
+        return {
+            "id": self.id,
+            "label": self.label,
+            "state": self.state,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "timings": {k: round(v, 3) for k, v in self.timings.items()},
+            "error": self.error,
+            "result": self.future.result() if self.state in ("done", "superseded") else None,
+        }
+
+
+class DisplayQueue:
+    """Jedyny właściciel matrycy: wątek, który wykonuje polecenia po kolei.
+
+    Klatki (`coalesce=True`) działają na zasadzie latest-wins - nowa klatka
+    zastępuje wszystkie czekające, więc seria /show kończy się jednym
+    odświeżeniem. Pozostałe polecenia czekają w kolejce ograniczonej do
+    `maxsize`. Każda matryca ma własną kolejkę (`name` w nazwie wątku),
+    więc jedna odświeża, gdy druga trzyma BUSY.
+    """
+
+    def __init__(self, maxsize=8, name=None):
+        self.maxsize = maxsize
+        self.name = name
+        self.pending = deque()
+        self.jobs = OrderedDict()
+        self.cond = threading.Condition()
+        self.thread = None
+        self.current = None
+        self.superseded = 0
+
+    def submit(self, fn, *args, coalesce=True, label=None, progress=False, **kwargs):
+        """Dodaje polecenie `fn(*args, **kwargs)`; z `progress` fn dostaje też progress=job.set_state."""
+        job = DisplayJob(fn, args, kwargs, coalesce, label)
+        if progress:
+            job.kwargs = dict(kwargs, progress=job.set_state)
+            job.progress = True
+        with self.cond:
+            stale = [j for j in self.pending if j.coalesce] if coalesce else []
+            # miejsce liczymy po usunięciu zastępowanych klatek, ale usuwamy je
+            # dopiero, gdy nowe zadanie na pewno wejdzie do kolejki
+            if len(self.pending) - len(stale) >= self.maxsize:
+                raise QueueFull("e-Paper command queue is full")
+            for old in stale:
+                self.pending.remove(old)
+                self.superseded += 1
+                old._finish("superseded", {"mode": "superseded", "by": job.id})
+            self.pending.append(job)
+            self.jobs[job.id] = job
+            while len(self.jobs) > JOB_HISTORY:
+                self.jobs.popitem(last=False)
+            if self.thread is None:
+                thread_name = f"epaper-owner-{self.name}" if self.name else "epaper-owner"
+                self.thread = threading.Thread(target=self._run, name=thread_name, daemon=True)
+                self.thread.start()
+            self.cond.notify()
+        return job
+
+    def get(self, job_id):
+        with self.cond:
+            return self.jobs.get(job_id)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                job = self.current = self.pending.popleft()
+                job.started = time.time()
+                # zadania z fazami przechodzą z "queued" prosto do pierwszej fazy
+                if not job.progress:
+                    job.set_state("running")
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+            except Exception as e:
+                job._finish("failed", error=e)
+            else:
+                job._finish("done", result)
+            finally:
+                with self.cond:
+                    self.current = None
+
+    def status(self):
+        with self.cond:
+            return {
+                "pending": len(self.pending),
+                "running": self.current.id if self.current else None,
+                "superseded": self.superseded,
+            }
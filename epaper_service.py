@@ -1,20 +1,36 @@
-import os, io, random, threading, time
+import os, io, json, math, random, threading, time, asyncio
 from datetime import datetime
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from typing import List
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Body
 from PIL import Image, ImageDraw, ImageFont
 from sqlalchemy.orm import Session
 
 # Importujemy SessionLocal oraz model EPaperImageModel z centralnej bazy danych
 from database import SessionLocal, EPaperImageModel
+from epaper_queue import DisplayQueue, QueueFull
+from lib.waveshare_epd import epdregistry
 
 # --- HARDWARE ---
 try:
-    from lib.waveshare_epd import epd7in5_V2
-    epd = epd7in5_V2.EPD()
+    from lib.waveshare_epd import epdbuffer, epdconfig
+    from epaper_session import FramePipeline, PanelSession
     EPAPER_AVAILABLE = True
 except:
     EPAPER_AVAILABLE = False
-    epd = None
+    epdconfig = None
+
+# Matryce w ramce: lista JSON, np.
+# [{"name": "main", "panel": "7in5_V2"},
+#  {"name": "side", "panel": "2in13_V4", "spi_device": 1,
+#   "pins": {"RST_PIN": 5, "DC_PIN": 6, "BUSY_PIN": 13, "PWR_PIN": 19}}]
+# Każda kolejna matryca potrzebuje własnego CS (spi_device) i pinów; pierwsza
+# bez "pins"/"spi_device" używa domyślnego backendu epdconfig.
+# Bez EPAPER_PANELS - jedna matryca EPAPER_PANEL (domyślnie 7in5_V2).
+DEFAULT_PANELS = [{"name": "main", "panel": os.environ.get("EPAPER_PANEL", "7in5_V2")}]
+PANELS_CONFIG = json.loads(os.environ.get("EPAPER_PANELS") or "null") or DEFAULT_PANELS
+
+# Ile sekund czekamy przy zamykaniu, aż matryce dokończą odświeżenie i zasną
+SHUTDOWN_TIMEOUT = 60
 
 epaper_router = APIRouter(tags=["E-Paper Control"])
 UPLOAD_EPAPER_DIR = os.path.join("uploaded", "epaper")
@@ -29,14 +45,6 @@ def get_db():
     finally:
         db.close()
 
-# --- STAN GLOBALNY ---
-epaper_interval = 120
-slideshow_active = False
-slideshow_thread = None
-current_image_info = None
-next_image_info = None
-last_refresh_time = 0
-
 def image_to_dict(img_model):
     """Pomocnicza funkcja do zamiany modelu SQLAlchemy na słownik"""
     if not img_model: return None
@@ -48,46 +56,222 @@ def image_to_dict(img_model):
         "added_at": img_model.added_at.isoformat() if img_model.added_at else None
     }
 
-def draw_on_hardware(img_source):
-    if not EPAPER_AVAILABLE:
-        print("Hardware E-Ink niedostępny.")
-        return
-    try:
-        epd.init()
+def job_to_dict(job):
+    """Zasób zadania zwracany przez API"""
+    return dict(job.status(), url=f"/epaper/jobs/{job.id}")
+
+
+class EPaperDisplay:
+    """Jedna matryca ramki: sterownik, sesja, potok klatek, własny wątek-właściciel
+    (DisplayQueue) i własny pokaz slajdów z playlistą.
+
+    Każda matryca ma osobny backend SPI/GPIO, więc odświeżenia różnych
+    matryc idą równolegle - BUSY jednej nie blokuje drugiej.
+    """
+
+    def __init__(self, name, panel, pins=None, spi_device=None, options=None):
+        self.name = name
+        self.info = epdregistry.get(panel)
+        self.epd = None
+        self.session = None
+        self.pipeline = None
+        self.available = False
+        # Jedyny wątek, który dotyka tej matrycy - rysowania i uśpienie idą przez kolejkę
+        self.queue = DisplayQueue(name=name)
+        if EPAPER_AVAILABLE:
+            try:
+                config = None
+                if pins is not None or spi_device is not None:
+                    config = epdconfig.create_implementation(pins, spi_device or 0, **(options or {}))
+                self.epd = self.info.create(config)
+                self.session = PanelSession(self.epd, panel=self.info, dispatch=self.queue_sleep)
+                self.pipeline = FramePipeline(self.prepare_frame)
+                self.available = True
+            except Exception as e:
+                print(f"E-Ink '{name}' niedostępny: {e}")
+        # Slajd nie może zmieniać się częściej niż co dwa typowe pełne odświeżenia matrycy
+        self.min_interval = max(10, 2 * math.ceil(self.info.refresh_ms / 1000))
+        self.interval = max(120, self.min_interval)
+        # Id zdjęć pokazywanych na tej matrycy; pusta - wszystkie aktywne
+        self.playlist = []
+        self.slideshow_active = False
+        self.slideshow_thread = None
+        self.current_image_info = None
+        self.next_image_info = None
+        self.last_refresh_time = 0
+
+    def prepare_frame(self, img_source):
+        """Dekodowanie, dithering i pakowanie obrazu do bufora tej matrycy"""
+        info = self.info
         image = Image.open(img_source) if isinstance(img_source, str) else img_source
+        size = fit_size(image, info)
+        if image.size != size:
+            # zdjęcia zapisujemy w rozdzielczości największej matrycy
+            image = image.resize(size)
+        if info.planes == 2:
+            # matryce b/c: osobna płaszczyzna czerni i koloru, sklejone w jeden bufor
+            black, color = epdbuffer.split_planes(image, info.palette)
+            return bytes(self.epd.getbuffer(black)) + bytes(self.epd.getbuffer(color))
+        if info.colors != epdregistry.BW:
+            # matryce z paletą - sterownik sam kwantyzuje do swoich kolorów
+            return bytes(self.epd.getbuffer(image.convert('RGB')))
         if image.mode != '1':
             image = image.convert('L').convert('1', dither=Image.FLOYDSTEINBERG)
-        epd.display(epd.getbuffer(image))
-        epd.sleep()
-    except Exception as e:
-        print(f"🔥 Błąd matrycy: {e}")
-
-def slideshow_worker():
-    global slideshow_active, current_image_info, next_image_info, last_refresh_time
-    while slideshow_active:
-        worker_db = SessionLocal()
+        return self.epd.getbuffer(image)
+
+    def draw(self, img_source, force=False, prefetch=None, progress=None):
+        """Rysuje obraz na matrycy; zwraca opis odświeżenia (tryb "skipped" gdy obraz już jest na ekranie).
+
+        `prefetch` - ścieżka następnej klatki, przygotowywanej w tle podczas odświeżania tej.
+        `progress(faza)` - raportowanie faz: preparing, transferring, refreshing.
+        """
+        if not self.available:
+            print(f"Hardware E-Ink '{self.name}' niedostępny.")
+            return None
         try:
-            imgs = worker_db.query(EPaperImageModel).filter(EPaperImageModel.is_active == True).all()
-            if imgs:
-                if len(imgs) > 1:
-                    pool = [img for img in imgs if current_image_info and img.id != current_image_info.get('id')]
-                    selected = random.choice(pool if pool else imgs)
-                else:
-                    selected = imgs[0]
+            if progress:
+                progress("preparing")
+            buffer = self.pipeline.get(img_source)
+            if prefetch:
+                self.pipeline.prefetch(prefetch)
+            # Matryca zostaje wybudzona - deep sleep zrobi timer bezczynności sesji;
+            # sesja sama wybiera częściowe odświeżenie dla małych zmian,
+            # a klatkę identyczną z wyświetlaną pomija (chyba że force)
+            return self.session.refresh(buffer, force=force, progress=progress)
+        except epdconfig.BusyTimeout as e:
+            # Matryca nie zwolniła BUSY - odcinamy zasilanie, kolejne init() zrobi pełny reset
+            print(f"🔥 Timeout BUSY ({self.name}): {e}")
+            self.session.power_off()
+            raise
+        except Exception as e:
+            print(f"🔥 Błąd matrycy {self.name}: {e}")
+            raise
+
+    def queue_draw(self, img_source, force=False, prefetch=None, label=None):
+        """Zleca rysowanie wątkowi matrycy; zwraca uchwyt zadania (latest-wins)"""
+        try:
+            return self.queue.submit(self.draw, img_source, force=force, prefetch=prefetch,
+                                     label=label, progress=True)
+        except QueueFull:
+            raise HTTPException(status_code=503, detail=f"E-Paper queue '{self.name}' is full")
+
+    def queue_sleep(self, sleep):
+        """Uśpienie z timera bezczynności też wykonuje wątek-właściciel matrycy"""
+        try:
+            return self.queue.submit(sleep, coalesce=False, label="idle-sleep")
+        except QueueFull:
+            pass  # matryca ma pracę - timer ustawi się na nowo po odświeżeniu
+
+    def slideshow_images(self, db):
+        query = db.query(EPaperImageModel).filter(EPaperImageModel.is_active == True)
+        if self.playlist:
+            query = query.filter(EPaperImageModel.id.in_(self.playlist))
+        return query.all()
+
+    def slideshow_worker(self):
+        while self.slideshow_active:
+            worker_db = SessionLocal()
+            try:
+                imgs = self.slideshow_images(worker_db)
+                if imgs:
+                    # Zapowiedziany "next" jest już przygotowany w tle - pokazujemy właśnie jego
+                    planned = [img for img in imgs if self.next_image_info and img.id == self.next_image_info.get('id')]
+                    if planned:
+                        selected = planned[0]
+                    elif len(imgs) > 1:
+                        pool = [img for img in imgs if self.current_image_info and img.id != self.current_image_info.get('id')]
+                        selected = random.choice(pool if pool else imgs)
+                    else:
+                        selected = imgs[0]
+
+                    others = [img for img in imgs if img.id != selected.id]
+                    next_selected = random.choice(others if others else imgs)
+
+                    self.current_image_info = image_to_dict(selected)
+                    self.next_image_info = image_to_dict(next_selected)
+                    self.last_refresh_time = time.time()
+
+                    job = self.queue_draw(os.path.join(UPLOAD_EPAPER_DIR, selected.filename),
+                                          prefetch=os.path.join(UPLOAD_EPAPER_DIR, next_selected.filename),
+                                          label=f"slideshow:{selected.id}")
+                    try:
+                        job.wait()
+                    except Exception:
+                        pass  # błąd już zalogowany w draw, próbujemy przy następnym ticku
+            finally:
+                worker_db.close()
+
+            for _ in range(int(self.interval)):
+                if not self.slideshow_active: break
+                time.sleep(1)
+
+    def start(self):
+        if not self.slideshow_active:
+            self.slideshow_active = True
+            self.slideshow_thread = threading.Thread(target=self.slideshow_worker,
+                                                     name=f"epaper-slideshow-{self.name}", daemon=True)
+            self.slideshow_thread.start()
 
-                next_selected = random.choice(imgs)
+    def stop(self):
+        self.slideshow_active = False
 
-                current_image_info = image_to_dict(selected)
-                next_image_info = image_to_dict(next_selected)
-                last_refresh_time = time.time()
+    def status(self):
+        remaining = 0
+        if self.slideshow_active and self.last_refresh_time > 0:
+            elapsed = time.time() - self.last_refresh_time
+            remaining = max(0, int(self.interval - elapsed))
 
-                draw_on_hardware(os.path.join(UPLOAD_EPAPER_DIR, selected.filename))
-        finally:
-            worker_db.close()
+        last_refresh_iso = None
+        if self.last_refresh_time > 0:
+            last_refresh_iso = datetime.fromtimestamp(self.last_refresh_time).isoformat()
 
-        for _ in range(int(epaper_interval)):
-            if not slideshow_active: break
-            time.sleep(1)
+        busy_wait = None
+        if self.available:
+            config = self.epd.config
+            # domyślnego backendu nie tworzymy tylko po to, żeby pokazać status
+            if config is not epdconfig or epdconfig.implementation:
+                busy_wait = config.busy_waiter.stats()
+
+        return {
+            "display": self.name,
+            "slideshow_running": self.slideshow_active,
+            "remaining_seconds": remaining,
+            "interval": self.interval,
+            "playlist": self.playlist,
+            "current_image": self.current_image_info,
+            "next_image": self.next_image_info,
+            "last_refresh": last_refresh_iso,
+            "busy_wait": busy_wait,
+            "skipped_refreshes": self.session.skipped if self.available else 0,
+            "panel": self.session.status() if self.available else None,
+            "pipeline": self.pipeline.status() if self.available else None,
+            "queue": self.queue.status(),
+            "panel_info": self.info.as_dict()
+        }
+
+
+def fit_size(image, info):
+    """Rozdzielczość matrycy obrócona tak jak obraz (pion/poziom)"""
+    size = (info.width, info.height)
+    if (image.width > image.height) != (size[0] > size[1]):
+        size = size[::-1]
+    return size
+
+displays = {}
+for entry in PANELS_CONFIG:
+    entry = dict(entry)
+    name = entry.pop("name")
+    displays[name] = EPaperDisplay(name, **entry)
+# Pierwsza matryca obsługuje zapytania bez parametru `display`
+default_display = next(iter(displays.values()))
+
+def get_display(display=None):
+    """Matryca po nazwie (None - domyślna); 404 dla nieznanej"""
+    if display is None:
+        return default_display
+    if display not in displays:
+        raise HTTPException(status_code=404, detail=f"Unknown display '{display}', expected one of: {', '.join(displays)}")
+    return displays[display]
 
 # --- ENDPOINTY ZARZĄDZANIA ---
 
@@ -95,21 +279,36 @@ def slideshow_worker():
 def get_epaper_images(db: Session = Depends(get_db)):
     return db.query(EPaperImageModel).all()
 
-@epaper_router.post("/epaper/upload")
-async def epaper_upload(file: UploadFile = File(...), db: Session = Depends(get_db)):
+def save_epaper_image(content, fpath):
+    """Skaluje upload do rozdzielczości największej matrycy; kolor, gdy którakolwiek jest kolorowa.
+
+    Przy jednej matrycy zawsze do jej natywnej orientacji (jak dotąd 800x480),
+    przy kilku orientacja idzie za zdjęciem - matryce mogą wisieć różnie.
+    """
+    infos = [d.info for d in displays.values()]
+    largest = max(infos, key=lambda info: info.width * info.height)
+    color = any(info.colors != epdregistry.BW for info in infos)
+    img = Image.open(io.BytesIO(content)).convert('RGB' if color else 'L')
+    size = (largest.width, largest.height) if len(infos) == 1 else fit_size(img, largest)
+    img.resize(size).save(fpath)
+
+@epaper_router.post("/epaper/upload", status_code=202)
+async def epaper_upload(file: UploadFile = File(...), display: str = None, db: Session = Depends(get_db)):
+    target = get_display(display)
     content = await file.read()
     new_img = EPaperImageModel(filename="temp", url="temp", is_active=True)
     db.add(new_img); db.commit(); db.refresh(new_img)
 
-    img = Image.open(io.BytesIO(content)).convert('L').resize((800, 480))
     fname = f"epd_{new_img.id}.png"
     fpath = os.path.join(UPLOAD_EPAPER_DIR, fname)
-    img.save(fpath)
+    # Dekodowanie i skalowanie PIL poza pętlą zdarzeń
+    await asyncio.to_thread(save_epaper_image, content, fpath)
 
     new_img.filename, new_img.url = fname, f"{BASE_URL}{fname}"
     db.commit()
-    draw_on_hardware(fpath)
-    return new_img
+    # Nie czekamy na matrycę - postęp pod /epaper/jobs/{id}
+    job = target.queue_draw(fpath, label=f"upload:{new_img.id}")
+    return {"image": image_to_dict(new_img), "job": job_to_dict(job)}
 
 @epaper_router.patch("/epaper/images/{image_id}")
 def set_image_active(image_id: int, is_active: bool, db: Session = Depends(get_db)):
@@ -123,55 +322,106 @@ def set_image_active(image_id: int, is_active: bool, db: Session = Depends(get_d
     db.refresh(img)
     return image_to_dict(img)
 
-@epaper_router.post("/epaper/show/{image_id}")
-def show_specific_image(image_id: int, db: Session = Depends(get_db)):
+@epaper_router.post("/epaper/show/{image_id}", status_code=202)
+def show_specific_image(image_id: int, force: bool = False, display: str = None, db: Session = Depends(get_db)):
+    target = get_display(display)
     img = db.query(EPaperImageModel).filter(EPaperImageModel.id == image_id).first()
     if not img: raise HTTPException(status_code=404)
-    draw_on_hardware(os.path.join(UPLOAD_EPAPER_DIR, img.filename))
-    return {"status": "displayed", "id": image_id}
+    job = target.queue_draw(os.path.join(UPLOAD_EPAPER_DIR, img.filename), force=force, label=f"show:{image_id}")
+    return {"status": "queued", "id": image_id, "display": target.name, "job": job_to_dict(job)}
+
+@epaper_router.get("/epaper/jobs/{job_id}")
+def get_epaper_job(job_id: int):
+    """Stan zadania: queued/preparing/transferring/refreshing/done (+ failed/superseded) i czasy faz.
+
+    Rysowania raportują fazy; zadania bez faz (idle-sleep, shutdown) są w tym czasie "running".
+    """
+    # id zadań są wspólne dla wszystkich kolejek
+    for d in displays.values():
+        job = d.queue.get(job_id)
+        if job:
+            return dict(job_to_dict(job), display=d.name)
+    raise HTTPException(status_code=404, detail="Job not found")
+
+# --- MATRYCE ---
+
+@epaper_router.get("/epaper/panels")
+def get_epaper_panels():
+    """Obsługiwane matryce (model w EPAPER_PANELS) z ich możliwościami"""
+    return {"active": {d.name: d.info.id for d in displays.values()},
+            "panels": [p.as_dict() for p in epdregistry.PANELS.values()]}
+
+@epaper_router.get("/epaper/displays")
+def get_epaper_displays():
+    """Stan wszystkich matryc ramki"""
+    return [d.status() for d in displays.values()]
+
+@epaper_router.get("/epaper/displays/{display}/playlist")
+def get_display_playlist(display: str):
+    return {"display": display, "playlist": get_display(display).playlist}
+
+@epaper_router.put("/epaper/displays/{display}/playlist")
+def set_display_playlist(display: str, image_ids: List[int] = Body(...), db: Session = Depends(get_db)):
+    """Zdjęcia pokazywane na tej matrycy (kolejność bez znaczenia); pusta lista - wszystkie aktywne"""
+    target = get_display(display)
+    known = {img.id for img in db.query(EPaperImageModel).filter(EPaperImageModel.id.in_(image_ids)).all()}
+    missing = [i for i in image_ids if i not in known]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Images not found: {missing}")
+    target.playlist = list(dict.fromkeys(image_ids))
+    return {"display": target.name, "playlist": target.playlist}
 
 # --- ENDPOINTY KONTROLNE ---
 
 @epaper_router.get("/epaper/settings/status")
-def get_epaper_status():
-    remaining = 0
-    if slideshow_active and last_refresh_time > 0:
-        elapsed = time.time() - last_refresh_time
-        remaining = max(0, int(epaper_interval - elapsed))
+def get_epaper_status(display: str = None):
+    return get_display(display).status()
 
-    last_refresh_iso = None
-    if last_refresh_time > 0:
-        last_refresh_iso = datetime.fromtimestamp(last_refresh_time).isoformat()
+@epaper_router.post("/epaper/settings/interval")
+def set_epaper_interval(seconds: int, display: str = None):
+    target = get_display(display)
+    target.interval = max(target.min_interval, seconds)
+    return {"display": target.name, "interval": target.interval}
 
-    return {
-        "slideshow_running": slideshow_active,
-        "remaining_seconds": remaining,
-        "interval": epaper_interval,
-        "current_image": current_image_info,
-        "next_image": next_image_info,
-        "last_refresh": last_refresh_iso
-    }
+@epaper_router.post("/epaper/settings/idle-timeout")
+def set_epaper_idle_timeout(seconds: int, display: str = None):
+    """Po ilu sekundach bez odświeżenia matryca idzie w deep sleep"""
+    target = get_display(display)
+    if not target.available:
+        raise HTTPException(status_code=503, detail="E-Paper hardware not available")
+    target.session.set_idle_timeout(max(5, seconds))
+    return {"display": target.name, "idle_timeout": target.session.idle_timeout}
 
-@epaper_router.post("/epaper/settings/interval")
-def set_epaper_interval(seconds: int):
-    global epaper_interval
-    epaper_interval = max(10, seconds)
-    return {"interval": epaper_interval}
+def epaper_shutdown():
+    """Usypia wszystkie matryce przy zamykaniu serwisu - wołane z lifespan aplikacji (main.py).
+
+    Nie zostawiamy żadnej matrycy pod napięciem; usypia wątek-właściciel,
+    po dokończeniu bieżącego odświeżenia.
+    """
+    jobs = {}
+    for d in displays.values():
+        if d.available:
+            try:
+                jobs[d.name] = d.queue.submit(d.session.sleep_now, coalesce=False, label="shutdown")
+            except QueueFull as e:
+                print(f"🔥 Nie uśpiono matrycy {d.name}: {e}")
+    for name, job in jobs.items():
+        try:
+            job.wait(SHUTDOWN_TIMEOUT)
+        except Exception as e:
+            print(f"🔥 Nie uśpiono matrycy {name}: {e}")
 
 @epaper_router.post("/epaper/control/start")
-def start_epaper_slideshow():
-    global slideshow_active, slideshow_thread
-    if not slideshow_active:
-        slideshow_active = True
-        slideshow_thread = threading.Thread(target=slideshow_worker, daemon=True)
-        slideshow_thread.start()
-    return {"status": "started"}
+def start_epaper_slideshow(display: str = None):
+    target = get_display(display)
+    target.start()
+    return {"status": "started", "display": target.name}
 
 @epaper_router.post("/epaper/control/stop")
-def stop_epaper_slideshow():
-    global slideshow_active
-    slideshow_active = False
-    return {"status": "stopped"}
+def stop_epaper_slideshow(display: str = None):
+    target = get_display(display)
+    target.stop()
+    return {"status": "stopped", "display": target.name}
 
 @epaper_router.delete("/epaper/images/{image_id}")
 def delete_epaper_image(image_id: int, db: Session = Depends(get_db)):
@@ -180,6 +430,9 @@ def delete_epaper_image(image_id: int, db: Session = Depends(get_db)):
         p = os.path.join(UPLOAD_EPAPER_DIR, img.filename)
         if os.path.exists(p): os.remove(p)
         db.delete(img); db.commit()
+        for d in displays.values():
+            if image_id in d.playlist:
+                d.playlist.remove(image_id)
     return {"status": "deleted"}
 
 @epaper_router.get("/epaper/test-performance")
@@ -188,4 +441,4 @@ async def test_performance():
         "status": "ok",
         "timestamp": time.time(),
         "message": "FastAPI is alive!"
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,345 @@
+import hashlib, os, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from lib.waveshare_epd import epdbuffer, epdregistry
+
+# Domyślny czas bezczynności (s), po którym matryca idzie w deep sleep
+IDLE_TIMEOUT = int(os.environ.get("EPAPER_IDLE_TIMEOUT", 60))
+# Powyżej tego ułamka zmienionej powierzchni robimy pełne odświeżenie
+PARTIAL_MAX_AREA = float(os.environ.get("EPAPER_PARTIAL_MAX_AREA", 0.25))
+# Ile częściowych odświeżeń z rzędu, zanim ghosting wymusi pełne
+GHOSTING_BUDGET = int(os.environ.get("EPAPER_GHOSTING_BUDGET", 8))
+# Co ile szybkich odświeżeń / minut robimy pełne, czyszczące odświeżenie
+FAST_BUDGET = int(os.environ.get("EPAPER_FAST_BUDGET", 10))
+CLEAN_INTERVAL_MIN = float(os.environ.get("EPAPER_CLEAN_INTERVAL_MIN", 60))
+# Więcej okien niż tyle scalamy w jeden prostokąt (każde okno to osobne 0x12)
+MAX_PARTIAL_WINDOWS = 2
+
+MODES = ("full", "fast", "partial")
+
+
+class RefreshPolicy:
+    """Wybiera przebieg odświeżenia: partial, fast albo full (czyszczący).
+
+    Małe zmiany idą jako partial, rutynowe zmiany slajdów szybkim przebiegiem
+    (init_fast), a co `fast_budget` szybkich odświeżeń lub co
+    `clean_interval_min` minut - pełnym, który zbiera ghosting.
+    Zbiera też czasy odświeżeń osobno dla każdego trybu.
+    """
+
+    def __init__(self, fast_budget=FAST_BUDGET, clean_interval_min=CLEAN_INTERVAL_MIN,
+                 ghosting_budget=GHOSTING_BUDGET, partial_max_area=PARTIAL_MAX_AREA):
+        self.fast_budget = fast_budget
+        self.clean_interval_min = clean_interval_min
+        self.ghosting_budget = ghosting_budget
+        self.partial_max_area = partial_max_area
+        self.fast_since_full = 0
+        self.partials_since_full = 0
+        self.last_full = 0
+        self.stats = {mode: {"count": 0, "seconds": 0.0, "min": None, "max": None, "last": None} for mode in MODES}
+
+    def choose(self, panel, rects, frame_size):
+        """Zwraca tryb dla klatki; `rects` to brudne okna względem poprzedniej klatki (None - brak).
+
+        Partial i fast wybieramy tylko, gdy deskryptor matrycy (epdregistry.Panel)
+        je deklaruje - partial to okienkowe display_Partial(okno, x0, y0, x1, y1).
+        """
+        if rects is None or time.time() - self.last_full > self.clean_interval_min * 60:
+            return "full"
+        if rects and self.partials_since_full < self.ghosting_budget and panel.partial:
+            area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in rects)
+            if area <= self.partial_max_area * frame_size:
+                return "partial"
+        if self.fast_since_full < self.fast_budget and panel.fast:
+            return "fast"
+        return "full"
+
+    def record(self, mode, seconds):
+        if mode == "full":
+            self.fast_since_full = 0
+            self.partials_since_full = 0
+            self.last_full = time.time()
+        elif mode == "fast":
+            self.fast_since_full += 1
+            # szybki przebieg odświeża cały ekran, więc zbiera ghosting po partialach
+            self.partials_since_full = 0
+        else:
+            self.partials_since_full += 1
+        st = self.stats[mode]
+        st["count"] += 1
+        st["seconds"] += seconds
+        st["last"] = seconds
+        st["min"] = seconds if st["min"] is None else min(st["min"], seconds)
+        st["max"] = seconds if st["max"] is None else max(st["max"], seconds)
+
+    def status(self):
+        return {
+            "fast_budget": self.fast_budget,
+            "clean_interval_min": self.clean_interval_min,
+            "fast_since_full": self.fast_since_full,
+            "partials_since_full": self.partials_since_full,
+            "latency": {
+                mode: dict(st, mean=st["seconds"] / st["count"] if st["count"] else None)
+                for mode, st in self.stats.items()
+            },
+        }
+
+
+class PanelSession:
+    """Trzyma kontroler e-papieru zainicjalizowany między odświeżeniami.
+
+    init() wykonuje się tylko przy pierwszym użyciu po uśpieniu, a epd.sleep()
+    (2 s opóźnienia + odcięcie 5V) zleca timer po `idle_timeout` sekundach
+    bez odświeżenia - poza ścieżką zapytania. `dispatch(fn)` przekazuje
+    uśpienie wątkowi-właścicielowi matrycy (DisplayQueue); bez niego
+    wykonuje je sam wątek timera.
+
+    `panel` (epdregistry.Panel) opisuje format klatki: rozmiar bufora,
+    liczbę płaszczyzn, bity na piksel i dostępne tryby odświeżania.
+    Bez niego bierzemy wpis rejestru dla modułu sterownika.
+    """
+
+    def __init__(self, epd, idle_timeout=IDLE_TIMEOUT, policy=None, panel=None, dispatch=None):
+        self.epd = epd
+        self.panel = panel = panel or epdregistry.get(type(epd).__module__.rsplit(".", 1)[-1])
+        self.dispatch = dispatch
+        self.idle_timeout = idle_timeout
+        self.policy = policy or RefreshPolicy()
+        self.linewidth = panel.linewidth
+        # brudne okna liczymy tylko dla matryc z okienkowym partialem
+        self.windowed = panel.partial is not None
+        self.awake = False
+        self.mode = None
+        self.last_frame = None
+        self.displayed_hash = None
+        self.skipped = 0
+        self.last_refresh = None
+        self.last_used = 0
+        self.lock = threading.RLock()
+        self.timer = None
+        self.inits = 0
+        self.sleeps = 0
+        self.warm_refreshes = 0
+
+    @contextmanager
+    def use(self, mode="full"):
+        """Daje wybudzoną matrycę w trybie `mode` (z MODES) na czas jednego odświeżenia."""
+        with self.lock:
+            if self.awake and self.mode == mode:
+                self.warm_refreshes += 1
+            else:
+                # zmiana trybu wymaga innej sekwencji init (LUT/temperatura)
+                epdregistry.call(self.epd, self._calls(mode)[0])
+                self.awake = True
+                self.mode = mode
+                self.inits += 1
+            try:
+                yield self.epd
+            finally:
+                self.last_used = time.time()
+                self._schedule_sleep()
+
+    def plan(self, buffer):
+        """Zwraca (tryb, okna) dla klatki; okna tylko dla trybu partial."""
+        rects = None
+        if self.last_frame is not None and not self.windowed:
+            rects = []
+        elif self.last_frame is not None:
+            rects = epdbuffer.dirty_rects(self.last_frame, buffer, self.linewidth)
+            if len(rects) > MAX_PARTIAL_WINDOWS:
+                rects = [epdbuffer.bounding_rect(rects)]
+        mode = self.policy.choose(self.panel, rects, len(buffer))
+        return mode, rects if mode == "partial" else []
+
+    def refresh(self, buffer, force=False, progress=None):
+        """Wysyła spakowaną klatkę trybem wybranym przez politykę odświeżania.
+
+        Klatka identyczna z tym, co już jest na ekranie, jest pomijana
+        (bez budzenia matrycy), chyba że `force`. `progress(faza)` dostaje
+        "transferring" przy wysyłaniu przez SPI i "refreshing", gdy matryca
+        trzyma BUSY.
+        """
+        if len(buffer) != self.panel.bytes_per_frame:
+            raise ValueError(f"klatka ma {len(buffer)} B, {self.panel.id} oczekuje {self.panel.bytes_per_frame} B")
+        digest = hashlib.blake2b(buffer, digest_size=16).hexdigest()
+        with self.lock:
+            if not force and digest == self.displayed_hash:
+                self.skipped += 1
+                return {"mode": "skipped", "windows": [], "seconds": 0}
+            mode, rects = self.plan(buffer)
+            start = time.time()
+            if progress:
+                progress("transferring")
+                waiter = self.epd.config.busy_waiter
+                waiter.listener = lambda state: progress("refreshing" if state == "busy" else "transferring")
+            try:
+                self._send(mode, rects, buffer)
+            finally:
+                if progress:
+                    waiter.listener = None
+            seconds = time.time() - start
+            self.policy.record(mode, seconds)
+            self.last_frame = bytes(buffer)
+            self.displayed_hash = digest
+            self.last_refresh = {
+                "mode": mode,
+                "windows": [{"x": x0 * 8, "y": y0, "width": (x1 - x0) * 8, "height": y1 - y0}
+                            for x0, y0, x1, y1 in rects],
+                "seconds": round(seconds, 3),
+            }
+            return self.last_refresh
+
+    def _calls(self, mode):
+        """(init, display) sterownika dla trybu - sygnatury różnią się między matrycami."""
+        panel = self.panel
+        return {"full": (panel.init, panel.display), "fast": panel.fast, "partial": panel.partial}[mode]
+
+    def _send(self, mode, rects, buffer):
+        display = self._calls(mode)[1]
+        with self.use(mode) as epd:
+            if mode == "partial":
+                for rect in rects:
+                    x0, y0, x1, y1 = rect
+                    epdregistry.call(epd, display, epdbuffer.crop(buffer, self.linewidth, rect), x0 * 8, y0, x1 * 8, y1)
+            elif self.panel.planes == 2:
+                # czarna i kolorowa płaszczyzna sklejone w jednym buforze
+                plane = self.panel.plane_bytes
+                epdregistry.call(epd, display, buffer[:plane], buffer[plane:])
+            else:
+                epdregistry.call(epd, display, buffer)
+
+    def _schedule_sleep(self):
+        if self.timer:
+            self.timer.cancel()
+        self.timer = threading.Timer(self.idle_timeout, self._idle_timer)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def _idle_timer(self):
+        # timer tylko zleca uśpienie - matrycy dotyka wątek-właściciel
+        if self.dispatch:
+            self.dispatch(self._idle_sleep)
+        else:
+            self._idle_sleep()
+
+    def _idle_sleep(self):
+        with self.lock:
+            if not self.awake:
+                return
+            idle = time.time() - self.last_used
+            if idle < self.idle_timeout:
+                # ktoś odświeżył w międzyczasie - czekamy dalej
+                self.timer = threading.Timer(self.idle_timeout - idle, self._idle_timer)
+                self.timer.daemon = True
+                self.timer.start()
+                return
+            self.sleep_now()
+
+    def sleep_now(self):
+        """Deep sleep od razu (np. przy zamykaniu serwisu)."""
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+            if self.awake:
+                try:
+                    epdregistry.call(self.epd, self.panel.sleep)
+                finally:
+                    self.awake = False
+                    self.sleeps += 1
+
+    def power_off(self):
+        """Odcina zasilanie bez komend do kontrolera - po zawieszeniu matrycy."""
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+            self.awake = False
+            # nie wiemy co matryca pokazuje - następna klatka pełnym odświeżeniem
+            self.last_frame = None
+            self.displayed_hash = None
+            self.epd.module_exit()
+
+    def set_idle_timeout(self, seconds):
+        with self.lock:
+            self.idle_timeout = seconds
+            if self.awake:
+                self._schedule_sleep()
+
+    def status(self):
+        return {
+            "awake": self.awake,
+            "idle_timeout": self.idle_timeout,
+            "inits": self.inits,
+            "sleeps": self.sleeps,
+            "warm_refreshes": self.warm_refreshes,
+            "skipped_refreshes": self.skipped,
+            "displayed_hash": self.displayed_hash,
+            "last_refresh": self.last_refresh,
+            "policy": self.policy.status(),
+            "frame_bytes": self.panel.bytes_per_frame,
+        }
+
+
+class FramePipeline:
+    """Podwójne buforowanie klatek: następna klatka jest dekodowana, ditherowana
+    i pakowana w wątku roboczym, podczas gdy matryca odświeża bieżącą (BUSY).
+
+    `prepare(source)` zwraca spakowany bufor; klatki rozpoznajemy po kluczu
+    (dla plików: ścieżka + mtime).
+    """
+
+    def __init__(self, prepare):
+        self.prepare = prepare
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="epaper-prepare")
+        self.lock = threading.Lock()
+        self.pending = None
+        self.hits = 0
+        self.misses = 0
+        self.last_prepare = None
+
+    @staticmethod
+    def key(source):
+        if isinstance(source, str):
+            try:
+                return source, os.path.getmtime(source)
+            except OSError:
+                return source, None
+        return None
+
+    def _prepare(self, source):
+        start = time.time()
+        buffer = self.prepare(source)
+        self.last_prepare = round(time.time() - start, 3)
+        return buffer
+
+    def prefetch(self, source):
+        """Zleca przygotowanie klatki w tle (zastępuje poprzednią, jeszcze nieodebraną)."""
+        key = self.key(source)
+        if key is None:
+            return
+        with self.lock:
+            if self.pending and self.pending[0] == key:
+                return
+            if self.pending:
+                self.pending[1].cancel()
+            self.pending = (key, self.executor.submit(self._prepare, source))
+
+    def get(self, source):
+        """Zwraca spakowaną klatkę - z prefetchu, jeśli był, inaczej przygotowuje ją od razu."""
+        key = self.key(source)
+        with self.lock:
+            pending = self.pending
+            if pending and key is not None and pending[0] == key:
+                self.pending = None
+            else:
+                pending = None
+        if pending:
+            self.hits += 1
+            return pending[1].result()
+        self.misses += 1
+        return self._prepare(source)
+
+    def status(self):
+        return {"hits": self.hits, "misses": self.misses, "last_prepare_seconds": self.last_prepare}
@@ -29,7 +29,9 @@
 #
 
 import logging
-from . import epdconfig
+from . import epdbuffer
+from . import epdbase
+from . import epdseq
 
 # Display resolution
 EPD_WIDTH       = 80
@@ -37,14 +39,28 @@ EPD_HEIGHT      = 128
 
 logger = logging.getLogger(__name__)
 
-class EPD:
-    def __init__(self):
-        self.reset_pin = epdconfig.RST_PIN
-        self.dc_pin = epdconfig.DC_PIN
-        self.busy_pin = epdconfig.BUSY_PIN
-        self.cs_pin = epdconfig.CS_PIN
-        self.width = EPD_WIDTH
-        self.height = EPD_HEIGHT
+# Init sequences: (command, payload, delay_ms, wait_busy)
+INIT = epdseq.sequence(
+    (0xD2, [0x3F]),
+    (0x00, [0x6F]),                     # from outside
+    (0x01, [0x03, 0x00, 0x2b, 0x2b]),   # power setting
+    (0x06, [0x3f]),                     # Configuring the charge pump
+    (0x2A, [0x00, 0x00]),               # Setting XON and the options of LUT
+    (0x30, [0x17]),                     # Set the clock frequency: 50Hz
+    (0x50, [0x57]),                     # Set VCOM and data output interval
+    (0x60, [0x22]),                     # Set The non-overlapping period of Gate and Source.
+    (0x61, [0x50, 0x80]),               # resolution setting: source 128
+    (0x82, [0x12]),                     # sets VCOM_DC value: -1v
+    (0xe3, [0x33]),                     # Set POWER SAVING
+)
+
+
+class EPD(epdbase.UC81xx):
+    BUSY_POLL = 0x71
+    BUSY_SETTLE_MS = 800
+
+    def __init__(self, config=None):
+        super().__init__(EPD_WIDTH, EPD_HEIGHT, config)
     
     #full screen update LUT
 
@@ -89,105 +105,32 @@ class EPD:
     0x00,  0x00,  0x00,  0x00,  0x00,  0x00,  
     ]
         
-    # Hardware reset
-    def reset(self):
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200) 
-        epdconfig.digital_write(self.reset_pin, 0)         # module reset
-        epdconfig.delay_ms(2)
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200)   
-
-    def send_command(self, command):
-        epdconfig.digital_write(self.dc_pin, 0)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([command])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    def send_data(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([data])
-        epdconfig.digital_write(self.cs_pin, 1)
-        
-    def ReadBusy(self):
-        logger.debug("e-Paper busy")
-        self.send_command(0x71)
-        busy = epdconfig.digital_read(self.busy_pin)
-        busy =not(busy & 0x01)
-        while(busy):
-            self.send_command(0x71)
-            busy = epdconfig.digital_read(self.busy_pin)
-            busy =not(busy & 0x01)
-        epdconfig.delay_ms(800)
-        logger.debug("e-Paper busy release")        
-
     def TurnOnDisplay(self):
         self.send_command(0x12)
-        epdconfig.delay_ms(10)
+        self.config.delay_ms(10)
         self.ReadBusy()
 
     def SetFulltReg(self):
         self.send_command(0x23)
-        for count in range(0, 42):
-            self.send_data(self.lut_w1[count]) 
+        self.send_data2(self.lut_w1[:42])
         
         self.send_command(0x24)
-        for count in range(0, 42):
-            self.send_data(self.lut_b1[count])     
+        self.send_data2(self.lut_b1[:42])
 
     def SetPartReg(self):
         self.send_command(0x23)
-        for count in range(0, 42):
-            self.send_data(self.lut_w[count]) 
+        self.send_data2(self.lut_w[:42])
         
         self.send_command(0x24)
-        for count in range(0, 42):
-            self.send_data(self.lut_b[count])     
+        self.send_data2(self.lut_b[:42])
 
     def Init(self):
-        if (epdconfig.module_init() != 0):
+        if (self.module_init() != 0):
             return -1
         # EPD hardware init start
         self.reset()
         
-        self.send_command(0xD2)			
-        self.send_data(0x3F)
-
-        self.send_command(0x00)  			
-        self.send_data (0x6F)  #from outside
-
-        self.send_command(0x01)  #power setting
-        self.send_data (0x03)	    
-        self.send_data (0x00)
-        self.send_data (0x2b)		
-        self.send_data (0x2b) 
-
-        self.send_command(0x06)  #Configuring the charge pump
-        self.send_data(0x3f)
-
-        self.send_command(0x2A)  #Setting XON and the options of LUT
-        self.send_data(0x00) 
-        self.send_data(0x00) 
-
-        self.send_command(0x30)  #Set the clock frequency
-        self.send_data(0x17) #50Hz
-
-        self.send_command(0x50)  #Set VCOM and data output interval
-        self.send_data(0x57)			
-
-        self.send_command(0x60)  #Set The non-overlapping period of Gate and Source.
-        self.send_data(0x22)
-
-        self.send_command(0x61)  #resolution setting
-        self.send_data (0x50)    #source 128 	 
-        self.send_data (0x80)       
-
-        self.send_command(0x82)  #sets VCOM_DC value
-        self.send_data(0x12)  #-1v
-
-        self.send_command(0xe3)#Set POWER SAVING
-        self.send_data(0x33)
+        epdseq.run(self, INIT)
         self.SetFulltReg()	
         self.send_command(0x04)     		#power on
         self.ReadBusy()
@@ -238,28 +181,6 @@ class EPD:
         # EPD hardware init end
         return 0
     
-    def getbuffer(self, image):
-        buf = [0xFF] * (int(self.width / 8) * self.height)
-        image_monocolor = image.convert('1')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        if(imwidth == self.width and imheight == self.height):
-            logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0:
-                        buf[int((x + y * self.width) / 8)] &= ~(0x80 >> (x % 8))
-        elif(imwidth == self.height and imheight == self.width):
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        buf[int((newx + newy*self.width) / 8)] &= ~(0x80 >> (y % 8))
-        return buf
-
     def display(self, image):
         if (image == None):
             return
@@ -270,14 +191,10 @@ class EPD:
             Width = self.width // 8 + 1
             
         self.send_command(0x10)
-        for j in range(0, self.height):
-            for i in range(0, int(Width)):
-                self.send_data(0xff)  
+        self.send_data2(epdbuffer.constant_plane(int(Width) * self.height, 0xff))
         
         self.send_command(0x13)
-        for j in range(0, self.height):
-            for i in range(0, int(Width)):
-                self.send_data(image[i + j * int(Width)])  
+        self.send_data2(image[:int(Width) * self.height])
         self.TurnOnDisplay()
         
     def Clear(self):
@@ -290,14 +207,10 @@ class EPD:
         Height = self.height
         
         self.send_command(0x10)
-        for j in range(0, Height):
-            for i in range(0, int(Width)):
-                self.send_data(0x00)  
+        self.send_data2(epdbuffer.constant_plane(int(Width) * Height, 0x00))
         
         self.send_command(0x13)
-        for j in range(0, Height):
-            for i in range(0, int(Width)):
-                self.send_data(0xff)  
+        self.send_data2(epdbuffer.constant_plane(int(Width) * Height, 0xff))
         self.TurnOnDisplay()
 
     def DisplayPartial(self, old_Image, Image):
@@ -321,14 +234,10 @@ class EPD:
         Height = self.height
         # send data
         self.send_command(0x10)
-        for j in range(0, Height):
-            for i in range(0, int(Width)):
-                self.send_data(old_Image[i + j * int(Width)])
+        self.send_data2(old_Image[:int(Width) * Height])
 
         self.send_command(0x13)
-        for j in range(0, Height):
-            for i in range(0, int(Width)):
-                self.send_data(Image[i + j * int(Width)])
+        self.send_data2(Image[:int(Width) * Height])
 
         # Set partial refresh
         self.TurnOnDisplay()
@@ -340,10 +249,10 @@ class EPD:
         self.ReadBusy()
         self.send_command(0x07)
         self.send_data(0xA5)
-        epdconfig.delay_ms(200)
+        self.config.delay_ms(200)
 
-        epdconfig.delay_ms(2000)
-        epdconfig.module_exit()
+        self.config.delay_ms(2000)
+        self.module_exit()
 
 ### END OF FILE ###
 
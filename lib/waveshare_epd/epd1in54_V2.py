@@ -28,7 +28,9 @@
 #
 
 import logging
-from . import epdconfig
+from . import epdbuffer
+from . import epdbase
+from . import epdseq
 
 # Display resolution
 EPD_WIDTH       = 200
@@ -36,14 +38,40 @@ EPD_HEIGHT      = 200
 
 logger = logging.getLogger(__name__)
 
-class EPD:
-    def __init__(self):
-        self.reset_pin = epdconfig.RST_PIN
-        self.dc_pin = epdconfig.DC_PIN
-        self.busy_pin = epdconfig.BUSY_PIN
-        self.cs_pin = epdconfig.CS_PIN
-        self.width = EPD_WIDTH
-        self.height = EPD_HEIGHT
+# Init sequences: (command, payload, delay_ms, wait_busy)
+INIT = epdseq.sequence(
+    (0x37, [0x00, 0x00, 0x00, 0x00, 0x00, 0x40, 0x00, 0x00, 0x00, 0x00]),
+    (0x3c, [0x80]),                     # BorderWavefrom
+    (0x22, [0xc0]),
+    (0x20, [], 0, True),
+)
+
+# init(), after reset()
+INIT_2 = epdseq.sequence(
+    (None, [], 0, True),
+    (0x12, [], 0, True),                # SWRESET (software reset)
+    (0x01, [                            # DRIVER_OUTPUT_CONTROL
+        0xC7,                           # (EPD_HEIGHT - 1) & 0xFF
+        0x00,                           # ((EPD_HEIGHT - 1) >> 8) & 0xFF
+        0x01,                           # GD = 0 SM = 0 TB = 0
+    ]),
+    (0x11, [0x01]),                     # data entry mode
+)
+
+# init(), after SetWindows()
+INIT_3 = epdseq.sequence(
+    (0x3C, [0x01]),                     # BorderWavefrom
+    (0x18, [0x80]),
+    (0x22, [0xB1]),                     # #Load Temperature and waveform setting.
+    (0x20, []),
+)
+
+
+class EPD(epdbase.SSD16xx):
+    RESET_MS = (200, 5, 200)
+
+    def __init__(self, config=None):
+        super().__init__(EPD_WIDTH, EPD_HEIGHT, config)
         
     # waveform full refresh
     WF_Full_1IN54 = [
@@ -91,40 +119,6 @@ class EPD:
     0x02,0x17,0x41,0xB0,0x32,0x28,
     ]
         
-    # Hardware reset
-    def reset(self):
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200) 
-        epdconfig.digital_write(self.reset_pin, 0)
-        epdconfig.delay_ms(5)
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200)   
-
-    def send_command(self, command):
-        epdconfig.digital_write(self.dc_pin, 0)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([command])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    def send_data(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([data])
-        epdconfig.digital_write(self.cs_pin, 1)
-    
-    # send a lot of data   
-    def send_data2(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte2(data)
-        epdconfig.digital_write(self.cs_pin, 1)
-        
-    def ReadBusy(self):
-        logger.debug("e-Paper busy")
-        while(epdconfig.digital_read(self.busy_pin) == 1):
-            epdconfig.delay_ms(20)
-        logger.debug("e-Paper busy release")
-
     def TurnOnDisplay(self):
         self.send_command(0x22) # DISPLAY_UPDATE_CONTROL_2
         self.send_data(0xc7)
@@ -179,7 +173,7 @@ class EPD:
         self.send_data((Ystart >> 8) & 0xFF);
 
     def init(self, isPartial):
-        if (epdconfig.module_init() != 0):
+        if (self.module_init() != 0):
             return -1
             
         if(isPartial):
@@ -189,54 +183,18 @@ class EPD:
             
             self.set_lut(self.WF_PARTIAL_1IN54_0)
             
-            self.send_command(0x37)
-            self.send_data(0x00)
-            self.send_data(0x00)
-            self.send_data(0x00)
-            self.send_data(0x00)
-            self.send_data(0x00)
-            self.send_data(0x40)
-            self.send_data(0x00)
-            self.send_data(0x00)
-            self.send_data(0x00)
-            self.send_data(0x00)
-            
-            self.send_command(0x3c)  # BorderWavefrom
-            self.send_data(0x80)
-            
-            self.send_command(0x22)
-            self.send_data(0xc0)
-            self.send_command(0x20)
-            self.ReadBusy()
+            epdseq.run(self, INIT)
         
         else:
             logger.debug("full refresh")
             # EPD hardware init start
             self.reset()
             
-            self.ReadBusy()
-            self.send_command(0x12) # SWRESET (software reset)
-            self.ReadBusy()
-            
-            self.send_command(0x01) # DRIVER_OUTPUT_CONTROL
-            self.send_data(0xC7) # (EPD_HEIGHT - 1) & 0xFF
-            self.send_data(0x00) # ((EPD_HEIGHT - 1) >> 8) & 0xFF
-            self.send_data(0x01) # GD = 0 SM = 0 TB = 0
-            
-            self.send_command(0x11) # data entry mode
-            self.send_data(0x01)
+            epdseq.run(self, INIT_2)
                       
             self.SetWindows(0, self.height-1, self.width-1, 0) # Set Windows
     
-            self.send_command(0x3C) # BorderWavefrom
-            self.send_data(0x01)
-
-            self.send_command(0x18)
-            self.send_data(0x80)
-
-            self.send_command(0x22) # #Load Temperature and waveform setting.
-            self.send_data(0XB1)
-            self.send_command(0x20)
+            epdseq.run(self, INIT_3)
 
             self.SetCursor(0, self.height-1) # Set Cursor
             
@@ -251,32 +209,10 @@ class EPD:
             linewidth = int(self.width/8) + 1
 
         self.send_command(0x24)
-        self.send_data2([color] * self.height * linewidth)
+        self.send_data2(epdbuffer.constant_plane(self.height * linewidth, color))
                 
         self.TurnOnDisplay()
         
-    def getbuffer(self, image):
-        buf = [0xFF] * (int(self.width/8) * self.height)
-        image_monocolor = image.convert('1')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        if(imwidth == self.width and imheight == self.height):
-            logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0:
-                        buf[int((x + y * self.width) / 8)] &= ~(0x80 >> (x % 8))
-        elif(imwidth == self.height and imheight == self.width):
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        buf[int((newx + newy*self.width) / 8)] &= ~(0x80 >> (y % 8))
-        return buf
-
     def display(self, image):
         if (image == None):
             return
@@ -310,8 +246,8 @@ class EPD:
         self.send_command(0x10) # DEEP_SLEEP_MODE
         self.send_data(0x01)
         
-        epdconfig.delay_ms(2000)
-        epdconfig.module_exit()
+        self.config.delay_ms(2000)
+        self.module_exit()
 
 ### END OF FILE ###
 
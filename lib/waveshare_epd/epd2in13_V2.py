@@ -29,7 +29,10 @@
 
 
 import logging
-from . import epdconfig
+import numpy as np
+from . import epdbuffer
+from . import epdbase
+from . import epdseq
 
 # Display resolution
 EPD_WIDTH       = 122
@@ -37,14 +40,40 @@ EPD_HEIGHT      = 250
 
 logger = logging.getLogger(__name__)
 
-class EPD:
-    def __init__(self):
-        self.reset_pin = epdconfig.RST_PIN
-        self.dc_pin = epdconfig.DC_PIN
-        self.busy_pin = epdconfig.BUSY_PIN
-        self.cs_pin = epdconfig.CS_PIN
-        self.width = EPD_WIDTH
-        self.height = EPD_HEIGHT
+# Init sequences: (command, payload, delay_ms, wait_busy)
+INIT = epdseq.sequence(
+    (None, [], 0, True),
+    (0x12, [], 0, True),                # soft reset
+    (0x74, [0x54]),                     # set analog block control
+    (0x7E, [0x3B]),                     # set digital block control
+    (0x01, [0xF9, 0x00, 0x00]),         # Driver output control
+    (0x11, [0x01]),                     # data entry mode
+    (0x44, [0x00, 0x0F]),               # set Ram-X address start/end position: 0x0C-->(15+1)*8=128
+    (0x45, [0xF9, 0x00, 0x00, 0x00]),   # set Ram-Y address start/end position: 0xF9-->(249+1)=250
+    (0x3C, [0x03]),                     # BorderWavefrom
+    (0x2C, [0x55]),                     # VCOM Voltage: 
+)
+
+# init(), if update == self.FULL_UPDATE
+INIT_2 = epdseq.sequence(
+    (0x4E, [0x00]),                     # set RAM x address count to 0
+    (0x4F, [0xF9, 0x00], 0, True),      # set RAM y address count to 0X127
+)
+
+# init(), unless update == self.FULL_UPDATE
+INIT_3 = epdseq.sequence(
+    (0x37, [0x00, 0x00, 0x00, 0x00, 0x40, 0x00, 0x00]),
+    (0x22, [0xC0]),
+    (0x20, [], 0, True),
+    (0x3C, [0x01]),                     # BorderWavefrom
+)
+
+
+class EPD(epdbase.SSD16xx):
+    RESET_MS = (200, 5, 200)
+
+    def __init__(self, config=None):
+        super().__init__(EPD_WIDTH, EPD_HEIGHT, config)
         
     FULL_UPDATE = 0
     PART_UPDATE = 1
@@ -84,38 +113,6 @@ class EPD:
         0x15,0x41,0xA8,0x32,0x30,0x0A,
     ]
         
-    # Hardware reset
-    def reset(self):
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200) 
-        epdconfig.digital_write(self.reset_pin, 0)
-        epdconfig.delay_ms(5)
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200)   
-
-    def send_command(self, command):
-        epdconfig.digital_write(self.dc_pin, 0)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([command])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    def send_data(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([data])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    # send a lot of data   
-    def send_data2(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte2(data)
-        epdconfig.digital_write(self.cs_pin, 1)
-        
-    def ReadBusy(self):
-        while(epdconfig.digital_read(self.busy_pin) == 1):      # 0: idle, 1: busy
-            epdconfig.delay_ms(100)    
-
     def TurnOnDisplay(self):
         self.send_command(0x22)
         self.send_data(0xC7)
@@ -129,43 +126,12 @@ class EPD:
         self.ReadBusy()
         
     def init(self, update):
-        if (epdconfig.module_init() != 0):
+        if (self.module_init() != 0):
             return -1
         # EPD hardware init start
         self.reset()
         if(update == self.FULL_UPDATE):
-            self.ReadBusy()
-            self.send_command(0x12) # soft reset
-            self.ReadBusy()
-
-            self.send_command(0x74) #set analog block control
-            self.send_data(0x54)
-            self.send_command(0x7E) #set digital block control
-            self.send_data(0x3B)
-
-            self.send_command(0x01) #Driver output control
-            self.send_data(0xF9)
-            self.send_data(0x00)
-            self.send_data(0x00)
-
-            self.send_command(0x11) #data entry mode
-            self.send_data(0x01)
-
-            self.send_command(0x44) #set Ram-X address start/end position
-            self.send_data(0x00)
-            self.send_data(0x0F)    #0x0C-->(15+1)*8=128
-
-            self.send_command(0x45) #set Ram-Y address start/end position
-            self.send_data(0xF9)   #0xF9-->(249+1)=250
-            self.send_data(0x00)
-            self.send_data(0x00)
-            self.send_data(0x00)
-            
-            self.send_command(0x3C) #BorderWavefrom
-            self.send_data(0x03)
-
-            self.send_command(0x2C)     #VCOM Voltage
-            self.send_data(0x55)    #
+            epdseq.run(self, INIT)
 
             self.send_command(0x03)
             self.send_data(self.lut_full_update[70])
@@ -184,12 +150,7 @@ class EPD:
             for count in range(70):
                 self.send_data(self.lut_full_update[count])
 
-            self.send_command(0x4E)   # set RAM x address count to 0
-            self.send_data(0x00)
-            self.send_command(0x4F)   # set RAM y address count to 0X127
-            self.send_data(0xF9)
-            self.send_data(0x00)
-            self.ReadBusy()
+            epdseq.run(self, INIT_2)
         else:
             self.send_command(0x2C)     #VCOM Voltage
             self.send_data(0x26)
@@ -200,22 +161,7 @@ class EPD:
             for count in range(70):
                 self.send_data(self.lut_partial_update[count])
 
-            self.send_command(0x37)
-            self.send_data(0x00)
-            self.send_data(0x00)
-            self.send_data(0x00)
-            self.send_data(0x00)
-            self.send_data(0x40)
-            self.send_data(0x00)
-            self.send_data(0x00)
-
-            self.send_command(0x22)
-            self.send_data(0xC0)
-            self.send_command(0x20)
-            self.ReadBusy()
-
-            self.send_command(0x3C) #BorderWavefrom
-            self.send_data(0x01)
+            epdseq.run(self, INIT_3)
         return 0
 
     def getbuffer(self, image):
@@ -223,29 +169,18 @@ class EPD:
             linewidth = int(self.width/8)
         else:
             linewidth = int(self.width/8) + 1
-         
-        buf = [0xFF] * (linewidth * self.height)
+
         image_monocolor = image.convert('1')
         imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        
+        bits = np.ones((self.height, linewidth * 8), dtype=bool)
         if(imwidth == self.width and imheight == self.height):
             logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):                    
-                    if pixels[x, y] == 0:
-                        x = imwidth - x
-                        buf[int(x / 8) + y * linewidth] &= ~(0x80 >> (x % 8))
+            # Columns are mirrored and shifted right by one, as the controller scans right to left
+            bits[:, 1:imwidth + 1] = np.asarray(image_monocolor, dtype=bool)[:, ::-1]
         elif(imwidth == self.height and imheight == self.width):
             logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        newy = imwidth - newy - 1
-                        buf[int(newx / 8) + newy*linewidth] &= ~(0x80 >> (y % 8))
-        return buf   
+            bits[:, :imheight] = np.asarray(image_monocolor, dtype=bool).T
+        return epdbuffer.pack_bits(bits, linewidth)
         
         
     def display(self, image):
@@ -287,10 +222,7 @@ class EPD:
             linewidth = int(self.width/8) + 1
         # logger.debug(linewidth)
         
-        buf = [0x00] * self.height * linewidth
-        for j in range(0, self.height):
-            for i in range(0, linewidth):
-                buf[i + j * linewidth] = color
+        buf = epdbuffer.constant_plane(self.height * linewidth, color)
 
         self.send_command(0x24)
         self.send_data2(buf)
@@ -309,8 +241,8 @@ class EPD:
 
         self.send_command(0x10) #enter deep sleep
         self.send_data(0x03)
-        epdconfig.delay_ms(2000)
-        epdconfig.module_exit()
+        self.config.delay_ms(2000)
+        self.module_exit()
 
 ### END OF FILE ###
 
@@ -29,7 +29,9 @@
 #
 
 import logging
-from . import epdconfig
+from . import epdbuffer
+from . import epdbase
+from . import epdseq
 
 import PIL
 from PIL import Image
@@ -39,52 +41,54 @@ import io
 EPD_WIDTH       = 184
 EPD_HEIGHT      = 360
 
+# Palette index order expected by the controller
+PALETTE = ((0, 0, 0), (255, 255, 255), (255, 255, 0), (255, 0, 0))
+
 logger = logging.getLogger(__name__)
 
-class EPD:
-    def __init__(self):
-        self.reset_pin = epdconfig.RST_PIN
-        self.dc_pin = epdconfig.DC_PIN
-        self.busy_pin = epdconfig.BUSY_PIN
-        self.cs_pin = epdconfig.CS_PIN
-        self.width = EPD_WIDTH
-        self.height = EPD_HEIGHT
+# Init sequences: (command, payload, delay_ms, wait_busy)
+INIT = epdseq.sequence(
+    (None, [], 0, 'ReadBusyH'),
+    (0x4D, [0x78]),
+    (0x00, [0x0F, 0x29]),               # PSR
+    (0x01, [0x07, 0x00]),               # PWRR
+    (0x03, [0x10, 0x54, 0x44]),         # POFS
+    (0x06, [0x05, 0x00, 0x3F, 0x0A, 0x25, 0x12, 0x1A]),  # BTST_P
+    (0x50, [0x37]),                     # CDI
+    (0x60, [0x02, 0x02]),               # TCON
+)
+
+# init(), after send_data()
+INIT_2 = epdseq.sequence(
+    (0xE7, [0x1C]),
+    (0xE3, [0x22]),
+    (0xB4, [0xD0]),
+    (0xB5, [0x03]),
+    (0xE9, [0x01]),
+    (0x30, [0x08]),
+    (0x04, [], 0, 'ReadBusyH'),
+)
+
+
+class EPD(epdbase.UC81xx):
+    PALETTE = PALETTE
+    PALETTE_BPP = 2
+
+    def __init__(self, config=None):
+        super().__init__(EPD_WIDTH, EPD_HEIGHT, config)
         self.BLACK  = 0x000000   #   00  BGR
         self.WHITE  = 0xffffff   #   01
         self.YELLOW = 0x00ffff   #   10
         self.RED    = 0x0000ff   #   11
         
-    # Hardware reset
-    def reset(self):
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200) 
-        epdconfig.digital_write(self.reset_pin, 0)         # module reset
-        epdconfig.delay_ms(2)
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200)   
-
-    def send_command(self, command):
-        epdconfig.digital_write(self.dc_pin, 0)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([command])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    def send_data(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([data])
-        epdconfig.digital_write(self.cs_pin, 1)
-        
     def ReadBusyH(self):
         logger.debug("e-Paper busy H")
-        while(epdconfig.digital_read(self.busy_pin) == 0):      # 0: idle, 1: busy
-            epdconfig.delay_ms(5)
+        self.wait_busy(0)      # 0: idle, 1: busy
         logger.debug("e-Paper busy H release")
 
     def ReadBusyL(self):
         logger.debug("e-Paper busy L")
-        while(epdconfig.digital_read(self.busy_pin) == 1):      # 0: busy, 1: idle
-            epdconfig.delay_ms(5)
+        self.wait_busy(1)      # 0: busy, 1: idle
         logger.debug("e-Paper busy L release")
 
     def TurnOnDisplay(self):
@@ -93,43 +97,12 @@ class EPD:
         self.ReadBusyH()
         
     def init(self):
-        if (epdconfig.module_init() != 0):
+        if (self.module_init() != 0):
             return -1
         # EPD hardware init start
 
         self.reset()
-        self.ReadBusyH()
-        self.send_command(0x4D) 
-        self.send_data(0x78) 
-
-        self.send_command(0x00) 	#PSR
-        self.send_data(0x0F) 
-        self.send_data(0x29) 
-
-        self.send_command(0x01) 	#PWRR
-        self.send_data(0x07) 
-        self.send_data(0x00) 
-        
-        self.send_command(0x03) 	#POFS
-        self.send_data(0x10) 
-        self.send_data(0x54) 
-        self.send_data(0x44) 
-        
-        self.send_command(0x06) 	#BTST_P
-        self.send_data(0x05) 
-        self.send_data(0x00) 
-        self.send_data(0x3F) 
-        self.send_data(0x0A) 
-        self.send_data(0x25) 
-        self.send_data(0x12) 
-        self.send_data(0x1A)  
-
-        self.send_command(0x50) 	#CDI
-        self.send_data(0x37) 
-        
-        self.send_command(0x60) 	#TCON
-        self.send_data(0x02) 
-        self.send_data(0x02) 
+        epdseq.run(self, INIT)
         
         self.send_command(0x61)  #TRES
         self.send_data(self.width//256) 		# Source_BITS_H
@@ -137,54 +110,9 @@ class EPD:
         self.send_data(self.height//256) 			# Gate_BITS_H
         self.send_data(self.height%256)  		# Gate_BITS_L	
         
-        self.send_command(0xE7) 
-        self.send_data(0x1C) 
-        
-        self.send_command(0xE3) 	
-        self.send_data(0x22) 
-        
-        self.send_command(0xB4) 
-        self.send_data(0xD0) 
-        self.send_command(0xB5) 
-        self.send_data(0x03) 
-        
-        self.send_command(0xE9) 
-        self.send_data(0x01)  
-
-        self.send_command(0x30) 
-        self.send_data(0x08)   
-            
-        self.send_command(0x04) 
-        self.ReadBusyH()
+        epdseq.run(self, INIT_2)
         return 0
 
-    def getbuffer(self, image):
-        # Create a pallette with the 4 colors supported by the panel
-        pal_image = Image.new("P", (1,1))
-        pal_image.putpalette( (0,0,0,  255,255,255,  255,255,0,   255,0,0) + (0,0,0)*252)
-
-        # Check if we need to rotate the image
-        imwidth, imheight = image.size
-        if(imwidth == self.width and imheight == self.height):
-            image_temp = image
-        elif(imwidth == self.height and imheight == self.width):
-            image_temp = image.rotate(90, expand=True)
-        else:
-            logger.warning("Invalid image dimensions: %d x %d, expected %d x %d" % (imwidth, imheight, self.width, self.height))
-
-        # Convert the soruce image to the 4 colors, dithering if needed
-        image_4color = image_temp.convert("RGB").quantize(palette=pal_image)
-        buf_4color = bytearray(image_4color.tobytes('raw'))
-
-        # into a single byte to transfer to the panel
-        buf = [0x00] * int(self.width * self.height / 4)
-        idx = 0
-        for i in range(0, len(buf_4color), 4):
-            buf[idx] = (buf_4color[i] << 6) + (buf_4color[i+1] << 4) + (buf_4color[i+2] << 2) + buf_4color[i+3]
-            idx += 1
-
-        return buf
-
     def display(self, image):
         if self.width % 4 == 0 :
             Width = self.width // 4
@@ -193,9 +121,7 @@ class EPD:
         Height = self.height
 
         self.send_command(0x10)
-        for j in range(0, Height):
-            for i in range(0, Width):
-                    self.send_data(image[i + j * Width])
+        self.send_data2(image[:Width * Height])
 
         self.TurnOnDisplay()
         
@@ -207,9 +133,7 @@ class EPD:
         Height = self.height
 
         self.send_command(0x10)
-        for j in range(0, Height):
-            for i in range(0, Width):
-                self.send_data(color)
+        self.send_data2(epdbuffer.constant_plane(Width * Height, color))
 
         self.TurnOnDisplay()
 
@@ -217,12 +141,12 @@ class EPD:
         self.send_command(0x02) # POWER_OFF
         self.send_data(0X00)
         self.ReadBusyH()
-        epdconfig.delay_ms(2000)
+        self.config.delay_ms(2000)
 
         self.send_command(0x07) # DEEP_SLEEP
         self.send_data(0XA5)
         
-        epdconfig.delay_ms(2000)
-        epdconfig.module_exit()
+        self.config.delay_ms(2000)
+        self.module_exit()
 ### END OF FILE ###
 
@@ -29,7 +29,9 @@
 
 import logging
 from multiprocessing.reduction import recv_handle
-from . import epdconfig
+from . import epdbuffer
+from . import epdbase
+from . import epdseq
 
 # Display resolution
 EPD_WIDTH       = 240
@@ -37,14 +39,32 @@ EPD_HEIGHT      = 360
 
 logger = logging.getLogger(__name__)
 
-class EPD:
-    def __init__(self):
-        self.reset_pin = epdconfig.RST_PIN
-        self.dc_pin = epdconfig.DC_PIN
-        self.busy_pin = epdconfig.BUSY_PIN
-        self.cs_pin = epdconfig.CS_PIN
-        self.width = EPD_WIDTH
-        self.height = EPD_HEIGHT
+# Init sequences: (command, payload, delay_ms, wait_busy)
+INIT = epdseq.sequence(
+    (0x00, [                            # panel setting PSR
+        0xFF,                           # RES1 RES0 REG KW/R UD SHL SHD_N RST_N
+        0x01,                           # x x x VCMZ TS_AUTO TIGE NORG VC_LUTZ
+    ]),
+    (0x01, [                            # POWER SETTING PWR
+        0x03,                           # x x x x x x VDS_EN VDG_EN
+        0x10,                           # x x x VCOM_SLWE VGH[3:0] VGH=20V, VGL=-20V
+        0x3F,                           # x x VSH[5:0] VSH = 15V
+        0x3F,                           # x x VSL[5:0] VSL=-15V
+        0x03,                           # OPTEN VDHR[6:0] VHDR=6.4V
+    ]),                                 # T_VDS_OFF[1:0] 00=1 frame; 01=2 frame; 10=3 frame; 11=4 frame
+    (0x06, [0x37, 0x3D, 0x3D]),         # booster soft start BTST: BT_PHA[7:0] / BT_PHB[7:0] / x x BT_PHC[5:0]
+    (0x60, [0x22]),                     # TCON setting TCON: S2G[3:0] G2S[3:0] non-overlap = 12
+    (0x82, [0x07]),                     # VCOM_DC setting VDCS: x VDCS[6:0] VCOM_DC value= -1.9v 00~3f,0x12=-1.9v
+    (0x30, [0x09]),
+    (0xe3, [0x88]),                     # power saving PWS: VCOM_W[3:0] SD_W[3:0]
+    (0x61, [0xf0, 0x01, 0x68]),         # resoultion setting: HRES[7:3] 0 0 0 / x x x x x x x VRES[8] / VRES[7:0]
+    (0x50, [0xB7]),
+)
+
+
+class EPD(epdbase.UC81xx):
+    def __init__(self, config=None):
+        super().__init__(EPD_WIDTH, EPD_HEIGHT, config)
         self.Flag = 0
         self.WHITE = 0xFF
         self.BLACK = 0x00
@@ -194,40 +214,6 @@ class EPD:
         0x00,0x00,0x00,0x00,0x00,0x00,0x00
     ]
         
-    # Hardware reset
-    def reset(self):
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200) 
-        epdconfig.digital_write(self.reset_pin, 0)
-        epdconfig.delay_ms(2)
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200)   
-
-    def send_command(self, command):
-        epdconfig.digital_write(self.dc_pin, 0)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([command])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    def send_data(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([data])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    # send a lot of data   
-    def send_data2(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte2(data)
-        epdconfig.digital_write(self.cs_pin, 1)
-        
-    def ReadBusy(self):
-        logger.debug("e-Paper busy")
-        while(epdconfig.digital_read(self.busy_pin) == 0):      #  0: busy, 1: idle
-            epdconfig.delay_ms(5) 
-        logger.debug("e-Paper busy release")
-
     def lut(self) :
         self.send_command(0x20)        # vcom
         self.send_data2(self.lut_vcom[:42])
@@ -248,7 +234,7 @@ class EPD:
         self.send_command(0x17)
         self.send_data(0xA5)
         self.ReadBusy()
-        epdconfig.delay_ms(200)
+        self.config.delay_ms(200)
 
     # LUT download
     def lut_GC(self):
@@ -308,144 +294,90 @@ class EPD:
         
                 
     def init(self):
-        if (epdconfig.module_init() != 0):
+        if (self.module_init() != 0):
             return -1
         # EPD hardware init start
         self.Flag = 0
         self.reset()
 
-        self.send_command(0x00)     # panel setting   PSR
-        self.send_data(0xFF)        # RES1 RES0 REG KW/R     UD    SHL   SHD_N  RST_N    
-        self.send_data(0x01)        # x x x VCMZ TS_AUTO TIGE NORG VC_LUTZ
-
-        self.send_command(0x01)     # POWER SETTING   PWR
-        self.send_data(0x03)        #  x x x x x x VDS_EN VDG_EN    
-        self.send_data(0x10)        #  x x x VCOM_SLWE VGH[3:0]   VGH=20V, VGL=-20V    
-        self.send_data(0x3F)        #  x x VSH[5:0]    VSH = 15V
-        self.send_data(0x3F)        #  x x VSL[5:0]    VSL=-15V
-        self.send_data(0x03)        #  OPTEN VDHR[6:0]  VHDR=6.4V
-                                    # T_VDS_OFF[1:0] 00=1 frame; 01=2 frame; 10=3 frame; 11=4 frame
-        self.send_command(0x06)     # booster soft start   BTST 
-        self.send_data(0x37)        #  BT_PHA[7:0]      
-        self.send_data(0x3D)        #  BT_PHB[7:0]    
-        self.send_data(0x3D)        #  x x BT_PHC[5:0]    
+        epdseq.run(self, INIT)
+        return 0
 
-        self.send_command(0x60)     # TCON setting            TCON 
-        self.send_data(0x22)        # S2G[3:0] G2S[3:0]   non-overlap = 12        
+    def display(self, image):
+        if (image == None):
+            return            
+        self.send_command(0x13);		     # Transfer new data
+        self.send_data2(image)
 
-        self.send_command(0x82)     # VCOM_DC setting        VDCS 
-        self.send_data(0x07)        # x  VDCS[6:0]    VCOM_DC value= -1.9v    00~3f,0x12=-1.9v
+    # display() only loads the frame; a full update also needs the GC waveform and a refresh
+    def display_GC(self, image):
+        self.display(image)
+        self.lut_GC()
+        self.refresh()
 
-        self.send_command(0x30)             
-        self.send_data(0x09)        
+    def _NUM_byte(self, NUM, row, column):
+        if NUM == self.Gate_Line:
+            if(column%2):
+                return 0xff # An odd number of Gate line
+            else:
+                return 0x00 # The even line Gate
 
-        self.send_command(0xe3)     # power saving            PWS 
-        self.send_data(0x88)        # VCOM_W[3:0] SD_W[3:0]
+        elif NUM == self.Chessboard:
+            if(row>=(self.width/8/2) and column>=(self.height/2)):
+                return 0xff
+            elif(row<(self.width/8/2) and column<(self.height/2)):
+                return 0xff
+            else:
+                return 0x00
 
-        self.send_command(0x61)     # resoultion setting 
-        self.send_data(0xf0)        #  HRES[7:3] 0 0 0    
-        self.send_data(0x01)        #  x x x x x x x VRES[8]    
-        self.send_data(0x68)        #  VRES[7:0]
+        elif NUM == self.LEFT_BLACK_RIGHT_WHITE:
+            if(row>=(self.width/8/2)):
+                return 0xff
+            else:
+                return 0x00
 
-        self.send_command(0x50);            
-        self.send_data(0xB7);    
-        return 0
+        elif NUM == self.UP_BLACK_DOWN_WHITE:
+            if(column>=(self.height/2)):
+                return 0xFF
+            else:
+                return 0x00
 
-    def getbuffer(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width/8) * self.height)
-        image_monocolor = image.convert('1')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if(imwidth == self.width and imheight == self.height):
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0:
-                        buf[int((x + y * self.width) / 8)] &= ~(0x80 >> (x % 8))
-        elif(imwidth == self.height and imheight == self.width):
-            logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        buf[int((newx + newy*self.width) / 8)] &= ~(0x80 >> (y % 8))
-        return buf
+        elif NUM == self.Frame:
+            if(column==0 or column==(self.height-1)):
+                return 0x00
+            elif(row==0):
+                return 0x7F
+            elif(row==(self.width/8-1)):
+                return 0xFE
+            else:
+                return 0xFF
 
-    def display(self, image):
-        if (image == None):
-            return            
-        self.send_command(0x13);		     # Transfer new data
-        self.send_data2(image)
+        elif NUM == self.Crosstalk:
+            if((row>=(self.width/8/3) and row<=(self.width/8/3*2) and column<=(self.height/3)) or (row>=(self.width/8/3) and row<=(self.width/8/3*2) and column>=(self.height/3*2))):
+                return 0x00
+            else:
+                return 0xFF
 
     def display_NUM(self, NUM):
         # pcnt = 0
 
         self.send_command(0x13);		     #Transfer new data
-        for column in range(0, self.height):
-            for row in range(0, self.width//8):
-                if NUM == self.WHITE:
-                    self.send_data(0xFF)
-                        
-                elif NUM == self.BLACK:
-                    self.send_data(0x00)
-                        
-                elif NUM == self.Source_Line:
-                    self.send_data(0xAA)
-                        
-                elif NUM == self.Gate_Line:
-                    if(column%2):
-                        self.send_data(0xff) # An odd number of Gate line  
-                    else:
-                        self.send_data(0x00) # The even line Gate  
-                        
-                elif NUM == self.Chessboard:
-                    if(row>=(self.width/8/2) and column>=(self.height/2)):
-                        self.send_data(0xff)
-                    elif(row<(self.width/8/2) and column<(self.height/2)):
-                        self.send_data(0xff)									
-                    else:
-                        self.send_data(0x00)	
-                        
-                elif NUM == self.LEFT_BLACK_RIGHT_WHITE:
-                    if(row>=(self.width/8/2)):
-                        self.send_data(0xff)
-                    else:
-                        self.send_data(0x00)
-                            
-                elif NUM == self.UP_BLACK_DOWN_WHITE:
-                    if(column>=(self.height/2)):
-                        self.send_data(0xFF)
-                    else:
-                        self.send_data(0x00)
-                            
-                elif NUM == self.Frame:
-                    if(column==0 or column==(self.height-1)):
-                        self.send_data(0x00)					
-                    elif(row==0):
-                        self.send_data(0x7F)
-                    elif(row==(self.width/8-1)):
-                        self.send_data(0xFE);					
-                    else:
-                        self.send_data(0xFF);				
-                            
-                elif NUM == self.Crosstalk:
-                    if((row>=(self.width/8/3) and row<=(self.width/8/3*2) and column<=(self.height/3)) or (row>=(self.width/8/3) and row<=(self.width/8/3*2) and column>=(self.height/3*2))):
-                        self.send_data(0x00)
-                    else:
-                        self.send_data(0xFF)				
-                            
-                elif NUM == self.Image:
-                    epdconfig.delay_ms(1)
-                    # self.send_data(gImage_1[pcnt++])
- 
-        
+        if NUM in (self.WHITE, self.BLACK, self.Source_Line):
+            # the whole plane is one byte value
+            self.send_data2(epdbuffer.constant_plane(self.height * (self.width//8), NUM))
+
+        elif NUM == self.Image:
+            # self.send_data(gImage_1[pcnt++])
+            self.config.delay_ms(self.height * (self.width//8))
+
+        elif NUM in (self.Gate_Line, self.Chessboard, self.LEFT_BLACK_RIGHT_WHITE,
+                     self.UP_BLACK_DOWN_WHITE, self.Frame, self.Crosstalk):
+            self.send_data2(bytes(self._NUM_byte(NUM, row, column)
+                                  for column in range(0, self.height) for row in range(0, self.width//8)))
+
     def Clear(self):
         self.send_command(0x13);		     # Transfer new data
-        self.send_data2([0xFF] * int(self.width * self.height / 8))
+        self.send_data2(epdbuffer.constant_plane(int(self.width * self.height / 8), 0xFF))
         self.lut_GC()
         self.refresh()
 
@@ -453,7 +385,7 @@ class EPD:
         self.send_command(0X07) # DEEP_SLEEP_MODE
         self.send_data(0xA5)
         
-        epdconfig.delay_ms(2000)
-        epdconfig.module_exit()
+        self.config.delay_ms(2000)
+        self.module_exit()
 ### END OF FILE ###
 
@@ -29,9 +29,10 @@
 
 
 import logging
-from . import epdconfig
+from . import epdbuffer
+from . import epdbase
+from . import epdseq
 from PIL import Image
-import RPi.GPIO as GPIO
 
 # Display resolution
 EPD_WIDTH  = 400
@@ -44,15 +45,60 @@ GRAY4 = 0x00  # Blackest
 
 logger = logging.getLogger(__name__)
 
-
-class EPD:
-    def __init__(self):
-        self.reset_pin = epdconfig.RST_PIN
-        self.dc_pin = epdconfig.DC_PIN
-        self.busy_pin = epdconfig.BUSY_PIN
-        self.cs_pin = epdconfig.CS_PIN
-        self.width = EPD_WIDTH
-        self.height = EPD_HEIGHT
+# Init sequences: (command, payload, delay_ms, wait_busy)
+INIT = epdseq.sequence(
+    (None, [], 0, True),
+    (0x12, [], 0, True),                # SWRESET
+    (0x21, [0x40, 0x00]),               # Display update control
+    (0x3C, [0x05]),                     # BorderWavefrom
+    (0x11, [0x03]),                     # data entry mode: X-mode
+    (0x44, [0x00, 0x31]),
+    (0x45, [0x00, 0x00, 0x2B, 0x01]),
+    (0x4E, [0x00]),
+    (0x4F, [0x00, 0x00], 0, True),
+)
+
+INIT_FAST = epdseq.sequence(
+    (None, [], 0, True),
+    (0x12, [], 0, True),                # SWRESET
+    (0x21, [0x40, 0x00]),               # Display update control
+    (0x3C, [0x05]),                     # BorderWavefrom
+)
+
+# init_fast(), continued
+INIT_FAST_2 = epdseq.sequence(
+    (0x22, [0x91]),                     # Load temperature value
+    (0x20, [], 0, True),
+    (0x11, [0x03]),                     # data entry mode: X-mode
+    (0x44, [0x00, 0x31]),
+    (0x45, [0x00, 0x00, 0x2B, 0x01]),
+    (0x4E, [0x00]),
+    (0x4F, [0x00, 0x00], 0, True),
+)
+
+INIT_4GRAY = epdseq.sequence(
+    (None, [], 0, True),
+    (0x12, [], 0, True),                # SWRESET
+    (0x21, [0x00, 0x00]),               # Display update control
+    (0x3C, [0x03]),                     # BorderWavefrom
+    (0x0C, [0x8B, 0x9C, 0xA4, 0x0F]),   # BTST: 8B / 9C / 96 A4 / 0F
+)
+
+# Init_4Gray(), after Lut()
+INIT_4GRAY_2 = epdseq.sequence(
+    (0x11, [0x03]),                     # data entry mode: X-mode
+    (0x44, [0x00, 0x31]),
+    (0x45, [0x00, 0x00, 0x2B, 0x01]),
+    (0x4E, [0x00]),
+    (0x4F, [0x00, 0x00], 0, True),
+)
+
+
+class EPD(epdbase.SSD16xx):
+    RESET_MS = (100, 2, 100)
+
+    def __init__(self, config=None):
+        super().__init__(EPD_WIDTH, EPD_HEIGHT, config)
         self.Seconds_1_5S = 0
         self.Seconds_1S = 1
         self.GRAY1 = GRAY1  # white
@@ -95,40 +141,6 @@ class EPD:
                 0x00,	0x00,	0x00,	0x00,	0x00,	0x00,	0x00,	
                 0x02,	0x00,	0x00,	0x07,	0x17,	0x41,	0xA8,	
                 0x32,	0x30 ]
-    # Hardware reset
-    def reset(self):
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(100)
-        epdconfig.digital_write(self.reset_pin, 0)
-        epdconfig.delay_ms(2)
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(100)
-
-    def send_command(self, command):
-        epdconfig.digital_write(self.dc_pin, 0)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([command])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    def send_data(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([data])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    # send a lot of data   
-    def send_data2(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte2(data)
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    def ReadBusy(self):        
-        logger.debug("e-Paper busy")
-        while(epdconfig.digital_read(self.busy_pin) == 1):      #  0: idle, 1: busy
-            epdconfig.delay_ms(20)                
-        logger.debug("e-Paper busy release")
-    
     def TurnOnDisplay(self):
         self.send_command(0x22) #Display Update Control
         self.send_data(0xF7)
@@ -154,61 +166,20 @@ class EPD:
         self.ReadBusy()
 
     def init(self):
-        if epdconfig.module_init() != 0:
+        if self.module_init() != 0:
             return -1
         # EPD hardware init start
         self.reset()
-        self.ReadBusy()
-
-        self.send_command(0x12) #SWRESET
-        self.ReadBusy()
-
-        self.send_command(0x21)  # Display update control
-        self.send_data(0x40)
-        self.send_data(0x00)
-
-        self.send_command(0x3C)  # BorderWavefrom
-        self.send_data(0x05)
-
-        self.send_command(0x11)  # data  entry  mode
-        self.send_data(0x03)  # X-mode
-
-        self.send_command(0x44) 
-        self.send_data(0x00)
-        self.send_data(0x31)  
-        
-        self.send_command(0x45) 
-        self.send_data(0x00)
-        self.send_data(0x00)  
-        self.send_data(0x2B)
-        self.send_data(0x01)
-
-        self.send_command(0x4E) 
-        self.send_data(0x00)
-
-        self.send_command(0x4F) 
-        self.send_data(0x00)
-        self.send_data(0x00)  
-        self.ReadBusy()
+        epdseq.run(self, INIT)
 
         return 0
     
     def init_fast(self, mode):
-        if epdconfig.module_init() != 0:
+        if self.module_init() != 0:
             return -1
         # EPD hardware init start
         self.reset()
-        self.ReadBusy()
-
-        self.send_command(0x12) #SWRESET
-        self.ReadBusy()
-
-        self.send_command(0x21)  # Display update control
-        self.send_data(0x40)
-        self.send_data(0x00)
-
-        self.send_command(0x3C)  # BorderWavefrom
-        self.send_data(0x05)
+        epdseq.run(self, INIT_FAST)
 
         if mode == self.Seconds_1_5S:
             self.send_command(0x1A)
@@ -217,31 +188,7 @@ class EPD:
             self.send_command(0x1A)
             self.send_data(0x5A)  
 
-        self.send_command(0x22)  # Load temperature value
-        self.send_data(0x91)  
-        self.send_command(0x20)  
-        self.ReadBusy()
-
-        self.send_command(0x11)  # data  entry  mode
-        self.send_data(0x03)  # X-mode
-
-        self.send_command(0x44) 
-        self.send_data(0x00)
-        self.send_data(0x31)  
-        
-        self.send_command(0x45) 
-        self.send_data(0x00)
-        self.send_data(0x00)  
-        self.send_data(0x2B)
-        self.send_data(0x01)
-
-        self.send_command(0x4E) 
-        self.send_data(0x00)
-
-        self.send_command(0x4F) 
-        self.send_data(0x00)
-        self.send_data(0x00)  
-        self.ReadBusy()
+        epdseq.run(self, INIT_FAST_2)
 
         return 0
 
@@ -267,117 +214,20 @@ class EPD:
     
 
     def Init_4Gray(self):
-        if epdconfig.module_init() != 0:
+        if self.module_init() != 0:
             return -1
         # EPD hardware init start
         self.reset()
-        self.ReadBusy()
-
-        self.send_command(0x12) #SWRESET
-        self.ReadBusy()
-
-        self.send_command(0x21)  # Display update control
-        self.send_data(0x00)
-        self.send_data(0x00)
-
-        self.send_command(0x3C)  # BorderWavefrom
-        self.send_data(0x03)
-
-        self.send_command(0x0C)  # BTST
-        self.send_data(0x8B) # 8B
-        self.send_data(0x9C) # 9C 
-        self.send_data(0xA4) # 96 A4
-        self.send_data(0x0F) # 0F
+        epdseq.run(self, INIT_4GRAY)
 
         self.Lut()
 
-        self.send_command(0x11)  # data  entry  mode
-        self.send_data(0x03)  # X-mode
-
-        self.send_command(0x44) 
-        self.send_data(0x00)
-        self.send_data(0x31)  
-        
-        self.send_command(0x45) 
-        self.send_data(0x00)
-        self.send_data(0x00)  
-        self.send_data(0x2B)
-        self.send_data(0x01)
-
-        self.send_command(0x4E) 
-        self.send_data(0x00)
-
-        self.send_command(0x4F) 
-        self.send_data(0x00)
-        self.send_data(0x00)  
-        self.ReadBusy()
+        epdseq.run(self, INIT_4GRAY_2)
 
         return 0
 
-    def getbuffer(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width / 8) * self.height)
-        image_monocolor = image.convert('1')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if imwidth == self.width and imheight == self.height:
-            logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0:
-                        buf[int((x + y * self.width) / 8)] &= ~(0x80 >> (x % 8))
-        elif imwidth == self.height and imheight == self.width:
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        buf[int((newx + newy * self.width) / 8)] &= ~(0x80 >> (y % 8))
-        return buf
-
     def getbuffer_4Gray(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width / 4) * self.height)
-        image_monocolor = image.convert('L')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        i = 0
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if imwidth == self.width and imheight == self.height:
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0xC0:
-                        pixels[x, y] = 0x80
-                    elif pixels[x, y] == 0x80:
-                        pixels[x, y] = 0x40
-                    i = i + 1
-                    if i % 4 == 0:
-                        buf[int((x + (y * self.width)) / 4)] = (
-                                    (pixels[x - 3, y] & 0xc0) | (pixels[x - 2, y] & 0xc0) >> 2 | (
-                                        pixels[x - 1, y] & 0xc0) >> 4 | (pixels[x, y] & 0xc0) >> 6)
-
-        elif imwidth == self.height and imheight == self.width:
-            logger.debug("Horizontal")
-            for x in range(imwidth):
-                for y in range(imheight):
-                    newx = y
-                    newy = x
-                    if pixels[x, y] == 0xC0:
-                        pixels[x, y] = 0x80
-                    elif pixels[x, y] == 0x80:
-                        pixels[x, y] = 0x40
-                    i = i + 1
-                    if i % 4 == 0:
-                        buf[int((newx + (newy * self.width)) / 4)] = (
-                                    (pixels[x, y - 3] & 0xc0) | (pixels[x, y - 2] & 0xc0) >> 2 | (
-                                        pixels[x, y - 1] & 0xc0) >> 4 | (pixels[x, y] & 0xc0) >> 6)
-
-        return buf
+        return epdbuffer.getbuffer_4gray(image, self.width, self.height, transpose=True)
     
     def Clear(self):
         if self.width % 8 == 0:
@@ -386,10 +236,10 @@ class EPD:
             linewidth = int(self.width / 8) + 1
 
         self.send_command(0x24)
-        self.send_data2([0xff] * int(self.height * linewidth))
+        self.send_data2(epdbuffer.constant_plane(int(self.height * linewidth), 0xff))
 
         self.send_command(0x26)
-        self.send_data2([0xff] * int(self.height * linewidth))
+        self.send_data2(epdbuffer.constant_plane(int(self.height * linewidth), 0xff))
 
         self.TurnOnDisplay()
 
@@ -444,78 +294,12 @@ class EPD:
         self.TurnOnDisplay_Partial()
 
     def display_4Gray(self, image):
-        if self.width % 8 == 0:
-            linewidth = int(self.width / 8)
-        else:
-            linewidth = int(self.width / 8) + 1
-
-        buf = [0x00] * self.height * linewidth
-
+        high, low = epdbuffer.gray4_planes(image)
         self.send_command(0x24)
-        for i in range(0, int(EPD_WIDTH * EPD_HEIGHT / 8)):  # EPD_WIDTH * EPD_HEIGHT / 4
-            temp3 = 0
-            for j in range(0, 2):
-                temp1 = image[i * 2 + j]
-                for k in range(0, 2):
-                    temp2 = temp1 & 0xC0
-                    if temp2 == 0xC0:
-                        temp3 |= 0x01  # white
-                    elif temp2 == 0x00:
-                        temp3 |= 0x00  # black
-                    elif temp2 == 0x80:
-                        temp3 |= 0x00  # gray1
-                    else:  # 0x40
-                        temp3 |= 0x01  # gray2
-                    temp3 <<= 1
-
-                    temp1 <<= 2
-                    temp2 = temp1 & 0xC0
-                    if temp2 == 0xC0:  # white
-                        temp3 |= 0x01
-                    elif temp2 == 0x00:  # black
-                        temp3 |= 0x00
-                    elif temp2 == 0x80:
-                        temp3 |= 0x00  # gray1
-                    else:  # 0x40
-                        temp3 |= 0x01  # gray2
-                    if j != 1 or k != 1:
-                        temp3 <<= 1
-                    temp1 <<= 2
-            buf[i] = temp3
-        self.send_data2(buf)
+        self.send_data2(low)
 
         self.send_command(0x26)
-        for i in range(0, int(EPD_WIDTH * EPD_HEIGHT / 8)):
-            temp3 = 0
-            for j in range(0, 2):
-                temp1 = image[i * 2 + j]
-                for k in range(0, 2):
-                    temp2 = temp1 & 0xC0
-                    if temp2 == 0xC0:
-                        temp3 |= 0x01  # white
-                    elif temp2 == 0x00:
-                        temp3 |= 0x00  # black
-                    elif temp2 == 0x80:
-                        temp3 |= 0x01  # gray1
-                    else:  # 0x40
-                        temp3 |= 0x00  # gray2
-                    temp3 <<= 1
-
-                    temp1 <<= 2
-                    temp2 = temp1 & 0xC0
-                    if temp2 == 0xC0:  # white
-                        temp3 |= 0x01
-                    elif temp2 == 0x00:  # black
-                        temp3 |= 0x00
-                    elif temp2 == 0x80:
-                        temp3 |= 0x01  # gray1
-                    else:  # 0x40
-                        temp3 |= 0x00  # gray2
-                    if j != 1 or k != 1:
-                        temp3 <<= 1
-                    temp1 <<= 2
-            buf[i] = temp3
-        self.send_data2(buf)
+        self.send_data2(high)
 
         self.TurnOnDisplay_4GRAY()
         # pass
@@ -524,7 +308,7 @@ class EPD:
         self.send_command(0x10)  # DEEP_SLEEP
         self.send_data(0x01)
 
-        epdconfig.delay_ms(2000)
-        epdconfig.module_exit()
+        self.config.delay_ms(2000)
+        self.module_exit()
 
 ### END OF FILE ###
@@ -28,7 +28,9 @@
 #
 
 import logging
-from . import epdconfig
+from . import epdbuffer
+from . import epdbase
+from . import epdseq
 
 # Display resolution
 EPD_WIDTH       = 400
@@ -36,58 +38,56 @@ EPD_HEIGHT      = 300
 
 logger = logging.getLogger(__name__)
 
-class EPD:
-    def __init__(self):
-        self.reset_pin = epdconfig.RST_PIN
-        self.dc_pin = epdconfig.DC_PIN
-        self.busy_pin = epdconfig.BUSY_PIN
-        self.cs_pin = epdconfig.CS_PIN
-        self.width = EPD_WIDTH
-        self.height = EPD_HEIGHT
+# Init sequences: (command, payload, delay_ms, wait_busy)
+INIT = epdseq.sequence(
+    (None, [], 0, True),
+    (0x12, [], 0, True),
+    (0x3C, [0x05]),
+    (0x18, [0x80]),
+    (0x11, [0x03]),
+)
+
+# init(), after send_data()
+INIT_2 = epdseq.sequence(
+    (0x4E, [0x00]),
+    (0x4F, [0x00, 0x00], 0, True),
+)
+
+# init(), unless i == 0x01
+INIT_3 = epdseq.sequence(
+    (0x04, [], 0, True),                # POWER_ON
+    (0x00, [0x0f]),                     # panel setting
+)
+
+
+class EPD(epdbase.UC81xx):
+    RESET_MS = (200, 5, 200)
+
+    def __init__(self, config=None):
+        super().__init__(EPD_WIDTH, EPD_HEIGHT, config)
         self.flag = 0
         
-        if (epdconfig.module_init(cleanup=True) != 0):
+        if (self.module_init(cleanup=True) != 0):
             return -1
         
 
-    # Hardware reset
-    def reset(self):
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200) 
-        epdconfig.digital_write(self.reset_pin, 0)
-        epdconfig.delay_ms(5)
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200)   
-
     def send_command(self, command):
-        epdconfig.digital_write(self.dc_pin, 0)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.DEV_SPI_write(command)
-        epdconfig.digital_write(self.cs_pin, 1)
+        self.config.digital_write(self.dc_pin, 0)
+        self.config.digital_write(self.cs_pin, 0)
+        self.config.DEV_SPI_write(command)
+        self.config.digital_write(self.cs_pin, 1)
 
     def send_data(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.DEV_SPI_write(data)
-        epdconfig.digital_write(self.cs_pin, 1)
+        self.config.digital_write(self.dc_pin, 1)
+        self.config.digital_write(self.cs_pin, 0)
+        self.config.DEV_SPI_write(data)
+        self.config.digital_write(self.cs_pin, 1)
 
-    # send a lot of data   
-    def send_data2(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte2(data)
-        epdconfig.digital_write(self.cs_pin, 1)
-        
     def ReadBusy(self):
-        logger.debug("e-Paper busy")
         if(self.flag == 1):
-            while(epdconfig.digital_read(self.busy_pin) == 1): 
-                epdconfig.delay_ms(100) 
-        
+            self.wait_busy(1)
         else:
-            while(epdconfig.digital_read(self.busy_pin) == 0): 
-                epdconfig.delay_ms(100) 
-        logger.debug("e-Paper busy release")
+            self.wait_busy(0)
 
     def TurnOnDisplay(self):
         if(self.flag == 1):
@@ -98,34 +98,23 @@ class EPD:
         
         else:
             self.send_command(0x12)
-            epdconfig.delay_ms(100) 
+            self.config.delay_ms(100) 
             self.ReadBusy()
             
     def init(self):
         i = 0x00
         self.reset()
         self.send_command(0x2F)
-        epdconfig.delay_ms(100)
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0) 
-        i = epdconfig.DEV_SPI_read()
-        epdconfig.digital_write(self.cs_pin, 1) 
+        self.config.delay_ms(100)
+        self.config.digital_write(self.dc_pin, 1)
+        self.config.digital_write(self.cs_pin, 0) 
+        i = self.config.DEV_SPI_read()
+        self.config.digital_write(self.cs_pin, 1) 
         # print(i)
 
         if(i == 0x01):
             self.flag = 1
-            self.ReadBusy()
-            self.send_command(0x12)
-            self.ReadBusy()
-
-            self.send_command(0x3C)
-            self.send_data(0x05)	
-
-            self.send_command(0x18)
-            self.send_data(0x80)	
-
-            self.send_command(0x11)      
-            self.send_data(0x03)
+            epdseq.run(self, INIT)
 
             self.send_command(0x44) 
             self.send_data(0x00)
@@ -137,47 +126,14 @@ class EPD:
             self.send_data((self.height-1)%256)    
             self.send_data((self.height-1)//256)
 
-            self.send_command(0x4E)
-            self.send_data(0x00)
-            self.send_command(0x4F)  
-            self.send_data(0x00)    
-            self.send_data(0x00)
-            self.ReadBusy()
+            epdseq.run(self, INIT_2)
 
         else:
             self.flag = 0
-            self.send_command(0x04)  # POWER_ON
-            self.ReadBusy()
-
-            self.send_command(0x00)  # panel setting
-            self.send_data(0x0f)
+            epdseq.run(self, INIT_3)
         
         return 0
 
-    def getbuffer(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width/8) * self.height)
-        image_monocolor = image.convert('1')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if(imwidth == self.width and imheight == self.height):
-            logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0:
-                        buf[int((x + y * self.width) / 8)] &= ~(0x80 >> (x % 8))
-        elif(imwidth == self.height and imheight == self.width):
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        buf[int((newx + newy*self.width) / 8)] &= ~(0x80 >> (y % 8))
-        return buf
-
     def display(self, imageblack, imagered):
         high = self.height
         if( self.width % 8 == 0) :
@@ -218,25 +174,17 @@ class EPD:
 
         if(self.flag == 1):
             self.send_command(0x24)
-            for j in range(0, high):
-                for i in range(0, wide):
-                    self.send_data(0xff) 
+            self.send_data2(epdbuffer.constant_plane(wide * high, 0xff))
                     
             self.send_command(0x26)
-            for j in range(0, high):
-                for i in range(0, wide):
-                    self.send_data(0x00) 
+            self.send_data2(epdbuffer.constant_plane(wide * high, 0x00))
         
         else:
             self.send_command(0x10)
-            for j in range(0, high):
-                for i in range(0, wide):
-                    self.send_data(0xff) 
+            self.send_data2(epdbuffer.constant_plane(wide * high, 0xff))
                     
             self.send_command(0x13)
-            for j in range(0, high):
-                for i in range(0, wide):
-                    self.send_data(0x00) 
+            self.send_data2(epdbuffer.constant_plane(wide * high, 0x00))
 
         self.TurnOnDisplay()
 
@@ -253,7 +201,7 @@ class EPD:
             self.send_command(0X07) 
             self.send_data(0xA5)
         
-        epdconfig.delay_ms(2000)
-        epdconfig.module_exit()
+        self.config.delay_ms(2000)
+        self.module_exit()
 ### END OF FILE ###
 
@@ -29,7 +29,9 @@
 
 
 import logging
-from . import epdconfig
+from . import epdbuffer
+from . import epdbase
+from . import epdseq
 
 # Display resolution
 EPD_WIDTH       = 792
@@ -42,14 +44,72 @@ GRAY4  = 0x00 #Blackest
 
 logger = logging.getLogger(__name__)
 
-class EPD:
-    def __init__(self):
-        self.reset_pin = epdconfig.RST_PIN
-        self.dc_pin = epdconfig.DC_PIN
-        self.busy_pin = epdconfig.BUSY_PIN
-        self.cs_pin = epdconfig.CS_PIN
-        self.width = EPD_WIDTH
-        self.height = EPD_HEIGHT
+# Init sequences: (command, payload, delay_ms, wait_busy)
+INIT = epdseq.sequence(
+    (None, [], 0, True),                # waiting for the electronic paper IC to release the idle signal
+    (0x12, [], 0, True),                # POWER ON; waiting for the electronic paper IC to release the idle signal
+    (0x11, [0x01]),
+    (0x44, [0x00, 0x31]),               # Set Ram X- address Start / End position: XStart, POR = 00h / 400/8-1
+    (0x45, [0x0f, 0x01, 0x00, 0x00]),   # Set Ram Y- address Start / End position: 300-1 / YEnd L / YEnd H
+    (0x4e, [0x00]),
+    (0x4f, [0x0f, 0x01], 0, True),
+    (0x91, [0x00]),
+    (0xC4, [0x31, 0x00]),               # Set Ram X- address Start / End position: XStart, POR = 00h / 400/8-1
+    (0xC5, [0x0f, 0x01, 0x00, 0x00]),   # Set Ram Y- address Start / End position: 300-1 / YEnd L / YEnd H
+    (0xCE, [0x31]),
+    (0xCF, [0x0f, 0x01], 0, True),
+)
+
+INIT_FAST = epdseq.sequence(
+    (None, [], 0, True),
+    (0x12, [], 0, True),
+    (0x18, [0x80]),
+    (0x22, [0xB1]),
+    (0x20, [], 0, True),
+    (0x1A, [0x64, 0x00]),
+    (0x22, [0x91]),
+    (0x20, [], 0, True),
+    (0x11, [0x01]),
+    (0x44, [0x00, 0x31]),
+    (0x45, [0x0f, 0x01, 0x00, 0x00]),
+    (0x4e, [0x00]),
+    (0x4f, [0x0f, 0x01], 0, True),
+    (0x91, [0x00]),
+    (0xC4, [0x31, 0x00]),
+    (0xC5, [0x0f, 0x01, 0x00, 0x00]),
+    (0xCe, [0x31]),
+    (0xCf, [0x0f, 0x01], 0, True),
+)
+
+INIT_PARTIAL = epdseq.sequence(
+    (None, [], 0, True),
+    (0x12, [], 0, True),
+    (0x3C, [0x80]),
+)
+
+INIT_4GRAY = epdseq.sequence(
+    (None, [], 0, True),
+    (0x12, [], 0, True),
+    (0x0C, [0x8B, 0x9C, 0xA6, 0x0F]),
+    (0x3C, [0x81], 0, True),
+    (0x11, [0x01]),
+    (0x44, [0x00, 0x31]),
+    (0x45, [0x0f, 0x01, 0x00, 0x00]),
+    (0x4e, [0x00]),
+    (0x4f, [0x0f, 0x01], 0, True),
+    (0x91, [0x00]),
+    (0xC4, [0x31, 0x00]),
+    (0xC5, [0x0f, 0x01, 0x00, 0x00]),
+    (0xCe, [0x31]),
+    (0xCf, [0x0f, 0x01]),
+)
+
+
+class EPD(epdbase.DualController):
+    RESET_MS = (200, 1, 200)
+
+    def __init__(self, config=None):
+        super().__init__(EPD_WIDTH, EPD_HEIGHT, config)
         self.GRAY1  = GRAY1 #white
         self.GRAY2  = GRAY2
         self.GRAY3  = GRAY3 #gray
@@ -97,66 +157,32 @@ class EPD:
             0x02, 0x00, 0x00,
             0x22, 0x17, 0x41, 0xA8, 0x32, 0x40, ]
 
-    # Hardware reset
-    def reset(self):
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200) 
-        epdconfig.digital_write(self.reset_pin, 0)
-        epdconfig.delay_ms(1)
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200)   
-
-    def send_command(self, command):
-        epdconfig.digital_write(self.dc_pin, 0)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([command])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    def send_data(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([data])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    # send a lot of data   
-    def send_data2(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte2(data)
-        epdconfig.digital_write(self.cs_pin, 1)
-        
-    def ReadBusy(self):
-        logger.debug("e-Paper busy")
-        while(epdconfig.digital_read(self.busy_pin) == 1):      #  0: idle, 1: busy
-            epdconfig.delay_ms(200)
-        logger.debug("e-Paper busy release")
-
     def TurnOnDisplay(self):
         self.send_command(0x22)
         self.send_data(0xF7)          
         self.send_command(0x20)			# DISPLAY REFRESH 	
-        epdconfig.delay_ms(100)	        # The delay here is necessary, 200uS at least!!!     
+        self.config.delay_ms(100)	        # The delay here is necessary, 200uS at least!!!     
         self.ReadBusy()                 # waiting for the electronic paper IC to release the idle signal
 
     def TurnOnDisplay_Fast(self):
         self.send_command(0x22)
         self.send_data(0xC7)          
         self.send_command(0x20)			# DISPLAY REFRESH 	
-        epdconfig.delay_ms(100)	        # The delay here is necessary, 200uS at least!!!     
+        self.config.delay_ms(100)	        # The delay here is necessary, 200uS at least!!!     
         self.ReadBusy()                 # waiting for the electronic paper IC to release the idle signal
 
     def TurnOnDisplay_Partial(self):
         self.send_command(0x22)
         self.send_data(0xFF)          
         self.send_command(0x20)			# DISPLAY REFRESH 	
-        epdconfig.delay_ms(100)	        # The delay here is necessary, 200uS at least!!!     
+        self.config.delay_ms(100)	        # The delay here is necessary, 200uS at least!!!     
         self.ReadBusy()                 # waiting for the electronic paper IC to release the idle signal
 
     def TurnOnDisplay_4GRAY(self):
         self.send_command(0x22)
         self.send_data(0xCF)          
         self.send_command(0x20)			# DISPLAY REFRESH 	
-        epdconfig.delay_ms(100)	        # The delay here is necessary, 200uS at least!!!     
+        self.config.delay_ms(100)	        # The delay here is necessary, 200uS at least!!!     
         self.ReadBusy()                 # waiting for the electronic paper IC to release the idle signal
 
     def EPD_5in79_Lut(self):
@@ -177,347 +203,117 @@ class EPD:
         self.send_data(self.LUT_DATA_4Gray[232]) 
 
     def init(self):
-        if (epdconfig.module_init() != 0):
+        if (self.module_init() != 0):
             return -1
             
         self.reset()
-        self.ReadBusy()             # waiting for the electronic paper IC to release the idle signal
-        self.send_command(0x12)     # POWER ON
-        self.ReadBusy()             # waiting for the electronic paper IC to release the idle signal
-
-        self.send_command(0x11)
-        self.send_data(0x01)
-
-        self.send_command(0x44)	    #  Set Ram X- address Start / End position
-        self.send_data(0x00)        #  XStart, POR = 00h
-        self.send_data(0x31)        # 400/8-1
-        self.send_command(0x45)     #  Set Ram Y- address  Start / End position 
-        self.send_data(0x0f)  
-        self.send_data(0x01)        # 300-1	
-        self.send_data(0x00)        #  YEnd L
-        self.send_data(0x00)        #  YEnd H 
-
-        self.send_command(0x4e)	 						 
-        self.send_data(0x00)	
-        self.send_command(0x4f)	 
-        self.send_data(0x0f)  
-        self.send_data(0x01) 	
-
-        self.ReadBusy()   
-
-        self.send_command(0x91)
-        self.send_data(0x00)
-
-        self.send_command(0xC4)     #  Set Ram X- address Start / End position
-        self.send_data(0x31)        #  XStart, POR = 00h
-        self.send_data(0x00)        # 400/8-1
-        self.send_command(0xC5)     #  Set Ram Y- address  Start / End position 
-        self.send_data(0x0f)  
-        self.send_data(0x01)        # 300-1	
-        self.send_data(0x00)        # YEnd L
-        self.send_data(0x00)        # YEnd H 
-
-        self.send_command(0xCE)	 						 
-        self.send_data(0x31)	
-        self.send_command(0xCF)	 
-        self.send_data(0x0f)  
-        self.send_data(0x01)
-
-        self.ReadBusy()   
+        epdseq.run(self, INIT)
 
         return 0
 
     def init_Fast(self):
-        if (epdconfig.module_init() != 0):
+        if (self.module_init() != 0):
             return -1
             
         self.reset()
-        self.ReadBusy()
-        self.send_command(0x12)
-        self.ReadBusy()
-
-        self.send_command(0x18)
-        self.send_data(0x80)	
-
-        self.send_command(0x22)
-        self.send_data(0xB1)		
-        self.send_command(0x20)	
-        self.ReadBusy()   
-
-        self.send_command(0x1A)
-        self.send_data(0x64)		
-        self.send_data(0x00)	
-                
-        self.send_command(0x22)
-        self.send_data(0x91)		
-        self.send_command(0x20)	
-        self.ReadBusy()   
-
-        self.send_command(0x11)
-        self.send_data(0x01)
-
-        self.send_command(0x44)
-        self.send_data(0x00)
-        self.send_data(0x31)
-        self.send_command(0x45)
-        self.send_data(0x0f)  
-        self.send_data(0x01)
-        self.send_data(0x00)
-        self.send_data(0x00)
-
-        self.send_command(0x4e)	 						 
-        self.send_data(0x00)	
-        self.send_command(0x4f)	 
-        self.send_data(0x0f)  
-        self.send_data(0x01) 	
-
-        self.ReadBusy()   
-
-        self.send_command(0x91)
-        self.send_data(0x00)
-
-        self.send_command(0xC4)
-        self.send_data(0x31)
-        self.send_data(0x00)
-        self.send_command(0xC5)
-        self.send_data(0x0f)  
-        self.send_data(0x01)
-        self.send_data(0x00)
-        self.send_data(0x00)
-
-        self.send_command(0xCe)	 						 
-        self.send_data(0x31)	
-        self.send_command(0xCf)	 
-        self.send_data(0x0f)  
-        self.send_data(0x01)
-
-        self.ReadBusy()   
+        epdseq.run(self, INIT_FAST)
 
         return 0
     
     def init_Partial(self):
-        if (epdconfig.module_init() != 0):
+        if (self.module_init() != 0):
             return -1
             
         self.reset()
-        self.ReadBusy()
-        self.send_command(0x12)
-        self.ReadBusy() 
-
-        self.send_command(0x3C)
-        self.send_data(0x80)
+        epdseq.run(self, INIT_PARTIAL)
 
         return 0
     
     def init_4Gray(self):
-        if (epdconfig.module_init() != 0):
+        if (self.module_init() != 0):
             return -1
             
         self.reset()
-        self.ReadBusy()   
-        self.send_command(0x12) 
-        self.ReadBusy() 
-
-        self.send_command(0x0C)     
-        self.send_data(0x8B)    
-        self.send_data(0x9C)    
-        self.send_data(0xA6)    
-        self.send_data(0x0F)
-
-        self.send_command(0x3C)
-        self.send_data(0x81)
-
-        self.ReadBusy()	
-
-        self.send_command(0x11)
-        self.send_data(0x01)
-
-        self.send_command(0x44)
-        self.send_data(0x00)
-        self.send_data(0x31)
-        self.send_command(0x45)
-        self.send_data(0x0f)  
-        self.send_data(0x01)
-        self.send_data(0x00)
-        self.send_data(0x00)
-
-        self.send_command(0x4e)	 						 
-        self.send_data(0x00)	
-        self.send_command(0x4f)	 
-        self.send_data(0x0f)  
-        self.send_data(0x01) 	
-
-        self.ReadBusy()   
-
-        self.send_command(0x91)
-        self.send_data(0x00)
-
-        self.send_command(0xC4)
-        self.send_data(0x31)
-        self.send_data(0x00)
-        self.send_command(0xC5)
-        self.send_data(0x0f)  
-        self.send_data(0x01)
-        self.send_data(0x00)
-        self.send_data(0x00)
-
-        self.send_command(0xCe)	 						 
-        self.send_data(0x31)	
-        self.send_command(0xCf)	 
-        self.send_data(0x0f)  
-        self.send_data(0x01)
+        epdseq.run(self, INIT_4GRAY)
 
         self.EPD_5in79_Lut()
         return 0
 
-    def getbuffer(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width / 8) * self.height)
-        image_monocolor = image.convert('1')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if imwidth == self.width and imheight == self.height:
-            logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0:
-                        buf[int((x + y * self.width) / 8)] &= ~(0x80 >> (x % 8))
-        elif imwidth == self.height and imheight == self.width:
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        buf[int((newx + newy * self.width) / 8)] &= ~(0x80 >> (y % 8))
-        return buf
-    
     def getbuffer_4Gray(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width / 4) * self.height)
-        image_monocolor = image.convert('L')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        i=0
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if(imwidth == self.width and imheight == self.height):
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if(pixels[x, y] == 0xC0):
-                        pixels[x, y] = 0x80
-                    elif (pixels[x, y] == 0x80):
-                        pixels[x, y] = 0x40
-                    i= i+1
-                    if(i%4 == 0):
-                        buf[int((x + (y * self.width))/4)] = ((pixels[x-3, y]&0xc0) | (pixels[x-2, y]&0xc0)>>2 | (pixels[x-1, y]&0xc0)>>4 | (pixels[x, y]&0xc0)>>6)
-                        
-        elif(imwidth == self.height and imheight == self.width):
-            logger.debug("Horizontal")
-            for x in range(imwidth):
-                for y in range(imheight):
-                    newx = y
-                    newy = self.height - x - 1
-                    if(pixels[x, y] == 0xC0):
-                        pixels[x, y] = 0x80
-                    elif (pixels[x, y] == 0x80):
-                        pixels[x, y] = 0x40
-                    i= i+1
-                    if(i%4 == 0):
-                        buf[int((newx + (newy * self.width))/4)] = ((pixels[x, y-3]&0xc0) | (pixels[x, y-2]&0xc0)>>2 | (pixels[x, y-1]&0xc0)>>4 | (pixels[x, y]&0xc0)>>6) 
-        return buf
+        return epdbuffer.getbuffer_4gray(image, self.width, self.height)
 
     def display(self, imageblack):
-        Width =int(self.width / 16)+1
-        Width1 =int(self.width / 8)
-        
+        master, slave = self.halves(imageblack)
+
         self.send_command(0x24)
-        for i in range(self.height):
-            self.send_data2(imageblack[i * Width1 : i * Width1+Width])
+        self.send_data2(master)
         self.send_command(0X26)
-        self.send_data2([0x00] * 13600)
+        self.send_data2(epdbuffer.constant_plane(13600, 0x00))
 
         self.send_command(0xA4)
-        for i in range(self.height):
-            self.send_data2(imageblack[i * Width1 + Width - 1 : i * Width1 + Width * 2 - 1])
+        self.send_data2(slave)
         self.send_command(0xA6)
-        self.send_data2([0x00] * 13600)
+        self.send_data2(epdbuffer.constant_plane(13600, 0x00))
 
         self.TurnOnDisplay()
 
     def display_Base(self, imageblack):
-        Width =int(self.width / 16)+1
-        Width1 =int(self.width / 8)
-        
+        master, slave = self.halves(imageblack)
+
         self.send_command(0x24)
-        for i in range(self.height):
-            self.send_data2(imageblack[i * Width1 : i * Width1+Width])
+        self.send_data2(master)
         self.send_command(0X26)
-        self.send_data2([0x00] * 13600)
+        self.send_data2(epdbuffer.constant_plane(13600, 0x00))
 
         self.send_command(0xA4)
-        for i in range(self.height):
-            self.send_data2(imageblack[i * Width1 + Width - 1 : i * Width1 + Width * 2 - 1])
+        self.send_data2(slave)
         self.send_command(0xA6)
-        self.send_data2([0x00] * 13600)
+        self.send_data2(epdbuffer.constant_plane(13600, 0x00))
 
         self.TurnOnDisplay()
 
         self.send_command(0x26)
-        for i in range(self.height):
-            self.send_data2(imageblack[i * Width1 : i * Width1+Width])
+        self.send_data2(master)
 
         self.send_command(0xA6)
-        for i in range(self.height):
-            self.send_data2(imageblack[i * Width1 + Width - 1 : i * Width1 + Width * 2 - 1])
+        self.send_data2(slave)
 
     def display_Base_color(self, color):
-        Width =int(self.width / 16)+1
-        Width1 =int(self.width / 8)
-        
         self.send_command(0x24)
-        self.send_data2([color] * 13600)
+        self.send_data2(epdbuffer.constant_plane(13600, color))
         self.send_command(0X26)
-        self.send_data2([0x00] * 13600)
+        self.send_data2(epdbuffer.constant_plane(13600, 0x00))
 
         self.send_command(0xA4)
-        self.send_data2([color] * 13600)
+        self.send_data2(epdbuffer.constant_plane(13600, color))
         self.send_command(0xA6)
-        self.send_data2([0x00] * 13600)
+        self.send_data2(epdbuffer.constant_plane(13600, 0x00))
 
         self.TurnOnDisplay()
 
         self.send_command(0x26)
-        self.send_data2([color] * 13600)
+        self.send_data2(epdbuffer.constant_plane(13600, color))
 
         self.send_command(0xA6)
-        self.send_data2([color] * 13600)
+        self.send_data2(epdbuffer.constant_plane(13600, color))
 
     def display_Fast(self, imageblack):
-        Width =int(self.width / 16)+1
-        Width1 =int(self.width / 8)
-        
+        master, slave = self.halves(imageblack)
+
         self.send_command(0x24)
-        for i in range(self.height):
-            self.send_data2(imageblack[i * Width1 : i * Width1+Width])
+        self.send_data2(master)
         self.send_command(0X26)
-        self.send_data2([0x00] * 13600)
+        self.send_data2(epdbuffer.constant_plane(13600, 0x00))
 
         self.send_command(0xA4)
-        for i in range(self.height):
-            self.send_data2(imageblack[i * Width1 + Width - 1 : i * Width1 + Width * 2 - 1])
+        self.send_data2(slave)
         self.send_command(0xA6)
-        self.send_data2([0x00] * 13600)
+        self.send_data2(epdbuffer.constant_plane(13600, 0x00))
 
         self.TurnOnDisplay_Fast()
     
     def display_Partial(self, Image):
-        Width =int(self.width / 16)+1
-        Width1 =int(self.width / 8)
-        Height = self.height
+        master, slave = self.halves(Image)
 
         self.send_command(0x22)
         self.send_data(0xc0)
@@ -546,8 +342,7 @@ class EPD:
         self.send_data(0x01) 	
 
         self.send_command(0x24)
-        for i in range(Height):
-            self.send_data2(Image[i * Width1 : i * Width1+Width])
+        self.send_data2(master)
 
         self.send_command(0xC4)		    # Set Ram X- address Start / End position
         self.send_data(0x31)     		# XStart, POR = 00h
@@ -565,112 +360,38 @@ class EPD:
         self.send_data(0x01)
 
         self.send_command(0xA4)
-        for i in range(Height):
-            self.send_data2(Image[i * Width1 + Width - 1 : i * Width1 + Width * 2 - 1])
+        self.send_data2(slave)
 
         self.TurnOnDisplay_Partial()
 
 
     def display_4Gray(self, image):
-        Width =int(self.width / 16)+1
-        Width1 =int(self.width / 8)
+        high, low = epdbuffer.gray4_planes(image)
+        low_master, low_slave = self.halves(low)
+        high_master, high_slave = self.halves(high)
 
         self.send_command(0x24)
-        for j in range(self.height):   
-            for i in range(Width):
-                temp3=0
-                for o in range(0, 2):
-                    temp1 = image[(j * Width1 + i)*2+o]
-                    for k in range(0, 4):
-                        temp2 = temp1&0xC0 
-                        if(temp2 == 0xC0):
-                            temp3 |= 0x01
-                        elif(temp2 == 0x00):
-                            temp3 |= 0x00  
-                        elif(temp2 == 0x80): 
-                            temp3 |= 0x00 
-                        else: #0x40
-                            temp3 |= 0x01 
-                        if(o!=1 or k!=3):
-                            temp3 <<= 1
-                        temp1 <<= 2
-                self.send_data(temp3)
-            
-        self.send_command(0x26)	       
-        for j in range(self.height):   
-            for i in range(Width):
-                temp3=0
-                for o in range(0, 2):
-                    temp1 = image[(j * Width1 + i)*2+o]
-                    for k in range(0, 4):
-                        temp2 = temp1&0xC0 
-                        if(temp2 == 0xC0):
-                            temp3 |= 0x01
-                        elif(temp2 == 0x00):
-                            temp3 |= 0x00  
-                        elif(temp2 == 0x80): 
-                            temp3 |= 0x01 
-                        else: #0x40
-                            temp3 |= 0x00 
-                        if(o!=1 or k!=3):
-                            temp3 <<= 1
-                        temp1 <<= 2
-                self.send_data(temp3)
+        self.send_data2(low_master)
+        self.send_command(0x26)
+        self.send_data2(high_master)
 
         self.send_command(0xA4)
-        for j in range(self.height):   
-            for i in range(Width):
-                temp3=0
-                for o in range(0, 2):
-                    temp1 = image[(j * Width1 + i + Width - 1)*2+o]
-                    for k in range(0, 4):
-                        temp2 = temp1&0xC0 
-                        if(temp2 == 0xC0):
-                            temp3 |= 0x01
-                        elif(temp2 == 0x00):
-                            temp3 |= 0x00  
-                        elif(temp2 == 0x80): 
-                            temp3 |= 0x00 
-                        else: #0x40
-                            temp3 |= 0x01 
-                        if(o!=1 or k!=3):
-                            temp3 <<= 1
-                        temp1 <<= 2
-                self.send_data(temp3)
-            
-        self.send_command(0xA6)	       
-        for j in range(self.height):   
-            for i in range(Width):
-                temp3=0
-                for o in range(0, 2):
-                    temp1 = image[(j * Width1 + i + Width - 1)*2+o]
-                    for k in range(0, 4):
-                        temp2 = temp1&0xC0 
-                        if(temp2 == 0xC0):
-                            temp3 |= 0x01
-                        elif(temp2 == 0x00):
-                            temp3 |= 0x00  
-                        elif(temp2 == 0x80): 
-                            temp3 |= 0x01 
-                        else: #0x40
-                            temp3 |= 0x00 
-                        if(o!=1 or k!=3):
-                            temp3 <<= 1
-                        temp1 <<= 2
-                self.send_data(temp3)
-        
+        self.send_data2(low_slave)
+        self.send_command(0xA6)
+        self.send_data2(high_slave)
+
         self.TurnOnDisplay_4GRAY()
 
     def Clear(self):
         self.send_command(0x24)
-        self.send_data2([0xFF] * 13600)
+        self.send_data2(epdbuffer.constant_plane(13600, 0xFF))
         self.send_command(0X26)
-        self.send_data2([0x00] * 13600)
+        self.send_data2(epdbuffer.constant_plane(13600, 0x00))
 
         self.send_command(0xA4)
-        self.send_data2([0xFF] * 13600)
+        self.send_data2(epdbuffer.constant_plane(13600, 0xFF))
         self.send_command(0xA6)
-        self.send_data2([0x00] * 13600)
+        self.send_data2(epdbuffer.constant_plane(13600, 0x00))
 
         self.TurnOnDisplay()
 
@@ -678,7 +399,7 @@ class EPD:
         self.send_command(0X10) # deep sleep
         self.send_data(0x03)
         
-        epdconfig.delay_ms(2000)
-        epdconfig.module_exit()
+        self.config.delay_ms(2000)
+        self.module_exit()
 ### END OF FILE ###
 
@@ -29,7 +29,9 @@
 
 
 import logging
-from . import epdconfig
+from . import epdbuffer
+from . import epdbase
+from . import epdseq
 
 import PIL
 from PIL import Image
@@ -39,60 +41,49 @@ import io
 EPD_WIDTH       = 792
 EPD_HEIGHT      = 272
 
+# Palette index order expected by the controller
+PALETTE = ((0, 0, 0), (255, 255, 255), (255, 255, 0), (255, 0, 0))
+
 logger = logging.getLogger(__name__)
 
-class EPD:
-    def __init__(self):
-        self.reset_pin = epdconfig.RST_PIN
-        self.dc_pin = epdconfig.DC_PIN
-        self.busy_pin = epdconfig.BUSY_PIN
-        self.cs_pin = epdconfig.CS_PIN
-        self.width = EPD_WIDTH
-        self.height = EPD_HEIGHT
+# Init sequences: (command, payload, delay_ms, wait_busy)
+INIT = epdseq.sequence(
+    (None, [], 0, 'ReadBusyH'),
+    (0xA2, [0x01]),
+    (0x00, [0x03, 0x29]),
+    (0xA2, [0x02]),
+    (0x00, [0x07, 0x29]),
+    (0xA2, [0x00]),
+    (0x50, [0x97]),
+    (0x61, [0x01, 0x8c, 0x01, 0x10]),
+    (0x06, [0x38, 0x38, 0x38, 0x00]),
+    (0xE9, [0x01]),
+    (0xE0, [0x01]),
+    (0x04, [], 0, 'ReadBusyH'),
+)
+
+
+class EPD(epdbase.UC81xx):
+    RESET_MS = (200, 1, 200)
+    PALETTE = PALETTE
+    PALETTE_BPP = 2
+
+    def __init__(self, config=None):
+        super().__init__(EPD_WIDTH, EPD_HEIGHT, config)
         self.BLACK  = 0x000000   #   00  BGR
         self.WHITE  = 0xffffff   #   01
         self.YELLOW = 0x00ffff   #   10
         self.RED    = 0x0000ff   #   11
 
-    # Hardware reset
-    def reset(self):
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200) 
-        epdconfig.digital_write(self.reset_pin, 0)
-        epdconfig.delay_ms(1)
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200)   
-
-    def send_command(self, command):
-        epdconfig.digital_write(self.dc_pin, 0)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([command])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    def send_data(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([data])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    # send a lot of data   
-    def send_data2(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte2(data)
-        epdconfig.digital_write(self.cs_pin, 1)
-        
     def ReadBusyH(self):
         logger.debug("e-Paper busy H")
-        while(epdconfig.digital_read(self.busy_pin) == 0):      # 0: idle, 1: busy
-            epdconfig.delay_ms(5)
-        epdconfig.delay_ms(200)
+        self.wait_busy(0)      # 0: idle, 1: busy
+        self.config.delay_ms(200)
         logger.debug("e-Paper busy H release")
 
     def ReadBusyL(self):
         logger.debug("e-Paper busy L")
-        while(epdconfig.digital_read(self.busy_pin) == 1):      # 0: busy, 1: idle
-            epdconfig.delay_ms(5)
+        self.wait_busy(1)      # 0: busy, 1: idle
         logger.debug("e-Paper busy L release")
 
     def TurnOnDisplay(self):
@@ -101,87 +92,18 @@ class EPD:
 
         self.send_command(0x12)	
         self.send_data(0x00)
-        epdconfig.delay_ms(100)	    
+        self.config.delay_ms(100)	    
         self.ReadBusyH()
             
     def init(self):
-        if (epdconfig.module_init() != 0):
+        if (self.module_init() != 0):
             return -1
             
         self.reset()
 
-        self.ReadBusyH()      
-
-        self.send_command(0xA2)
-        self.send_data(0x01)
-
-        self.send_command(0x00)
-        self.send_data(0x03)	
-        self.send_data(0x29)
-
-        self.send_command(0xA2)
-        self.send_data(0x02)	
-
-        self.send_command(0x00)
-        self.send_data(0x07)	
-        self.send_data(0x29)
-
-        self.send_command(0xA2)
-        self.send_data(0x00)	
-
-        self.send_command(0x50)
-        self.send_data(0x97)	
-
-        self.send_command(0x61)
-        self.send_data(0x01)	
-        self.send_data(0x8c)	
-        self.send_data(0x01)	
-        self.send_data(0x10) 	
-
-        self.send_command(0x06)
-        self.send_data(0x38)	
-        self.send_data(0x38)
-        self.send_data(0x38)
-        self.send_data(0x00)
-
-
-        self.send_command(0xE9)
-        self.send_data(0x01)
-
-
-        self.send_command(0xE0)
-        self.send_data(0x01)
-
-        self.send_command(0x04)
-        self.ReadBusyH()	
+        epdseq.run(self, INIT)
         return 0
 
-    def getbuffer(self, image):
-        # Create a pallette with the 4 colors supported by the panel
-        pal_image = Image.new("P", (1,1))
-        pal_image.putpalette( (0,0,0,  255,255,255,  255,255,0,   255,0,0) + (0,0,0)*252)
-
-        # Check if we need to rotate the image
-        imwidth, imheight = image.size
-        if(imwidth == self.width and imheight == self.height):
-            image_temp = image
-        elif(imwidth == self.height and imheight == self.width):
-            image_temp = image.rotate(90, expand=True)
-        else:
-            logger.warning("Invalid image dimensions: %d x %d, expected %d x %d" % (imwidth, imheight, self.width, self.height))
-
-        # Convert the soruce image to the 4 colors, dithering if needed
-        image_4color = image_temp.convert("RGB").quantize(palette=pal_image)
-        buf_4color = bytearray(image_4color.tobytes('raw'))
-
-        # into a single byte to transfer to the panel
-        buf = [0x00] * int(self.width * self.height / 4)
-        idx = 0
-        for i in range(0, len(buf_4color), 4):
-            buf[idx] = (buf_4color[i] << 6) + (buf_4color[i+1] << 4) + (buf_4color[i+2] << 2) + buf_4color[i+3]
-            idx += 1
-        return buf
-
     def display(self, image):
         Width =int(self.width / 8)
         Width1 =int(self.width / 4)
@@ -207,12 +129,12 @@ class EPD:
         self.send_command(0xA2)
         self.send_data(0x02)
         self.send_command(0x10)
-        self.send_data2([color] * int(self.height) * int(self.width/8))
+        self.send_data2(epdbuffer.constant_plane(int(self.height) * int(self.width/8), color))
 
         self.send_command(0xA2)
         self.send_data(0x01)
         self.send_command(0x10)
-        self.send_data2([color] * int(self.height) * int(self.width/8))
+        self.send_data2(epdbuffer.constant_plane(int(self.height) * int(self.width/8), color))
 
         self.TurnOnDisplay()
 
@@ -220,7 +142,7 @@ class EPD:
         self.send_command(0X10) # deep sleep
         self.send_data(0x03)
         
-        epdconfig.delay_ms(2000)
-        epdconfig.module_exit()
+        self.config.delay_ms(2000)
+        self.module_exit()
 ### END OF FILE ###
 
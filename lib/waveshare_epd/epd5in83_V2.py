@@ -29,7 +29,9 @@
 #
 
 import logging
-from . import epdconfig
+from . import epdbuffer
+from . import epdbase
+from . import epdseq
 
 import PIL
 import time
@@ -47,57 +49,49 @@ GRAY4  = 0x00 #Blackest
 
 logger = logging.getLogger(__name__)
 
-class EPD:
-    def __init__(self):
-        self.reset_pin = epdconfig.RST_PIN
-        self.dc_pin = epdconfig.DC_PIN
-        self.busy_pin = epdconfig.BUSY_PIN
-        self.cs_pin = epdconfig.CS_PIN
-        self.width = EPD_WIDTH
-        self.height = EPD_HEIGHT
+# Init sequences: (command, payload, delay_ms, wait_busy)
+INIT = epdseq.sequence(
+    (0x00, [0x1F]),
+    (0x04, []),
+)
+
+INIT_FAST = epdseq.sequence(
+    (0x00, [0x1F]),
+    (0x50, [0x29, 0x07]),
+    (0xE0, [0x02]),
+    (0xE5, [0x5A]),
+    (0x04, [], 100, True),
+)
+
+INIT_PART = epdseq.sequence(
+    (0x00, [0x1F]),
+    (0xE0, [0x02]),
+    (0xE5, [0x6E]),
+    (0x04, [], 100, True),
+)
+
+INIT_4GRAY = epdseq.sequence(
+    (0x00, [0x1F]),
+    (0x06, [0x27, 0x27, 0x18, 0x17]),
+    (0x50, [0x21, 0x07]),
+    (0xE0, [0x02]),
+    (0xE5, [0x5F]),
+    (0x04, [], 100, True),
+)
+
+
+class EPD(epdbase.UC81xx):
+    def __init__(self, config=None):
+        super().__init__(EPD_WIDTH, EPD_HEIGHT, config)
         self.GRAY1  = GRAY1 #white
         self.GRAY2  = GRAY2
         self.GRAY3  = GRAY3 #gray
         self.GRAY4  = GRAY4 #Blackest
         
 
-    # Hardware reset
-    def reset(self):
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200) 
-        epdconfig.digital_write(self.reset_pin, 0)         # module reset
-        epdconfig.delay_ms(2)
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200)   
-
-    def send_command(self, command):
-        epdconfig.digital_write(self.dc_pin, 0)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([command])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    def send_data(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([data])
-        epdconfig.digital_write(self.cs_pin, 1)
-        
-    # send a lot of data   
-    def send_data2(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte2(data)
-        epdconfig.digital_write(self.cs_pin, 1)
-        
-    def ReadBusy(self):
-        logger.debug("e-Paper busy H")
-        while(epdconfig.digital_read(self.busy_pin) == 0):
-            epdconfig.delay_ms(10)
-        logger.debug("e-Paper busy H release")
-
     def TurnOnDisplay(self):
         self.send_command(0x12)  
-        epdconfig.delay_ms(100)
+        self.config.delay_ms(100)
         self.ReadBusy()
 
     def SetWindow(self, x_start, y_start, x_end, y_end):
@@ -117,16 +111,13 @@ class EPD:
        
         
     def init(self):
-        if (epdconfig.module_init() != 0):
+        if (self.module_init() != 0):
             return -1
         # EPD hardware init start
         self.reset()
 
-        self.send_command(0x00)
-        self.send_data(0x1F)
-
-        self.send_command(0x04)
-        epdconfig.delay_ms(300)
+        epdseq.run(self, INIT)
+        self.config.delay_ms(300)
         self.ReadBusy()
 
         self.send_command(0x50)   
@@ -134,132 +125,31 @@ class EPD:
         self.send_data(0x07)
 
     def init_Fast(self):
-        if (epdconfig.module_init() != 0):
+        if (self.module_init() != 0):
             return -1
         # EPD hardware init start
         self.reset()
 
-        self.send_command(0x00)
-        self.send_data(0x1F)
-
-        self.send_command(0x50)   
-        self.send_data(0x29)
-        self.send_data(0x07)
-
-        self.send_command(0xE0)   
-        self.send_data(0x02)
-        self.send_command(0xE5)   
-        self.send_data(0x5A)
-
-        self.send_command(0x04)
-        epdconfig.delay_ms(100)
-        self.ReadBusy()
+        epdseq.run(self, INIT_FAST)
 
     def init_Part(self):
-        if (epdconfig.module_init() != 0):
+        if (self.module_init() != 0):
             return -1
         # EPD hardware init start
         self.reset()
 
-        self.send_command(0x00)
-        self.send_data(0x1F)
-
-        self.send_command(0xE0)   
-        self.send_data(0x02)
-        self.send_command(0xE5)   
-        self.send_data(0x6E)
-
-        self.send_command(0x04)
-        epdconfig.delay_ms(100)
-        self.ReadBusy()
+        epdseq.run(self, INIT_PART)
 
     def init_4GRAY(self):
-        if (epdconfig.module_init() != 0):
+        if (self.module_init() != 0):
             return -1
         # EPD hardware init start
         self.reset()
 
-        self.send_command(0x00)  
-        self.send_data(0x1F)
-
-        self.send_command(0x06)
-        self.send_data(0x27)
-        self.send_data(0x27)
-        self.send_data(0x18)
-        self.send_data(0x17)
-        
-        self.send_command(0x50)  
-        self.send_data(0x21)
-        self.send_data(0x07)
-
-        self.send_command(0xE0)
-        self.send_data(0x02)
-        self.send_command(0xE5)
-        self.send_data(0x5F)
-
-        self.send_command(0x04)
-        epdconfig.delay_ms(100)
-        self.ReadBusy()
+        epdseq.run(self, INIT_4GRAY)
         
-    def getbuffer(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width / 8) * self.height)
-        image_monocolor = image.convert('1')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if imwidth == self.width and imheight == self.height:
-            logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0:
-                        buf[int((x + y * self.width) / 8)] &= ~(0x80 >> (x % 8))
-        elif imwidth == self.height and imheight == self.width:
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        buf[int((newx + newy * self.width) / 8)] &= ~(0x80 >> (y % 8))
-        return buf  
-
     def getbuffer_4Gray(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width / 4) * self.height)
-        image_monocolor = image.convert('L')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        i=0
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if(imwidth == self.width and imheight == self.height):
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if(pixels[x, y] == 0xC0):
-                        pixels[x, y] = 0x80
-                    elif (pixels[x, y] == 0x80):
-                        pixels[x, y] = 0x40
-                    i= i+1
-                    if(i%4 == 0):
-                        buf[int((x + (y * self.width))/4)] = ((pixels[x-3, y]&0xc0) | (pixels[x-2, y]&0xc0)>>2 | (pixels[x-1, y]&0xc0)>>4 | (pixels[x, y]&0xc0)>>6)
-                        
-        elif(imwidth == self.height and imheight == self.width):
-            logger.debug("Horizontal")
-            for x in range(imwidth):
-                for y in range(imheight):
-                    newx = y
-                    newy = self.height - x - 1
-                    if(pixels[x, y] == 0xC0):
-                        pixels[x, y] = 0x80
-                    elif (pixels[x, y] == 0x80):
-                        pixels[x, y] = 0x40
-                    i= i+1
-                    if(i%4 == 0):
-                        buf[int((newx + (newy * self.width))/4)] = ((pixels[x, y-3]&0xc0) | (pixels[x, y-2]&0xc0)>>2 | (pixels[x, y-1]&0xc0)>>4 | (pixels[x, y]&0xc0)>>6) 
-        return buf
+        return epdbuffer.getbuffer_4gray(image, self.width, self.height)
 
     def display(self, image):
         self.send_command(0x10)
@@ -292,81 +182,20 @@ class EPD:
         self.send_command(0x92)
 
     def display_4Gray(self, image):
-        width = self.width // 8
-        height = self.height
-        IMAGE_COUNTER = width * height
-
+        high, low = epdbuffer.gray4_planes(image)
         self.send_command(0x10)
-        for i in range(0, IMAGE_COUNTER):                     #5808*4  46464
-            temp3=0
-            for j in range(0, 2):
-                temp1 = image[i*2+j]
-                for k in range(0, 2):
-                    temp2 = temp1&0xC0 
-                    if(temp2 == 0xC0):
-                        temp3 |= 0x01
-                    elif(temp2 == 0x00):
-                        temp3 |= 0x00  
-                    elif(temp2 == 0x80): 
-                        temp3 |= 0x00 
-                    else: #0x40
-                        temp3 |= 0x01
-                    temp3 <<= 1	
-                    
-                    temp1 <<= 2
-                    temp2 = temp1&0xC0 
-                    if(temp2 == 0xC0): 
-                        temp3 |= 0x01
-                    elif(temp2 == 0x00): 
-                        temp3 |= 0x00
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x00
-                    else :   #0x40
-                        temp3 |= 0x01	
-                    if(j!=1 or k!=1):				
-                        temp3 <<= 1
-                    temp1 <<= 2
-            self.send_data(temp3)
-            
-        self.send_command(0x13)	       
-        for i in range(0, IMAGE_COUNTER):                #5808*4  46464
-            temp3=0
-            for j in range(0, 2):
-                temp1 = image[i*2+j]
-                for k in range(0, 2):
-                    temp2 = temp1&0xC0 
-                    if(temp2 == 0xC0):
-                        temp3 |= 0x01
-                    elif(temp2 == 0x00):
-                        temp3 |= 0x00
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x01
-                    else: #0x40
-                        temp3 |= 0x00 
-                    temp3 <<= 1	
-                    
-                    temp1 <<= 2
-                    temp2 = temp1&0xC0 
-                    if(temp2 == 0xC0): 
-                        temp3 |= 0x01
-                    elif(temp2 == 0x00): 
-                        temp3 |= 0x00
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x01 
-                    else:    #0x40
-                        temp3 |= 0x00	
-                    if(j!=1 or k!=1):					
-                        temp3 <<= 1
-                    temp1 <<= 2
-            self.send_data(temp3)
-        
+        self.send_data2(low)
+
+        self.send_command(0x13)
+        self.send_data2(high)
+
         self.TurnOnDisplay()
 
     def Clear(self):
         self.send_command(0x10)
-        self.send_data2([0xFF] * int(self.height) * int(self.width/8))
+        self.send_data2(epdbuffer.constant_plane(int(self.height) * int(self.width/8), 0xFF))
         self.send_command(0x13)
-        self.send_data2([0xFF] * int(self.height) * int(self.width/8))
+        self.send_data2(epdbuffer.constant_plane(int(self.height) * int(self.width/8), 0xFF))
 
         self.TurnOnDisplay()
 
@@ -378,8 +207,8 @@ class EPD:
         self.send_command(0x07) # DEEP_SLEEP
         self.send_data(0XA5)
 
-        epdconfig.delay_ms(2000)
-        epdconfig.module_exit()
+        self.config.delay_ms(2000)
+        self.module_exit()
 
 ### END OF FILE ###
 
@@ -29,7 +29,9 @@
 
 
 import logging
-from . import epdconfig
+from . import epdbuffer
+from . import epdbase
+from . import epdseq
 
 # Display resolution
 EPD_WIDTH       = 880
@@ -37,65 +39,36 @@ EPD_HEIGHT      = 528
 
 logger = logging.getLogger(__name__)
 
-class EPD:
-    def __init__(self):
-        self.reset_pin = epdconfig.RST_PIN
-        self.dc_pin = epdconfig.DC_PIN
-        self.busy_pin = epdconfig.BUSY_PIN
-        self.cs_pin = epdconfig.CS_PIN
-        self.width = EPD_WIDTH
-        self.height = EPD_HEIGHT
+# Init sequences: (command, payload, delay_ms, wait_busy)
+INIT = epdseq.sequence(
+    (None, [], 0, True),
+    (0x12, [], 0, True),                # SWRESET
+    (0x46, [0xf7], 0, True),            # Auto Write Red RAM
+    (0x47, [0xf7], 0, True),            # Auto Write B/W RAM
+)
+
+# init(), after send_data2()
+INIT_2 = epdseq.sequence(
+    (0x3C, [0x05]),                     # VBD: LUT1, for white
+    (0x18, [0x80]),
+    (0x22, [0xB1]),                     # Load Temperature and waveform setting.
+    (0x20, [], 0, True),
+)
+
+
+class EPD(epdbase.SSD16xx):
+    BUSY_SETTLE_MS = 200
+
+    def __init__(self, config=None):
+        super().__init__(EPD_WIDTH, EPD_HEIGHT, config)
     
-    # Hardware reset
-    def reset(self):
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200) 
-        epdconfig.digital_write(self.reset_pin, 0)
-        epdconfig.delay_ms(2)
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200)   
-
-    def send_command(self, command):
-        epdconfig.digital_write(self.dc_pin, 0)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([command])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    def send_data(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([data])
-        epdconfig.digital_write(self.cs_pin, 1)
-        
-    def send_data2(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte2(data)
-        epdconfig.digital_write(self.cs_pin, 1)
-        
-    def ReadBusy(self):
-        logger.debug("e-Paper busy")
-        busy = epdconfig.digital_read(self.busy_pin)
-        while(busy == 1):
-            busy = epdconfig.digital_read(self.busy_pin)
-        epdconfig.delay_ms(200)
-        
     def init(self):
-        if (epdconfig.module_init() != 0):
+        if (self.module_init() != 0):
             return -1
         # EPD hardware init start
         self.reset()
         
-        self.ReadBusy()
-        self.send_command(0x12)  #SWRESET
-        self.ReadBusy()
-
-        self.send_command(0x46)  # Auto Write Red RAM
-        self.send_data(0xf7)
-        self.ReadBusy()
-        self.send_command(0x47)  # Auto Write  B/W RAM
-        self.send_data(0xf7)
-        self.ReadBusy()
+        epdseq.run(self, INIT)
 
         self.send_command(0x0C)  # Soft start setting
         self.send_data2([0xAE, 0xC7, 0xC3, 0xC0, 0x40])
@@ -111,17 +84,7 @@ class EPD:
         self.send_command(0x45) 
         self.send_data2([0xAF, 0x02, 0x00, 0x00])
 
-        self.send_command(0x3C) # VBD
-        self.send_data(0x05) # LUT1, for white
-
-        self.send_command(0x18)
-        self.send_data(0X80)
-
-
-        self.send_command(0x22)
-        self.send_data(0XB1) #Load Temperature and waveform setting.
-        self.send_command(0x20)
-        self.ReadBusy()
+        epdseq.run(self, INIT_2)
 
         self.send_command(0x4E) # set RAM x address count to 0
         self.send_data2([0x00, 0x00])
@@ -131,19 +94,7 @@ class EPD:
         return 0
 
     def getbuffer(self, image):
-        img = image
-        imwidth, imheight = img.size
-        if(imwidth == self.width and imheight == self.height):
-            img = img.convert('1')
-        elif(imwidth == self.height and imheight == self.width):
-            img = img.rotate(90, expand=True).convert('1')
-        else:
-            logger.warning("Wrong image dimensions: must be " + str(self.width) + "x" + str(self.height))
-            # return a blank buffer
-            return [0xff] * int(self.width * self.height / 8)
-
-        buf = bytearray(img.tobytes('raw'))
-        return buf
+        return epdbuffer.getbuffer_1bpp(image, self.width, self.height, rotate_first=True)
         
     def display(self, image):
         self.send_command(0x4F) 
@@ -153,11 +104,11 @@ class EPD:
         self.send_command(0x22)
         self.send_data(0xF7)#Load LUT from MCU(0x32)
         self.send_command(0x20)
-        epdconfig.delay_ms(10)
+        self.config.delay_ms(10)
         self.ReadBusy()
         
     def Clear(self):
-        buf = [0xff] * int(self.width * self.height / 8)
+        buf = epdbuffer.constant_plane(int(self.width * self.height / 8), 0xff)
         self.send_command(0x4F) 
         self.send_data2([0x00, 0x00])
         self.send_command(0x24)
@@ -169,14 +120,14 @@ class EPD:
         self.send_command(0x22)
         self.send_data(0xF7)#Load LUT from MCU(0x32)
         self.send_command(0x20)
-        epdconfig.delay_ms(10)
+        self.config.delay_ms(10)
         self.ReadBusy()
 
     def sleep(self):
         self.send_command(0x10)
         self.send_data(0x01)
         
-        epdconfig.delay_ms(2000)
-        epdconfig.module_exit()
+        self.config.delay_ms(2000)
+        self.module_exit()
 ### END OF FILE ###
 
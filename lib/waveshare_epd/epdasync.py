@@ -0,0 +1,151 @@
+# *****************************************************************************
+# * | File        :	  epdasync.py
+# * | Function    :   asyncio facade for the e-Paper drivers
+# * | Info        :
+# *----------------
+# * | Info        :   AsyncEPD(epd) makes every driver method awaitable.
+# * |             :   delay_ms goes through asyncio.sleep and BUSY through
+# * |             :   an edge callback, so one event loop can drive the
+# * |             :   panel without parking a thread per operation.
+# ******************************************************************************
+
+import asyncio
+import functools
+import logging
+import threading
+
+from . import epdconfig
+
+logger = logging.getLogger(__name__)
+
+# SPI writes at least this long go to the default executor, shorter ones run inline
+EXECUTOR_BYTES = 1024
+
+class _Recorder:
+    """Stands in for the driver's config backend while a driver method runs.
+
+    Every hardware call becomes an op in ``ops``; nothing touches the pins.
+    The driver code only writes, waits and sleeps, so the whole call can be
+    recorded first and replayed later.
+    """
+
+    def __init__(self, config=epdconfig):
+        self.ops = []
+        self.config = config
+
+    def __getattr__(self, name):
+        # pin numbers and anything else that is not I/O
+        return getattr(self.config, name)
+
+    def digital_write(self, pin, value):
+        self.ops.append(('write', pin, value))
+
+    def digital_read(self, pin):
+        raise RuntimeError("AsyncEPD cannot replay a driver that reads pins")
+
+    def DEV_SPI_read(self):
+        raise RuntimeError("AsyncEPD cannot replay a driver that reads SPI")
+
+    def delay_ms(self, delaytime):
+        self.ops.append(('delay', delaytime))
+
+    def wait_busy(self, busy_level, timeout_ms=None):
+        self.ops.append(('busy', busy_level, timeout_ms))
+
+    def spi_writebyte(self, data):
+        self.ops.append(('call', 'spi_writebyte', data))
+
+    def spi_writebyte2(self, data):
+        self.ops.append(('call', 'spi_writebyte2', data))
+
+    def DEV_SPI_write(self, data):
+        self.ops.append(('call', 'DEV_SPI_write', data))
+
+    def module_init(self, *args, **kwargs):
+        self.ops.append(('init', args, kwargs))
+        return 0
+
+    def module_exit(self, *args, **kwargs):
+        self.ops.append(('call', 'module_exit', args, kwargs))
+
+
+class AsyncEPD:
+    """Awaitable wrapper around a driver ``EPD`` instance.
+
+        epd = AsyncEPD(epd7in5_V2.EPD())
+        await epd.init()
+        await epd.display(epd.getbuffer(image))
+        await epd.sleep()
+
+    Methods are recorded against a stand-in epdconfig and the ops are
+    replayed on the running loop: delay_ms -> asyncio.sleep, wait_busy ->
+    BusyWaiter.wait_async (GPIO edge callback), long SPI writes in the
+    default executor. getbuffer* and other pure helpers stay synchronous.
+    The facade has to be the only user of the panel while a call is awaited.
+    """
+
+    def __init__(self, epd):
+        self.epd = epd
+        # the backend the ops are replayed on; recording swaps epd.config
+        self.config = epd.config
+        self.record_lock = threading.Lock()
+        self.lock = asyncio.Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self.epd, name)
+        # getbuffer* only packs images, no hardware access
+        if not callable(attr) or name.startswith('getbuffer'):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+        return call
+
+    def record(self, method, *args, **kwargs):
+        """Runs ``method`` against the recorder; returns (ops, result)."""
+        recorder = _Recorder(self.config)
+        with self.record_lock:
+            # EPDBase does all its I/O through epd.config
+            own = vars(self.epd).get('config')
+            self.epd.config = recorder
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                if own is None:
+                    del self.epd.config
+                else:
+                    self.epd.config = own
+        return recorder.ops, result
+
+    async def run(self, method, *args, **kwargs):
+        ops, result = self.record(method, *args, **kwargs)
+        async with self.lock:
+            if await self.replay(ops) != 0:
+                return -1
+        return result
+
+    async def replay(self, ops):
+        loop = asyncio.get_running_loop()
+        config = self.config
+        for op in ops:
+            kind = op[0]
+            if kind == 'write':
+                config.digital_write(op[1], op[2])
+            elif kind == 'delay':
+                if op[1]:
+                    await asyncio.sleep(op[1] / 1000.0)
+            elif kind == 'busy':
+                await config.wait_busy_async(op[1], op[2])
+            elif kind == 'init':
+                # module_init opens SPI/GPIO, keep it off the loop
+                if await loop.run_in_executor(None, functools.partial(config.module_init, *op[1], **op[2])) != 0:
+                    logger.error("module_init failed, replay stopped")
+                    return -1
+            elif len(op) == 3 and len(op[2]) >= EXECUTOR_BYTES:
+                await loop.run_in_executor(None, getattr(config, op[1]), op[2])
+            elif len(op) == 3:
+                getattr(config, op[1])(op[2])
+            else:
+                getattr(config, op[1])(*op[2], **op[3])
+        return 0
@@ -0,0 +1,186 @@
+# *****************************************************************************
+# * | File        :	  epdbase.py
+# * | Function    :   Transport core shared by the e-Paper drivers
+# * | Info        :
+# *----------------
+# * | Info        :   EPDBase owns the pins, the SPI framing, reset, the
+# * |             :   BUSY wait and getbuffer(); UC81xx, SSD16xx and
+# * |             :   DualController set the controller defaults. A driver
+# * |             :   only declares geometry, init tables and refresh
+# * |             :   commands, and overrides a class attribute where its
+# * |             :   panel differs.
+# ******************************************************************************
+
+import logging
+import time
+
+import numpy as np
+
+from . import epdconfig
+from . import epdbuffer
+
+logger = logging.getLogger(__name__)
+
+
+class EPDBase:
+    """Pins, SPI framing, reset and BUSY handling for one panel.
+
+    All I/O goes through ``self.config``: the epdconfig module, or the
+    backend passed as ``EPD(config=...)`` for a panel on its own
+    chip-select and pins (see epdconfig.create_implementation). A fix
+    here reaches every driver built on it.
+    Every transfer is counted; bulk writes, resets and BUSY waits are
+    also timed, see stats().
+    """
+
+    config = epdconfig
+
+    # reset pulse: RST high for RESET_MS[0], then RESET_PULSES times
+    # low for RESET_MS[1] and high for RESET_MS[2]
+    RESET_MS = (200, 2, 200)
+    RESET_PULSES = 1
+
+    # BUSY pin level while the controller is busy (set by the controller mixin)
+    BUSY_LEVEL = 1
+    # command sent before waiting (0x71 GET_STATUS on some UC81xx panels)
+    BUSY_POLL = None
+    # delay before the wait and settle time after BUSY is released
+    BUSY_DELAY_MS = 0
+    BUSY_SETTLE_MS = 0
+
+    # getbuffer(): keyword arguments for epdbuffer.getbuffer_1bpp, or a
+    # palette (and bits per pixel) for epdbuffer.getbuffer_palette
+    BUFFER_OPTIONS = {}
+    PALETTE = None
+    PALETTE_BPP = 4
+
+    def __init__(self, width, height, config=None):
+        if config is not None:
+            self.config = config
+        self.reset_pin = self.config.RST_PIN
+        self.dc_pin = self.config.DC_PIN
+        self.busy_pin = self.config.BUSY_PIN
+        self.cs_pin = self.config.CS_PIN
+        self.width = width
+        self.height = height
+        self.timing = {op: [0, 0.0] for op in ('command', 'data', 'bulk', 'busy', 'reset')}
+        self.powered = False
+
+    def _timed(self, op, start, count=1):
+        entry = self.timing[op]
+        entry[0] += count
+        entry[1] += time.perf_counter() - start
+
+    def module_init(self, *args, **kwargs):
+        """config.module_init() once per wake.
+
+        The first init after module_exit() powers the panel and opens SPI;
+        the inits that switch refresh modes while it is awake only rerun
+        the controller sequence. spidev's open() does not close a handle
+        that is already open, so each extra open would leak a descriptor.
+        """
+        if self.powered:
+            return 0
+        result = self.config.module_init(*args, **kwargs)
+        self.powered = result == 0
+        return result
+
+    def module_exit(self, *args, **kwargs):
+        """config.module_exit(): closes SPI and cuts power; the next init opens them again."""
+        self.powered = False
+        self.config.module_exit(*args, **kwargs)
+
+    # Hardware reset
+    def reset(self):
+        start = time.perf_counter()
+        high, low, settle = self.RESET_MS
+        self.config.digital_write(self.reset_pin, 1)
+        self.config.delay_ms(high)
+        for _ in range(self.RESET_PULSES):
+            self.config.digital_write(self.reset_pin, 0)
+            self.config.delay_ms(low)
+            self.config.digital_write(self.reset_pin, 1)
+            self.config.delay_ms(settle)
+        self._timed('reset', start)
+
+    def send_command(self, command):
+        self.config.digital_write(self.dc_pin, 0)
+        self.config.digital_write(self.cs_pin, 0)
+        self.config.spi_writebyte([command])
+        self.config.digital_write(self.cs_pin, 1)
+        self.timing['command'][0] += 1
+
+    def send_data(self, data):
+        self.config.digital_write(self.dc_pin, 1)
+        self.config.digital_write(self.cs_pin, 0)
+        self.config.spi_writebyte([data])
+        self.config.digital_write(self.cs_pin, 1)
+        self.timing['data'][0] += 1
+
+    # send a lot of data
+    def send_data2(self, data):
+        start = time.perf_counter()
+        self.config.digital_write(self.dc_pin, 1)
+        self.config.digital_write(self.cs_pin, 0)
+        self.config.spi_writebyte2(data)
+        self.config.digital_write(self.cs_pin, 1)
+        self._timed('bulk', start)
+
+    def wait_busy(self, busy_level):
+        """Waits for BUSY at ``busy_level`` to clear, without the poll command or delays."""
+        start = time.perf_counter()
+        logger.debug("e-Paper busy")
+        self.config.wait_busy(busy_level)
+        logger.debug("e-Paper busy release")
+        self._timed('busy', start)
+
+    def ReadBusy(self):
+        if self.BUSY_DELAY_MS:
+            self.config.delay_ms(self.BUSY_DELAY_MS)
+        if self.BUSY_POLL is not None:
+            self.send_command(self.BUSY_POLL)
+        self.wait_busy(self.BUSY_LEVEL)
+        if self.BUSY_SETTLE_MS:
+            self.config.delay_ms(self.BUSY_SETTLE_MS)
+
+    def getbuffer(self, image):
+        if self.PALETTE is not None:
+            return epdbuffer.getbuffer_palette(image, self.width, self.height, self.PALETTE, bpp=self.PALETTE_BPP)
+        return epdbuffer.getbuffer_1bpp(image, self.width, self.height, **self.BUFFER_OPTIONS)
+
+    def stats(self):
+        """Transfer counts and seconds per operation since the driver was created."""
+        return {op: {"count": count, "seconds": seconds} for op, (count, seconds) in self.timing.items()}
+
+
+class UC81xx(EPDBase):
+    """UltraChip UC81xx-style controllers (and the JD79/ACeP parts that copy
+    them): BUSY is low while busy, frames go through 0x10/0x13, refresh
+    is 0x12."""
+
+    BUSY_LEVEL = 0
+
+
+class SSD16xx(EPDBase):
+    """Solomon SSD16xx-style controllers: BUSY is high while busy, frames go
+    through 0x24/0x26, refresh is 0x22 + 0x20."""
+
+    BUSY_LEVEL = 1
+
+
+class DualController(SSD16xx):
+    """Two SSD16xx controllers behind one CS, each driving half of every row.
+
+    The master RAM is written through 0x24/0x26 and the slave RAM through
+    0xA4/0xA6. Each half is ``width // 16 + 1`` bytes wide, so the two
+    share the middle byte column.
+    """
+
+    def halves(self, buf):
+        """Splits a full frame into the (master, slave) planes, one bulk write each."""
+        if isinstance(buf, (list, tuple)):
+            buf = bytes(b & 0xFF for b in buf)
+        linewidth = self.width // 8
+        half = self.width // 16 + 1
+        rows = np.frombuffer(bytes(buf), dtype=np.uint8)[:linewidth * self.height].reshape(self.height, linewidth)
+        return rows[:, :half].tobytes(), rows[:, half - 1:2 * half - 1].tobytes()
@@ -0,0 +1,283 @@
+# *****************************************************************************
+# * | File        :	  epdbuffer.py
+# * | Function    :   Vectorized framebuffer packing shared by the drivers
+# * | Info        :
+# *----------------
+# * | Info        :   Replaces the per-pixel getbuffer loops with NumPy so
+# * |             :   a full frame is packed in a handful of array passes.
+# ******************************************************************************
+
+import functools
+import logging
+
+import numpy as np
+from PIL import Image
+
+from . import epdconfig
+
+logger = logging.getLogger(__name__)
+
+
+_INVERT_TABLE = bytes(range(255, -1, -1))
+
+
+def inverted(buf):
+    """Return ``buf`` with every byte inverted, as ``bytes``, in a single C pass.
+
+    Replaces the ``[~b for b in buf]`` lists, whose negative ints spidev had to mask.
+    """
+    if not isinstance(buf, (bytes, bytearray)):
+        buf = bytes(buf)
+    return buf.translate(_INVERT_TABLE)
+
+
+def and_planes(a, b):
+    """Bytewise AND of two equal-length planes, as ``bytes``; the inputs are not modified."""
+    return np.bitwise_and(np.frombuffer(bytes(a), dtype=np.uint8),
+                          np.frombuffer(bytes(b), dtype=np.uint8)).tobytes()
+
+
+def image_to_bits(image, width, height, rotate_first=False):
+    """Return a (height, width) bool array, True for white, or None.
+
+    Portrait images (height x width) are rotated 90 degrees counter-clockwise,
+    which is the same mapping as the legacy ``newx = y; newy = height - x - 1``
+    loops. By default the image is dithered to mode '1' before rotating, as the
+    loop-based drivers did; ``rotate_first`` rotates before dithering, as the
+    ``img.rotate(90, expand=True).convert('1')`` drivers do.
+    """
+    imwidth, imheight = image.size
+    if imwidth == width and imheight == height:
+        return np.asarray(image.convert('1'), dtype=bool)
+    if imwidth == height and imheight == width:
+        if rotate_first:
+            return np.asarray(image.rotate(90, expand=True).convert('1'), dtype=bool)
+        return np.rot90(np.asarray(image.convert('1'), dtype=bool))
+    logger.warning("Wrong image dimensions: must be " + str(width) + "x" + str(height))
+    return None
+
+
+def pack_bits(bits, linewidth=None):
+    """Pack a 2-D bool array MSB first, ``linewidth`` bytes per row.
+
+    Rows are padded on the right with set bits (white), which matches the
+    ``[0xFF] * size`` buffers the legacy loops started from.
+    """
+    rows, cols = bits.shape
+    if linewidth is None:
+        linewidth = (cols + 7) // 8
+    pad = linewidth * 8 - cols
+    if pad > 0:
+        bits = np.pad(bits, ((0, 0), (0, pad)), constant_values=True)
+    return bytearray(np.packbits(bits, axis=1).tobytes())
+
+
+def pack_2bpp(codes):
+    """Pack a 2-D array of 2-bit codes, four pixels per byte, first pixel in the top bits."""
+    codes = np.asarray(codes, dtype=np.uint8)
+    pad = -codes.shape[1] % 4
+    if pad:
+        codes = np.pad(codes, ((0, 0), (0, pad)))
+    packed = (codes[:, 0::4] << 6) | (codes[:, 1::4] << 4) | (codes[:, 2::4] << 2) | codes[:, 3::4]
+    return bytearray(packed.tobytes())
+
+
+# 4-gray levels as the drivers expect them: the top two bits of the gray value,
+# with GRAY2 (0xC0) and GRAY3 (0x80) shifted down one level first.
+GRAY4_LUT = np.arange(256, dtype=np.uint8) >> 6
+GRAY4_LUT[0xC0] = 0x80 >> 6
+GRAY4_LUT[0x80] = 0x40 >> 6
+
+
+def getbuffer_4gray(image, width, height, transpose=False):
+    """Pack ``image`` into a 2 bits per pixel 4-gray buffer; ``image`` is not modified.
+
+    Portrait images are rotated counter-clockwise like the mono buffers, or
+    transposed when ``transpose`` is set (the epd4in2 family). On wrong
+    dimensions an all-white (0xFF) buffer is returned.
+    """
+    gray = np.asarray(image.convert('L'))
+    imheight, imwidth = gray.shape
+    if imwidth == width and imheight == height:
+        logger.debug("Vertical")
+    elif imwidth == height and imheight == width:
+        logger.debug("Horizontal")
+        gray = gray.T if transpose else np.rot90(gray)
+    else:
+        logger.warning("Wrong image dimensions: must be " + str(width) + "x" + str(height))
+        return bytearray([0xFF]) * (int(width / 4) * height)
+    return pack_2bpp(GRAY4_LUT[gray])
+
+
+def gray4_planes(buf, invert=False):
+    """Split a getbuffer_4gray buffer into its two 1 bpp RAM planes.
+
+    Returns ``(high, low)``: the high and low bit of every 2-bit level, packed
+    MSB first, each half the size of ``buf``. ``invert`` flips both planes for
+    controllers that expect 1 for black.
+    """
+    bits = np.unpackbits(np.frombuffer(bytes(buf), dtype=np.uint8)).reshape(-1, 2)
+    high = np.packbits(bits[:, 0])
+    low = np.packbits(bits[:, 1])
+    if invert:
+        high ^= 0xFF
+        low ^= 0xFF
+    return bytearray(high.tobytes()), bytearray(low.tobytes())
+
+
+def getbuffer_1bpp(image, width, height, invert=False, rotate_first=False, blank=0xFF):
+    """Pack ``image`` into a 1 bit per pixel panel buffer (1 = white).
+
+    ``invert`` flips every byte for controllers where 1 means black.
+    ``rotate_first`` reproduces the drivers that rotated before dithering and
+    packed with ``Image.tobytes()`` (zero padding bits on odd widths).
+    On wrong dimensions a buffer filled with ``blank`` is returned.
+    """
+    bits = image_to_bits(image, width, height, rotate_first)
+    if bits is None:
+        return bytearray([blank]) * (((width + 7) // 8) * height)
+    if rotate_first:
+        buf = np.packbits(bits, axis=1)
+    else:
+        buf = np.frombuffer(pack_bits(bits), dtype=np.uint8)
+    if invert:
+        buf = buf ^ 0xFF
+    return bytearray(buf.tobytes())
+
+
+def pack_4bpp(indices):
+    """Pack palette indices two pixels per byte, first pixel in the high nibble."""
+    idx = np.asarray(indices, dtype=np.uint8).reshape(-1)
+    return ((idx[0::2] << 4) | idx[1::2]).tobytes()
+
+
+@functools.lru_cache(maxsize=32)
+def constant_plane(size, value):
+    """``size`` bytes of ``value`` as an epdconfig.Fill, cached per (size, value).
+
+    send_data2() hands it to SPITransport.repeat(), so the Clear() and
+    display_Base_color() planes never exist as a full-frame buffer.
+    """
+    return epdconfig.Fill(value, size)
+
+
+def double_bits(buf):
+    """Repeat every bit of ``buf`` twice (one byte becomes two), for 2-bit-per-pixel planes."""
+    bits = np.unpackbits(np.frombuffer(bytes(buf), dtype=np.uint8))
+    return np.packbits(np.repeat(bits, 2)).tobytes()
+
+
+# 2-bit gray code -> controller nibble: black 0x0, white 0x3, both grays 0x4
+_GRAY2_NIBBLE = np.array([0x00, 0x04, 0x04, 0x03], dtype=np.uint8)
+
+
+def gray2_to_4bpp(buf):
+    """Re-pack a 2 bpp buffer as 4 bpp nibbles for the UC8179-era 3-color controllers."""
+    bits = np.unpackbits(np.frombuffer(bytes(buf), dtype=np.uint8)).reshape(-1, 2)
+    return pack_4bpp(_GRAY2_NIBBLE[bits[:, 0] << 1 | bits[:, 1]])
+
+
+def bwr_to_4bpp(black, red):
+    """Merge 1 bpp black and red planes (0 = ink) into 4 bpp nibbles: red 0x4, black 0x0, white 0x3."""
+    black = np.unpackbits(np.frombuffer(bytes(black), dtype=np.uint8))
+    red = np.unpackbits(np.frombuffer(bytes(red), dtype=np.uint8))
+    return pack_4bpp(np.where(red == 0, 0x04, np.where(black == 0, 0x00, 0x03)).astype(np.uint8))
+
+
+_palette_images = {}
+
+
+def palette_image(colors):
+    """Return a cached 'P' image whose palette starts with ``colors`` (RGB tuples)."""
+    key = tuple(colors)
+    pal_image = _palette_images.get(key)
+    if pal_image is None:
+        pal_image = Image.new("P", (1, 1))
+        pal_image.putpalette(sum(key, ()) + (0, 0, 0) * (256 - len(key)))
+        _palette_images[key] = pal_image
+    return pal_image
+
+
+def getbuffer_palette(image, width, height, colors, bpp=4, dither=True):
+    """Map ``image`` onto the panel palette ``colors`` and pack it, as bytes.
+
+    ``bpp`` is 4 for the ACeP panels (two pixels per byte) or 2 for the
+    4-color "G" panels (four pixels per byte, rows padded to a whole byte).
+    With ``dither`` the image is quantized (Floyd-Steinberg) to the cached
+    palette; otherwise only exact palette colors are kept and every other
+    pixel maps to index 0. On wrong dimensions an all-white (index 1) buffer
+    is returned.
+    """
+    imwidth, imheight = image.size
+    if imwidth == width and imheight == height:
+        rotate = False
+    elif imwidth == height and imheight == width:
+        rotate = True
+    else:
+        logger.warning("Invalid image dimensions: %d x %d, expected %d x %d" % (imwidth, imheight, width, height))
+        if bpp == 2:
+            return bytes([0x55]) * (((width + 3) // 4) * height)
+        return bytes([0x11]) * (width * height // 2)
+
+    if dither:
+        if rotate:
+            image = image.rotate(90, expand=True)
+        indices = np.asarray(image.convert("RGB").quantize(palette=palette_image(colors)))
+    else:
+        rgb = np.asarray(image.convert("RGB"), dtype=np.uint32)
+        key = (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+        indices = np.zeros(key.shape, dtype=np.uint8)
+        for i, (r, g, b) in reversed(list(enumerate(colors))):
+            indices[key == ((r << 16) | (g << 8) | b)] = i
+        if rotate:
+            indices = np.rot90(indices)
+    if bpp == 2:
+        return bytes(pack_2bpp(indices))
+    return pack_4bpp(indices)
+
+
+def split_planes(image, colors):
+    """Quantize ``image`` to (black, white, color) and return the black and color planes as '1' images.
+
+    ``colors`` are the three RGB tuples in that order. Ink is 0 in both
+    planes, the way the b/c drivers take Imageblack and Imagered.
+    """
+    indices = np.asarray(image.convert("RGB").quantize(palette=palette_image(colors)))
+    black = np.where(indices == 0, 0, 255).astype(np.uint8)
+    color = np.where(indices == 2, 0, 255).astype(np.uint8)
+    return Image.fromarray(black).convert("1"), Image.fromarray(color).convert("1")
+
+
+def dirty_rects(old, new, linewidth, merge_gap=16):
+    """Return the byte-aligned rectangles where two packed 1 bpp frames differ.
+
+    Each rectangle is ``(x0, y0, x1, y1)`` with x in bytes and y in rows, end
+    exclusive. Changed rows are grouped into bands; bands closer than
+    ``merge_gap`` rows are merged, and every band is trimmed to its changed
+    columns. An empty list means the frames are identical.
+    """
+    a = np.frombuffer(old, dtype=np.uint8).reshape(-1, linewidth)
+    b = np.frombuffer(new, dtype=np.uint8).reshape(-1, linewidth)
+    diff = a != b
+    rows = np.flatnonzero(diff.any(axis=1))
+    if not len(rows):
+        return []
+    breaks = np.flatnonzero(np.diff(rows) > merge_gap)
+    rects = []
+    for band in np.split(rows, breaks + 1):
+        y0, y1 = int(band[0]), int(band[-1]) + 1
+        cols = np.flatnonzero(diff[y0:y1].any(axis=0))
+        rects.append((int(cols[0]), y0, int(cols[-1]) + 1, y1))
+    return rects
+
+
+def bounding_rect(rects):
+    """Smallest rectangle covering all of ``rects``."""
+    return (min(r[0] for r in rects), min(r[1] for r in rects),
+            max(r[2] for r in rects), max(r[3] for r in rects))
+
+
+def crop(buf, linewidth, rect):
+    """Cut ``rect`` (as returned by dirty_rects) out of a packed frame, as bytes."""
+    x0, y0, x1, y1 = rect
+    return np.frombuffer(buf, dtype=np.uint8).reshape(-1, linewidth)[y0:y1, x0:x1].tobytes()
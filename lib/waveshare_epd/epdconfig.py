@@ -29,15 +29,366 @@
 
 import os
 import logging
+import struct
 import sys
+import threading
 import time
-import subprocess
 
 from ctypes import *
 
 logger = logging.getLogger(__name__)
 
 
+class Fill:
+    """``count`` bytes of ``value``, sent without building the whole plane.
+
+    SPITransport.send() streams it with repeat(); anything else that needs
+    the data can call bytes() on it.
+    """
+
+    __slots__ = ('value', 'count')
+
+    def __init__(self, value, count):
+        self.value = value & 0xFF
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __bytes__(self):
+        return bytes((self.value,)) * self.count
+
+    def __repr__(self):
+        return 'Fill(0x%02X, %d)' % (self.value, self.count)
+
+
+class SPITransport:
+    """Bulk SPI writer shared by every backend's spi_writebyte2.
+
+    Accepts any buffer-protocol object (bytes, bytearray, memoryview, NumPy
+    arrays) or a list of ints, and hands the backend ``write`` callable
+    memoryview slices of at most ``chunk_size`` bytes, so large frames are
+    never copied. DC/CS are framed once by the caller around the whole
+    transfer. Every transfer is timed; the last one is kept in ``last``.
+    A Fill goes through repeat(), which re-sends one cached chunk of the
+    fill byte instead of a full-frame buffer.
+    """
+
+    BUFSIZ_PATH = '/sys/module/spidev/parameters/bufsiz'
+
+    def __init__(self, write, chunk_size=None):
+        self.write = write
+        self.chunk_size = chunk_size or self.spidev_bufsiz()
+        self.last = None
+        self.total_bytes = 0
+        self.total_seconds = 0.0
+        self.patterns = {}
+
+    @classmethod
+    def spidev_bufsiz(cls, default=4096):
+        try:
+            with open(cls.BUFSIZ_PATH) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return default
+
+    @staticmethod
+    def as_view(data):
+        if isinstance(data, (list, tuple)):
+            try:
+                data = bytes(data)
+            except ValueError:
+                # legacy callers still pass ~byte values
+                data = bytes(b & 0xFF for b in data)
+        elif isinstance(data, int):
+            data = bytes((data & 0xFF,))
+        return memoryview(data).cast('B')
+
+    def send(self, data):
+        if isinstance(data, Fill):
+            return self.repeat(data.value, data.count)
+        view = self.as_view(data)
+        size = len(view)
+        start = time.perf_counter()
+        for offset in range(0, size, self.chunk_size):
+            self.write(view[offset:offset + self.chunk_size])
+        return self._account(size, start)
+
+    def repeat(self, value, count):
+        """Send ``count`` copies of the byte ``value``, one chunk-sized pattern per fill byte."""
+        pattern = self.patterns.get(value)
+        if pattern is None:
+            pattern = self.patterns[value] = memoryview(bytes((value & 0xFF,)) * self.chunk_size)
+        start = time.perf_counter()
+        for offset in range(0, count, self.chunk_size):
+            self.write(pattern[:count - offset])
+        return self._account(count, start)
+
+    def _account(self, size, start):
+        elapsed = time.perf_counter() - start
+        self.total_bytes += size
+        self.total_seconds += elapsed
+        self.last = {
+            "bytes": size,
+            "seconds": elapsed,
+            "bytes_per_sec": size / elapsed if elapsed > 0 else None,
+        }
+        logger.debug("spi %d bytes in %.2f ms", size, elapsed * 1000)
+        return size
+
+    def stats(self):
+        return {
+            "bytes": self.total_bytes,
+            "seconds": self.total_seconds,
+            "bytes_per_sec": self.total_bytes / self.total_seconds if self.total_seconds > 0 else None,
+            "last": self.last,
+        }
+
+
+class BusyTimeout(RuntimeError):
+    """The panel kept BUSY asserted for longer than the wait timeout."""
+
+
+class BusyWaiter:
+    """BUSY-pin wait shared by every backend's wait_busy.
+
+    ``read`` returns the current BUSY level. When the backend can block on a
+    pin edge, ``wait_edge(busy_level, timeout)`` returns True once the pin
+    leaves ``busy_level`` (False on timeout); otherwise the pin is polled
+    every ``poll_ms``. ``watch_edge(busy_level, callback)``, when the backend
+    has it, calls ``callback`` from its event thread on that edge and returns
+    a function that disarms it; wait_async uses it instead of polling.
+    A wait longer than ``timeout_ms`` raises BusyTimeout instead of hanging
+    the caller forever. Every wait is timed; the last one is kept in
+    ``last``. ``listener``, when set, is called with "busy" before blocking
+    on the panel and "idle" once it is released.
+    """
+
+    def __init__(self, read, wait_edge=None, timeout_ms=None, poll_ms=10, watch_edge=None):
+        self.read = read
+        self.wait_edge = wait_edge
+        self.watch_edge = watch_edge
+        if timeout_ms is None:
+            timeout_ms = int(os.environ.get('EPD_BUSY_TIMEOUT_MS', 60000))
+        self.timeout_ms = timeout_ms
+        self.poll_ms = poll_ms
+        self.last = None
+        self.count = 0
+        self.timeouts = 0
+        self.total_seconds = 0.0
+        self.listener = None
+
+    def wait(self, busy_level, timeout_ms=None):
+        if timeout_ms is None:
+            timeout_ms = self.timeout_ms
+        timeout = timeout_ms / 1000.0 if timeout_ms else None
+        start = time.perf_counter()
+        if self.read() != busy_level:
+            released = True
+        else:
+            listener = self.listener
+            if listener:
+                listener("busy")
+            try:
+                if self.wait_edge is not None:
+                    released = self.wait_edge(busy_level, timeout)
+                else:
+                    released = self._poll(busy_level, start, timeout)
+            finally:
+                if listener:
+                    listener("idle")
+        return self._record(busy_level, start, released, timeout_ms)
+
+    async def wait_async(self, busy_level, timeout_ms=None):
+        """Awaitable wait: an edge callback resolves a future, so no thread is parked on the pin."""
+        import asyncio
+        if timeout_ms is None:
+            timeout_ms = self.timeout_ms
+        timeout = timeout_ms / 1000.0 if timeout_ms else None
+        start = time.perf_counter()
+        if self.read() != busy_level:
+            return self._record(busy_level, start, True, timeout_ms)
+        listener = self.listener
+        if listener:
+            listener("busy")
+        try:
+            if self.watch_edge is not None:
+                loop = asyncio.get_running_loop()
+                released = loop.create_future()
+
+                def on_edge():
+                    loop.call_soon_threadsafe(lambda: released.done() or released.set_result(True))
+
+                disarm = self.watch_edge(busy_level, on_edge)
+                try:
+                    # the edge may have passed before the callback was armed
+                    if self.read() == busy_level:
+                        await asyncio.wait_for(released, timeout)
+                    ok = True
+                except asyncio.TimeoutError:
+                    ok = False
+                finally:
+                    disarm()
+            else:
+                ok = True
+                while self.read() == busy_level:
+                    if timeout is not None and time.perf_counter() - start >= timeout:
+                        ok = False
+                        break
+                    await asyncio.sleep(self.poll_ms / 1000.0)
+        finally:
+            if listener:
+                listener("idle")
+        return self._record(busy_level, start, ok, timeout_ms)
+
+    def _record(self, busy_level, start, released, timeout_ms):
+        elapsed = time.perf_counter() - start
+        self.count += 1
+        self.total_seconds += elapsed
+        self.last = {"busy_level": busy_level, "seconds": elapsed, "timed_out": not released}
+        if not released:
+            self.timeouts += 1
+            logger.error("e-Paper busy timeout after %.1f s", elapsed)
+            raise BusyTimeout("BUSY still %d after %d ms" % (busy_level, timeout_ms))
+        logger.debug("busy %.2f ms", elapsed * 1000)
+        return elapsed
+
+    def _poll(self, busy_level, start, timeout):
+        while self.read() == busy_level:
+            if timeout is not None and time.perf_counter() - start >= timeout:
+                return False
+            time.sleep(self.poll_ms / 1000.0)
+        return True
+
+    def stats(self):
+        return {
+            "waits": self.count,
+            "timeouts": self.timeouts,
+            "seconds": self.total_seconds,
+            "last": self.last,
+        }
+
+
+class LgpioLines:
+    """DC/RST/PWR/BUSY through lgpio line handles, without gpiozero's device layers.
+
+    ``write`` is bound directly as the backend's digital_write, so a toggle is
+    one set lookup and one lgpio call. Pins that were not claimed (CS, which
+    spidev drives) are ignored, as in the gpiozero path. ``lgpio`` can be a
+    stand-in module with the same functions (the benchmarks pass a mock chip).
+    """
+
+    def __init__(self, outputs, busy, chip=None, lgpio=None):
+        if lgpio is None:
+            import lgpio
+        self.lgpio = lgpio
+        if chip is None:
+            chip = int(os.environ.get('EPD_GPIOCHIP', 0))
+        self.handle = lgpio.gpiochip_open(chip)
+        self.outputs = frozenset(outputs)
+        for pin in self.outputs:
+            lgpio.gpio_claim_output(self.handle, pin, 0)
+        self.busy = busy
+        lgpio.gpio_claim_alert(self.handle, busy, lgpio.BOTH_EDGES)
+
+    def write(self, pin, value):
+        if pin in self.outputs:
+            self.lgpio.gpio_write(self.handle, pin, 1 if value else 0)
+
+    def read(self, pin):
+        return self.lgpio.gpio_read(self.handle, pin)
+
+    def watch_edge(self, busy_level, callback):
+        # lgpio calls back from its own thread with (chip, gpio, level, tick)
+        edge = self.lgpio.FALLING_EDGE if busy_level else self.lgpio.RISING_EDGE
+        cb = self.lgpio.callback(self.handle, self.busy, edge, lambda *args: callback())
+        return cb.cancel
+
+    def wait_edge(self, busy_level, timeout):
+        released = threading.Event()
+        cancel = self.watch_edge(busy_level, released.set)
+        try:
+            # the edge may have passed before the callback was armed
+            return self.read(self.busy) != busy_level or released.wait(timeout)
+        finally:
+            cancel()
+
+    def close(self):
+        for pin in self.outputs | {self.busy}:
+            self.lgpio.gpio_free(self.handle, pin)
+        self.lgpio.gpiochip_close(self.handle)
+
+
+class GpiodLines:
+    """Same as LgpioLines on libgpiod 2.x: one line request for all the pins."""
+
+    def __init__(self, outputs, busy, chip=None, gpiod=None):
+        if gpiod is None:
+            import gpiod
+        Direction, Edge, Value = gpiod.line.Direction, gpiod.line.Edge, gpiod.line.Value
+        self.values = (Value.INACTIVE, Value.ACTIVE)
+        self.active = Value.ACTIVE
+        if chip is None:
+            chip = int(os.environ.get('EPD_GPIOCHIP', 0))
+        self.outputs = frozenset(outputs)
+        self.busy = busy
+        self.request = gpiod.request_lines('/dev/gpiochip%d' % chip, consumer='epd', config={
+            tuple(self.outputs): gpiod.LineSettings(direction=Direction.OUTPUT, output_value=Value.INACTIVE),
+            busy: gpiod.LineSettings(direction=Direction.INPUT, edge_detection=Edge.BOTH),
+        })
+
+    def write(self, pin, value):
+        if pin in self.outputs:
+            self.request.set_value(pin, self.values[1 if value else 0])
+
+    def read(self, pin):
+        return 1 if self.request.get_value(pin) == self.active else 0
+
+    def wait_edge(self, busy_level, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.read(self.busy) == busy_level:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            if self.request.wait_edge_events(remaining):
+                self.request.read_edge_events()
+        return True
+
+    def close(self):
+        self.request.release()
+
+
+# Pins a second panel can move, by backend attribute name
+PIN_NAMES = ('RST_PIN', 'DC_PIN', 'CS_PIN', 'BUSY_PIN', 'PWR_PIN')
+# spidev device -> the GPIO that is its hardware chip-select on SPI0
+SPI_CE_PINS = {0: 8, 1: 7}
+
+
+def configure_pins(backend, pins=None, spi_device=0):
+    """Give ``backend`` its own pins and SPI chip-select.
+
+    ``pins`` maps PIN_NAMES entries to BCM numbers and overrides the class
+    defaults on this instance only. CS_PIN defaults to the CE line of
+    ``spi_device`` (CE0 = GPIO8, CE1 = GPIO7); the kernel drives it.
+    """
+    pins = dict(pins or {})
+    unknown = set(pins) - set(PIN_NAMES)
+    if unknown:
+        raise ValueError("unknown e-Paper pins: %s, expected %s" % (", ".join(sorted(unknown)), ", ".join(PIN_NAMES)))
+    if spi_device in SPI_CE_PINS:
+        pins.setdefault('CS_PIN', SPI_CE_PINS[spi_device])
+    for name, pin in pins.items():
+        setattr(backend, name, pin)
+    backend.spi_device = spi_device
+
+
+# EPD_GPIO values besides the default gpiozero
+GPIO_LINES = {
+    'lgpio': LgpioLines,
+    'gpiod': GpiodLines,
+}
+
+
 class RaspberryPi:
     # Pin definition
     RST_PIN  = 17
@@ -47,17 +398,42 @@ class RaspberryPi:
     PWR_PIN  = 18
     MOSI_PIN = 10
     SCLK_PIN = 11
+    # width of this interpreter, which is what CDLL can load
+    LONG_BIT = struct.calcsize('P') * 8
 
-    def __init__(self):
+    def __init__(self, gpio=None, pins=None, spi_device=0):
+        """``gpio`` (EPD_GPIO) is gpiozero (default), lgpio or gpiod.
+
+        ``pins`` and ``spi_device`` move this instance to another
+        chip-select and pin set, see configure_pins().
+        """
         import spidev
-        import gpiozero
-        
+
+        configure_pins(self, pins, spi_device)
+
         self.SPI = spidev.SpiDev()
+        self.transport = SPITransport(self.SPI.writebytes2)
+        self.gpio = gpio or os.environ.get('EPD_GPIO', 'gpiozero')
+        if self.gpio != 'gpiozero':
+            if self.gpio not in GPIO_LINES:
+                raise ValueError("EPD_GPIO must be gpiozero or one of: " + ", ".join(GPIO_LINES))
+            self.lines = GPIO_LINES[self.gpio]((self.RST_PIN, self.DC_PIN, self.PWR_PIN), self.BUSY_PIN)
+            # bound straight to the line handles, no if/elif dispatch per toggle
+            self.digital_write = self.lines.write
+            self.digital_read = self.lines.read
+            self.busy_waiter = BusyWaiter(lambda: self.lines.read(self.BUSY_PIN), self.lines.wait_edge,
+                                          watch_edge=getattr(self.lines, 'watch_edge', None))
+            return
+
+        import gpiozero
+        self.lines = None
         self.GPIO_RST_PIN    = gpiozero.LED(self.RST_PIN)
         self.GPIO_DC_PIN     = gpiozero.LED(self.DC_PIN)
         # self.GPIO_CS_PIN     = gpiozero.LED(self.CS_PIN)
         self.GPIO_PWR_PIN    = gpiozero.LED(self.PWR_PIN)
         self.GPIO_BUSY_PIN   = gpiozero.Button(self.BUSY_PIN, pull_up = False)
+        self.busy_waiter = BusyWaiter(lambda: self.GPIO_BUSY_PIN.value, self._wait_busy_edge,
+                                      watch_edge=self._watch_busy_edge)
 
         
 
@@ -98,11 +474,31 @@ class RaspberryPi:
     def delay_ms(self, delaytime):
         time.sleep(delaytime / 1000.0)
 
+    def _wait_busy_edge(self, busy_level, timeout):
+        # gpiozero blocks on the edge event instead of polling the pin
+        if busy_level:
+            return self.GPIO_BUSY_PIN.wait_for_inactive(timeout)
+        return self.GPIO_BUSY_PIN.wait_for_active(timeout)
+
+    def _watch_busy_edge(self, busy_level, callback):
+        # gpiozero runs the callback on its pin event thread
+        if busy_level:
+            self.GPIO_BUSY_PIN.when_deactivated = callback
+            return lambda: setattr(self.GPIO_BUSY_PIN, 'when_deactivated', None)
+        self.GPIO_BUSY_PIN.when_activated = callback
+        return lambda: setattr(self.GPIO_BUSY_PIN, 'when_activated', None)
+
+    def wait_busy(self, busy_level, timeout_ms=None):
+        return self.busy_waiter.wait(busy_level, timeout_ms)
+
+    def wait_busy_async(self, busy_level, timeout_ms=None):
+        return self.busy_waiter.wait_async(busy_level, timeout_ms)
+
     def spi_writebyte(self, data):
         self.SPI.writebytes(data)
 
     def spi_writebyte2(self, data):
-        self.SPI.writebytes2(data)
+        self.transport.send(data)
 
     def DEV_SPI_write(self, data):
         self.DEV_SPI.DEV_SPI_SendData(data)
@@ -114,7 +510,7 @@ class RaspberryPi:
         return self.DEV_SPI.DEV_SPI_ReadData()
 
     def module_init(self, cleanup=False):
-        self.GPIO_PWR_PIN.on()
+        self.digital_write(self.PWR_PIN, 1)
         
         if cleanup:
             find_dirs = [
@@ -123,9 +519,9 @@ class RaspberryPi:
                 '/usr/lib',
             ]
             self.DEV_SPI = None
+            val = self.LONG_BIT
+            logging.debug("System is %d bit"%val)
             for find_dir in find_dirs:
-                val = int(os.popen('getconf LONG_BIT').read())
-                logging.debug("System is %d bit"%val)
                 if val == 64:
                     so_filename = os.path.join(find_dir, 'DEV_Config_64.so')
                 else:
@@ -139,8 +535,8 @@ class RaspberryPi:
             self.DEV_SPI.DEV_Module_Init()
 
         else:
-            # SPI device, bus = 0, device = 0
-            self.SPI.open(0, 0)
+            # SPI device, bus = 0, device = CE0 or CE1
+            self.SPI.open(0, self.spi_device)
             self.SPI.max_speed_hz = 4000000
             self.SPI.mode = 0b00
         return 0
@@ -149,12 +545,14 @@ class RaspberryPi:
         logger.debug("spi end")
         self.SPI.close()
 
-        self.GPIO_RST_PIN.off()
-        self.GPIO_DC_PIN.off()
-        self.GPIO_PWR_PIN.off()
+        self.digital_write(self.RST_PIN, 0)
+        self.digital_write(self.DC_PIN, 0)
+        self.digital_write(self.PWR_PIN, 0)
         logger.debug("close 5V, Module enters 0 power consumption ...")
         
-        if cleanup:
+        if cleanup and self.lines is not None:
+            self.lines.close()
+        elif cleanup:
             self.GPIO_RST_PIN.close()
             self.GPIO_DC_PIN.close()
             # self.GPIO_CS_PIN.close()
@@ -191,6 +589,8 @@ class JetsonNano:
 
         import Jetson.GPIO
         self.GPIO = Jetson.GPIO
+        self.transport = SPITransport(self._software_spi_write)
+        self.busy_waiter = BusyWaiter(lambda: self.GPIO.input(self.BUSY_PIN))
 
     def digital_write(self, pin, value):
         self.GPIO.output(pin, value)
@@ -201,12 +601,21 @@ class JetsonNano:
     def delay_ms(self, delaytime):
         time.sleep(delaytime / 1000.0)
 
+    def wait_busy(self, busy_level, timeout_ms=None):
+        return self.busy_waiter.wait(busy_level, timeout_ms)
+
+    def wait_busy_async(self, busy_level, timeout_ms=None):
+        return self.busy_waiter.wait_async(busy_level, timeout_ms)
+
     def spi_writebyte(self, data):
         self.SPI.SYSFS_software_spi_transfer(data[0])
 
+    def _software_spi_write(self, chunk):
+        for byte in chunk:
+            self.SPI.SYSFS_software_spi_transfer(byte)
+
     def spi_writebyte2(self, data):
-        for i in range(len(data)):
-            self.SPI.SYSFS_software_spi_transfer(data[i])
+        self.transport.send(data)
 
     def module_init(self):
         self.GPIO.setmode(self.GPIO.BCM)
@@ -249,6 +658,8 @@ class SunriseX3:
 
         self.GPIO = Hobot.GPIO
         self.SPI = spidev.SpiDev()
+        self.transport = SPITransport(self.SPI.xfer3)
+        self.busy_waiter = BusyWaiter(lambda: self.GPIO.input(self.BUSY_PIN))
 
     def digital_write(self, pin, value):
         self.GPIO.output(pin, value)
@@ -259,13 +670,19 @@ class SunriseX3:
     def delay_ms(self, delaytime):
         time.sleep(delaytime / 1000.0)
 
+    def wait_busy(self, busy_level, timeout_ms=None):
+        return self.busy_waiter.wait(busy_level, timeout_ms)
+
+    def wait_busy_async(self, busy_level, timeout_ms=None):
+        return self.busy_waiter.wait_async(busy_level, timeout_ms)
+
     def spi_writebyte(self, data):
         self.SPI.writebytes(data)
 
     def spi_writebyte2(self, data):
         # for i in range(len(data)):
         #     self.SPI.writebytes([data[i]])
-        self.SPI.xfer3(data)
+        self.transport.send(data)
 
     def module_init(self):
         if self.Flag == 0:
@@ -301,22 +718,98 @@ class SunriseX3:
         self.GPIO.cleanup([self.RST_PIN, self.DC_PIN, self.CS_PIN, self.BUSY_PIN], self.PWR_PIN)
 
 
-if sys.version_info[0] == 2:
-    process = subprocess.Popen("cat /proc/cpuinfo | grep Raspberry", shell=True, stdout=subprocess.PIPE)
-else:
-    process = subprocess.Popen("cat /proc/cpuinfo | grep Raspberry", shell=True, stdout=subprocess.PIPE, text=True)
-output, _ = process.communicate()
-if sys.version_info[0] == 2:
-    output = output.decode(sys.stdout.encoding)
-
-if "Raspberry" in output:
-    implementation = RaspberryPi()
-elif os.path.exists('/sys/bus/platform/drivers/gpio-x3'):
-    implementation = SunriseX3()
-else:
-    implementation = JetsonNano()
-
-for func in [x for x in dir(implementation) if not x.startswith('_')]:
-    setattr(sys.modules[__name__], func, getattr(implementation, func))
+# Pins are the same on every backend, so the drivers can be constructed
+# without touching the hardware.
+RST_PIN  = 17
+DC_PIN   = 25
+CS_PIN   = 8
+BUSY_PIN = 24
+PWR_PIN  = 18
+
+BACKENDS = {
+    'raspberrypi': RaspberryPi,
+    'sunrise': SunriseX3,
+    'jetson': JetsonNano,
+    'simulated': None,  # epdsim.Simulated, imported on demand
+}
+
+implementation = None
+_platform = None
+_lock = threading.Lock()
+
+
+def _read(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read().decode('utf-8', 'replace')
+    except OSError:
+        return ''
+
+
+def detect_platform():
+    """Return the BACKENDS key for this board, detected once and cached.
+
+    EPD_PLATFORM (raspberrypi, sunrise, jetson or simulated) forces a backend; otherwise
+    /proc/device-tree/model and /proc/cpuinfo are read directly.
+    """
+    global _platform
+    if _platform is None:
+        forced = os.environ.get('EPD_PLATFORM', '').strip().lower()
+        if forced:
+            if forced not in BACKENDS:
+                raise ValueError("EPD_PLATFORM must be one of: " + ", ".join(BACKENDS))
+            _platform = forced
+        elif "Raspberry" in _read('/proc/device-tree/model') or "Raspberry" in _read('/proc/cpuinfo'):
+            _platform = 'raspberrypi'
+        elif os.path.exists('/sys/bus/platform/drivers/gpio-x3'):
+            _platform = 'sunrise'
+        else:
+            _platform = 'jetson'
+        logger.debug("e-Paper platform: %s", _platform)
+    return _platform
+
+
+# Backends that can drive several panels, each on its own chip-select and pins
+MULTI_PANEL = ('raspberrypi', 'simulated')
+
+
+def create_implementation(pins=None, spi_device=0, **options):
+    """Create a separate backend for one more panel and return it.
+
+    Pass the result as ``EPD(config=...)``; the module-level backend the
+    other drivers use is not touched. ``options`` go to the backend
+    constructor (``gpio`` on the Pi, ``panel`` for the simulator).
+    """
+    platform = detect_platform()
+    if platform not in MULTI_PANEL:
+        raise ValueError("several panels need EPD_PLATFORM %s, not %s" % (" or ".join(MULTI_PANEL), platform))
+    backend = BACKENDS[platform]
+    if backend is None:
+        from .epdsim import Simulated as backend
+    return backend(pins=pins, spi_device=spi_device, **options)
+
+
+def get_implementation():
+    """Create the backend on first hardware use and export its methods as module functions."""
+    global implementation
+    with _lock:
+        if implementation is None:
+            backend = BACKENDS[detect_platform()]
+            if backend is None:
+                from .epdsim import Simulated as backend
+            impl = backend()
+            for func in [x for x in dir(impl) if not x.startswith('_')]:
+                setattr(sys.modules[__name__], func, getattr(impl, func))
+            implementation = impl
+    return implementation
+
+
+def __getattr__(name):
+    if name.startswith('_'):
+        raise AttributeError(name)
+    try:
+        return getattr(get_implementation(), name)
+    except AttributeError:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name)) from None
 
 ### END OF FILE ###
@@ -0,0 +1,202 @@
+# *****************************************************************************
+# * | File        :	  epdregistry.py
+# * | Function    :   Panel registry: driver modules and what each panel can do
+# * | Info        :
+# *----------------
+# * | Info        :   get('7in5_V2') returns a Panel descriptor without
+# * |             :   importing anything; Panel.create() imports the driver
+# * |             :   module on first use and builds its EPD.
+# ******************************************************************************
+
+import importlib
+
+# Panel colors, in the order the drivers index them where they take a palette
+BW = ('black', 'white')
+BWR = ('black', 'white', 'red')        # "bc" drivers: red or yellow, per panel
+BWY = ('black', 'white', 'yellow')
+BWYR = ('black', 'white', 'yellow', 'red')
+ACEP7 = ('black', 'white', 'green', 'blue', 'red', 'yellow', 'orange')
+SPECTRA6 = ('black', 'white', 'yellow', 'red', 'blue', 'green')
+
+RGB = {
+    'black': (0, 0, 0), 'white': (255, 255, 255), 'red': (255, 0, 0),
+    'yellow': (255, 255, 0), 'green': (0, 255, 0), 'blue': (0, 0, 255),
+    'orange': (255, 128, 0),
+}
+
+# Nominal full refresh per color family (ms), for panels without a measured value
+REFRESH_MS = {BW: 3000, BWR: 15000, BWY: 15000, BWYR: 20000, ACEP7: 30000, SPECTRA6: 30000}
+
+
+class Attr(str):
+    """A call argument read from the EPD instance, e.g. Attr('lut_full_update')."""
+
+
+def call(epd, spec, *data):
+    """Run a call spec on ``epd``: a method name or (name, *args), then ``data``.
+
+    Attr arguments are looked up on ``epd`` first, so a spec can name the
+    driver's own LUT table or mode constant.
+    """
+    if isinstance(spec, str):
+        spec = (spec,)
+    name, args = spec[0], [getattr(epd, a) if isinstance(a, Attr) else a for a in spec[1:]]
+    return getattr(epd, name)(*args, *data)
+
+
+class Panel:
+    """Capability descriptor of one panel, built from static data only.
+
+    ``bpp`` is the bits per pixel of one getbuffer() plane and ``planes`` the
+    number of buffers display() takes (2 for black + color). ``gray4`` says
+    whether the driver has a 4-gray mode.
+
+    ``init``, ``display`` and ``sleep`` are the call specs (see call()) of
+    a full refresh; the drivers do not share one signature. ``fast`` is an
+    (init, display) pair for the fast waveform. ``partial`` is an
+    (init, display) pair whose display takes the cropped window and its
+    pixel box, ``display_Partial(window, x0, y0, x1, y1)`` as on the 7.5" V2.
+    Drivers whose partial refresh takes another form have ``partial=None``.
+    """
+
+    def __init__(self, id, width, height, colors=BW, bpp=1, planes=1, gray4=False, refresh_ms=None,
+                 init='init', display='display', sleep='sleep', fast=None, partial=None):
+        self.id = id
+        self.width = width
+        self.height = height
+        self.colors = colors
+        self.bpp = bpp
+        self.planes = planes
+        self.gray4 = gray4
+        self.refresh_ms = refresh_ms or REFRESH_MS[colors]
+        self.init = init
+        self.display = display
+        self.sleep = sleep
+        self.fast = fast
+        self.partial = partial
+
+    @property
+    def module(self):
+        return 'epd' + self.id
+
+    @property
+    def linewidth(self):
+        """Bytes per row of one plane."""
+        return (self.width * self.bpp + 7) // 8
+
+    @property
+    def plane_bytes(self):
+        return self.linewidth * self.height
+
+    @property
+    def bytes_per_frame(self):
+        return self.plane_bytes * self.planes
+
+    @property
+    def palette(self):
+        """The colors as RGB tuples."""
+        return tuple(RGB[c] for c in self.colors)
+
+    def load(self):
+        """Imports the driver module (cached by Python after the first call)."""
+        return importlib.import_module('.' + self.module, __package__)
+
+    def create(self, config=None):
+        """Builds the driver's EPD; ``config`` is its backend (default: the epdconfig module)."""
+        return self.load().EPD(config)
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "module": self.module,
+            "width": self.width,
+            "height": self.height,
+            "colors": list(self.colors),
+            "bpp": self.bpp,
+            "planes": self.planes,
+            "partial": self.partial is not None,
+            "fast": self.fast is not None,
+            "gray4": self.gray4,
+            "bytes_per_frame": self.bytes_per_frame,
+            "refresh_ms": self.refresh_ms,
+        }
+
+    def __repr__(self):
+        return 'Panel(%r, %dx%d)' % (self.id, self.width, self.height)
+
+
+PANELS = {panel.id: panel for panel in (
+    Panel('13in3b',        960, 680, colors=BWR, planes=2),
+    Panel('13in3k',        960, 680, gray4=True),
+    Panel('1in02',          80, 128, init='Init', sleep='Sleep'),
+    Panel('1in54',         200, 200, init=('init', Attr('lut_full_update'))),
+    Panel('1in54_V2',      200, 200, init=('init', False)),
+    Panel('1in54b',        200, 200, colors=BWR, planes=2),
+    Panel('1in54b_V2',     200, 200, colors=BWR, planes=2),
+    Panel('1in54c',        152, 152, colors=BWY, planes=2),
+    Panel('1in64g',        168, 168, colors=BWYR, bpp=2),
+    Panel('2in13',         122, 250, init=('init', Attr('lut_full_update'))),
+    Panel('2in13_V2',      122, 250, init=('init', Attr('FULL_UPDATE'))),
+    Panel('2in13_V3',      122, 250, refresh_ms=2000),
+    Panel('2in13_V4',      122, 250, refresh_ms=2000, fast=('init_fast', 'display_fast')),
+    Panel('2in13b_V3',     104, 212, colors=BWR, planes=2),
+    Panel('2in13b_V4',     122, 250, colors=BWR, planes=2),
+    Panel('2in13bc',       104, 212, colors=BWR, planes=2),
+    Panel('2in13d',        104, 212),
+    Panel('2in13g',        122, 250, colors=BWYR, bpp=2),
+    Panel('2in15b',        160, 296, colors=BWR, planes=2),
+    Panel('2in15g',        160, 296, colors=BWYR, bpp=2),
+    Panel('2in36g',        168, 296, colors=BWYR, bpp=2),
+    Panel('2in66',         152, 296, init=('init', 0)),
+    Panel('2in66b',        152, 296, colors=BWR, planes=2),
+    Panel('2in66g',        184, 360, colors=BWYR, bpp=2),
+    Panel('2in7',          176, 264, gray4=True),
+    Panel('2in7_V2',       176, 264, gray4=True, fast=('init_Fast', 'display_Fast')),
+    Panel('2in7b',         176, 264, colors=BWR, planes=2),
+    Panel('2in7b_V2',      176, 264, colors=BWR, planes=2),
+    Panel('2in9',          128, 296, init=('init', Attr('lut_full_update'))),
+    Panel('2in9_V2',       128, 296, gray4=True, refresh_ms=3000, fast=('init_Fast', 'display')),
+    Panel('2in9b_V3',      128, 296, colors=BWR, planes=2),
+    Panel('2in9b_V4',      128, 296, colors=BWR, planes=2, fast=('init_Fast', 'display_Fast')),
+    Panel('2in9bc',        128, 296, colors=BWR, planes=2),
+    Panel('2in9d',         128, 296),
+    Panel('3in0g',         168, 400, colors=BWYR, bpp=2),
+    Panel('3in52',         240, 360, display='display_GC'),
+    Panel('3in7',          280, 480, gray4=True, init=('init', 1), display='display_1Gray'),
+    Panel('4in01f',        640, 400, colors=ACEP7, bpp=4),
+    Panel('4in2',          400, 300, gray4=True),
+    Panel('4in26',         800, 480, gray4=True, fast=('init_Fast', 'display_Fast')),
+    Panel('4in2_V2',       400, 300, gray4=True, fast=(('init_fast', Attr('Seconds_1_5S')), 'display_Fast')),
+    Panel('4in2b_V2',      400, 300, colors=BWR, planes=2),
+    Panel('4in2b_V2_old',  400, 300, colors=BWR, planes=2),
+    Panel('4in2bc',        400, 300, colors=BWR, planes=2),
+    Panel('4in37g',        512, 368, colors=BWYR, bpp=2),
+    Panel('5in65f',        600, 448, colors=ACEP7, bpp=4),
+    Panel('5in79',         792, 272, gray4=True, fast=('init_Fast', 'display_Fast')),
+    Panel('5in79b',        792, 272, colors=BWR, planes=2),
+    Panel('5in79g',        792, 272, colors=BWYR, bpp=2),
+    Panel('5in83',         600, 448, bpp=2),
+    Panel('5in83_V2',      648, 480, gray4=True, fast=('init_Fast', 'display_Fast')),
+    Panel('5in83b_V2',     648, 480, colors=BWR, planes=2),
+    Panel('5in83bc',       600, 448, colors=BWR, planes=2),
+    Panel('7in3e',         800, 480, colors=SPECTRA6, bpp=4),
+    Panel('7in3f',         800, 480, colors=ACEP7, bpp=4),
+    Panel('7in3g',         800, 480, colors=BWYR, bpp=2),
+    Panel('7in5',          640, 384, bpp=4),
+    Panel('7in5_HD',       880, 528),
+    Panel('7in5_V2',       800, 480, gray4=True, refresh_ms=3500, fast=('init_fast', 'display'), partial=('init_part', 'display_Partial')),
+    Panel('7in5_V2_old',   800, 480, refresh_ms=4000, fast=('init_fast', 'display'), partial=('init_part', 'display_Partial')),
+    Panel('7in5b_HD',      880, 528, colors=BWR, planes=2),
+    Panel('7in5b_V2',      800, 480, colors=BWR, planes=2, fast=('init_Fast', 'display')),
+    Panel('7in5b_V2_old',  800, 480, colors=BWR, planes=2),
+    Panel('7in5bc',        640, 384, colors=BWR, planes=2),
+)}
+
+
+def get(panel_id):
+    """The Panel for ``panel_id`` ('7in5_V2'; the 'epd' module prefix is accepted too)."""
+    panel = PANELS.get(panel_id[3:] if panel_id.startswith('epd') else panel_id)
+    if panel is None:
+        raise ValueError("unknown e-Paper panel %r, expected one of: %s" % (panel_id, ", ".join(PANELS)))
+    return panel
+
@@ -0,0 +1,63 @@
+# *****************************************************************************
+# * | File        :	  epdseq.py
+# * | Function    :   Declarative command sequences for the e-Paper drivers
+# * | Info        :
+# *----------------
+# * | Info        :   A sequence is a tuple of steps
+# * |             :   (command, payload, delay_ms, wait_busy); the last two
+# * |             :   are optional. run() sends each payload as one SPI write
+# * |             :   instead of one send_data() per byte. wait_busy is
+# * |             :   True for ReadBusy() or the name of the driver's own
+# * |             :   BUSY method ('ReadBusyH').
+# ******************************************************************************
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def step(command, payload=b'', delay_ms=0, busy=False):
+    """One sequence step; ``payload`` is packed to bytes up front."""
+    return (command, bytes(payload), delay_ms, busy)
+
+
+def sequence(*steps):
+    """Normalize steps given as (command[, payload[, delay_ms[, busy]]]) tuples."""
+    return tuple(step(*s) for s in steps)
+
+
+def run(epd, seq):
+    """Send ``seq`` through the driver's send_command/send_data2/ReadBusy.
+
+    Each command's parameters go out under a single CS low, which the
+    controllers accept the same as one byte per CS cycle. A step whose
+    wait_busy is a method name calls that method instead of ReadBusy.
+    """
+    for command, payload, delay_ms, busy in seq:
+        if command is not None:
+            epd.send_command(command)
+        if payload:
+            epd.send_data2(payload)
+        if delay_ms:
+            epd.config.delay_ms(delay_ms)
+        if busy is True:
+            epd.ReadBusy()
+        elif busy:
+            getattr(epd, busy)()
+
+
+def describe(seq):
+    """Readable dump of a sequence, one step per line (for logs and tests)."""
+    lines = []
+    for command, payload, delay_ms, busy in seq:
+        line = '--' if command is None else '0x%02X' % command
+        if payload:
+            line += ' ' + payload.hex(' ').upper()
+        if delay_ms:
+            line += ' delay %d ms' % delay_ms
+        if busy is True:
+            line += ' busy'
+        elif busy:
+            line += ' ' + busy
+        lines.append(line)
+    return '\n'.join(lines)
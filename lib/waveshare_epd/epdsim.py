@@ -0,0 +1,378 @@
+# *****************************************************************************
+# * | File        :	  epdsim.py
+# * | Function    :   Simulated e-Paper hardware for epdconfig
+# * | Info        :
+# *----------------
+# * | Info        :   Select it with EPD_PLATFORM=simulated. The pins and SPI
+# * |             :   bus are virtual: the command/data stream is recorded,
+# * |             :   BUSY is held for a per-panel refresh time and the RAM
+# * |             :   writes are decoded back into an image.
+# ******************************************************************************
+
+import collections
+import logging
+import os
+import threading
+import time
+
+from . import epdconfig
+
+logger = logging.getLogger(__name__)
+
+
+class RAMPlane:
+    """Controller RAM written through an address window, one bit per pixel."""
+
+    def __init__(self, linewidth, height, fill=0xFF):
+        self.linewidth = linewidth
+        self.height = height
+        self.data = bytearray([fill]) * (linewidth * height)
+
+    def write(self, data, window, cursor, ydir=1):
+        """Write ``data`` from ``cursor`` (byte column, row) inside ``window``.
+
+        ``window`` is (x0, x1, y0, y1) in byte columns and rows, inclusive.
+        Returns the cursor after the last byte.
+        """
+        x0, x1, y0, y1 = window
+        x, y = cursor
+        view = memoryview(data)
+        while len(view):
+            n = min(len(view), x1 - x + 1)
+            if 0 <= y < self.height:
+                offset = y * self.linewidth + x
+                self.data[offset:offset + n] = view[:n]
+            view = view[n:]
+            x += n
+            if x > x1:
+                x = x0
+                y += ydir
+                if y > y1 or y < y0:
+                    y = y0 if ydir > 0 else y1
+        return x, y
+
+
+class UC8179:
+    """UC81xx model (epd7in5_V2): DTM1/DTM2 planes, TRES, partial window.
+
+    BUSY is low while the controller works.
+    """
+
+    busy_level = 0
+
+    def __init__(self, timings):
+        self.timings = timings
+        self.linewidth, self.height = 100, 480
+        self.planes = {}
+        self.frame = None
+        self.refreshes = 0
+        self.reset()
+
+    def reset(self):
+        self.cmd = None
+        self.params = bytearray()
+        self.partial = False
+        self.window = None
+        self.fast = False
+        self.ddx_black = True
+
+    def plane(self, name):
+        plane = self.planes.get(name)
+        if plane is None or (plane.linewidth, plane.height) != (self.linewidth, self.height):
+            plane = self.planes[name] = RAMPlane(self.linewidth, self.height, 0x00)
+        return plane
+
+    def full_window(self):
+        return 0, self.linewidth - 1, 0, self.height - 1
+
+    def command(self, cmd):
+        self.cmd = cmd
+        self.params = bytearray()
+        if cmd in (0x10, 0x13):
+            window = self.window if self.partial and self.window else self.full_window()
+            self.cursor = (window[0], window[2])
+        elif cmd == 0x91:
+            self.partial = True
+        elif cmd == 0x92:
+            self.partial = False
+        elif cmd == 0x04:
+            return self.timings.get('power_on', 0)
+        elif cmd == 0x02:
+            return self.timings.get('power_off', 0)
+        elif cmd == 0x12:
+            return self.refresh()
+        return 0
+
+    def data(self, data):
+        if self.cmd in (0x10, 0x13):
+            window = self.window if self.partial and self.window else self.full_window()
+            self.cursor = self.plane(self.cmd).write(data, window, self.cursor)
+            return
+        self.params += data
+        p = self.params
+        if self.cmd == 0x61 and len(p) == 4:
+            self.linewidth = ((p[0] << 8 | p[1]) + 7) // 8
+            self.height = p[2] << 8 | p[3]
+        elif self.cmd == 0x90 and len(p) >= 8:
+            self.window = ((p[0] << 8 | p[1]) // 8, (p[2] << 8 | p[3]) // 8,
+                           p[4] << 8 | p[5], p[6] << 8 | p[7])
+        elif self.cmd == 0x50 and len(p) == 1:
+            # DDX[0]: with it set a 1 in DTM2 is a black pixel
+            self.ddx_black = bool(p[0] & 0x10)
+        elif self.cmd == 0xE0 and len(p) == 1:
+            self.fast = bool(p[0] & 0x02)
+
+    def refresh(self):
+        new = self.plane(0x13).data
+        if self.ddx_black:
+            new = new.translate(bytes(range(255, -1, -1)))
+        if self.partial and self.window and self.frame is not None:
+            # only the partial window is driven, the rest of the panel keeps its image
+            x0, x1, y0, y1 = self.window
+            frame = bytearray(self.frame[2])
+            for y in range(y0, min(y1 + 1, self.height)):
+                row = y * self.linewidth
+                frame[row + x0:row + x1 + 1] = new[row + x0:row + x1 + 1]
+            new = frame
+        self.frame = (self.linewidth * 8, self.height, bytes(new))
+        self.refreshes += 1
+        if self.partial:
+            return self.timings.get('partial', 0)
+        return self.timings.get('fast' if self.fast else 'full', 0)
+
+
+class SSD1680:
+    """SSD16xx model (epd2in13_V4, epd2in9_V2...): 0x24/0x26 RAM, X/Y windows.
+
+    BUSY is high while the controller works.
+    """
+
+    busy_level = 1
+    # 0x22 display update sequences that only run the partial waveform
+    PARTIAL_MODES = (0x0C, 0x0F, 0xCF, 0xFC, 0xFF)
+
+    def __init__(self, timings):
+        self.timings = timings
+        self.planes = {}
+        self.frame = None
+        self.refreshes = 0
+        self.size = None
+        self.reset()
+
+    def reset(self):
+        self.cmd = None
+        self.params = bytearray()
+        self.window = None
+        self.cursor = (0, 0)
+        self.entry_mode = 0x03
+        self.update_mode = 0xF7
+
+    def plane(self, name):
+        linewidth, height = self.size
+        plane = self.planes.get(name)
+        if plane is None or (plane.linewidth, plane.height) != (linewidth, height):
+            plane = self.planes[name] = RAMPlane(linewidth, height)
+        return plane
+
+    def command(self, cmd):
+        self.cmd = cmd
+        self.params = bytearray()
+        if cmd == 0x12:
+            self.reset()
+            self.cmd = cmd
+            return self.timings.get('reset', 0)
+        if cmd == 0x20:
+            return self.refresh()
+        return 0
+
+    def data(self, data):
+        if self.cmd in (0x24, 0x26):
+            if self.window is None:
+                logger.warning("simulated RAM write 0x%02X before a RAM window was set", self.cmd)
+                return
+            ydir = 1 if self.entry_mode & 0x02 else -1
+            self.cursor = self.plane(self.cmd).write(data, self.window, self.cursor, ydir)
+            return
+        self.params += data
+        p = self.params
+        if self.cmd == 0x44 and len(p) == 2:
+            self.window = (min(p[0], p[1]), max(p[0], p[1])) + (self.window[2:] if self.window else (0, 0))
+        elif self.cmd == 0x45 and len(p) == 4:
+            y0, y1 = p[0] | p[1] << 8, p[2] | p[3] << 8
+            x0, x1 = self.window[:2] if self.window else (0, 0)
+            self.window = (x0, x1, min(y0, y1), max(y0, y1))
+            # the first window set after reset is the whole panel
+            if self.size is None or x1 + 1 > self.size[0] or max(y0, y1) + 1 > self.size[1]:
+                self.size = (x1 + 1, max(y0, y1) + 1)
+        elif self.cmd == 0x4E and len(p) == 1:
+            self.cursor = (p[0], self.cursor[1])
+        elif self.cmd == 0x4F and len(p) == 2:
+            self.cursor = (self.cursor[0], p[0] | p[1] << 8)
+        elif self.cmd == 0x11 and len(p) == 1:
+            self.entry_mode = p[0]
+        elif self.cmd == 0x22 and len(p) == 1:
+            self.update_mode = p[0]
+
+    def refresh(self):
+        if self.size is not None:
+            linewidth, height = self.size
+            self.frame = (linewidth * 8, height, bytes(self.plane(0x24).data))
+            self.refreshes += 1
+        if self.update_mode in self.PARTIAL_MODES:
+            return self.timings.get('partial', 0)
+        if self.update_mode == 0xC7:
+            return self.timings.get('fast', 0)
+        return self.timings.get('full', 0)
+
+
+# Controller and BUSY times in seconds, from the panel datasheets
+SIM_PANELS = {
+    'epd7in5_V2': (UC8179, {'power_on': 0.08, 'power_off': 0.02, 'full': 3.5, 'fast': 1.5, 'partial': 0.5}),
+    'epd7in5_V2_old': (UC8179, {'power_on': 0.08, 'power_off': 0.02, 'full': 4.0, 'fast': 1.5, 'partial': 0.5}),
+    'epd2in13_V4': (SSD1680, {'reset': 0.01, 'full': 2.0, 'fast': 1.5, 'partial': 0.3}),
+    'epd2in13_V3': (SSD1680, {'reset': 0.01, 'full': 2.0, 'fast': 1.5, 'partial': 0.3}),
+    'epd2in9_V2': (SSD1680, {'reset': 0.01, 'full': 3.0, 'fast': 1.5, 'partial': 0.3}),
+}
+
+
+class Simulated:
+    # Pin definition
+    RST_PIN  = 17
+    DC_PIN   = 25
+    CS_PIN   = 8
+    BUSY_PIN = 24
+    PWR_PIN  = 18
+
+    def __init__(self, panel=None, time_scale=None, record_limit=4096, pins=None, spi_device=0):
+        """``panel`` is a SIM_PANELS key (EPD_SIM_PANEL, default epd7in5_V2).
+
+        BUSY times and delay_ms are multiplied by ``time_scale``
+        (EPD_SIM_TIME_SCALE, default 1.0); 0 runs as fast as the host allows.
+        At most ``record_limit`` commands are kept in ``stream``.
+        ``pins`` and ``spi_device`` are taken as on the Pi, so several
+        simulated panels can stand in for a multi-panel frame.
+        """
+        epdconfig.configure_pins(self, pins, spi_device)
+        self.panel = panel or os.environ.get('EPD_SIM_PANEL', 'epd7in5_V2')
+        if self.panel not in SIM_PANELS:
+            raise ValueError("EPD_SIM_PANEL must be one of: " + ", ".join(SIM_PANELS))
+        if time_scale is None:
+            time_scale = float(os.environ.get('EPD_SIM_TIME_SCALE', 1.0))
+        self.time_scale = time_scale
+        model, timings = SIM_PANELS[self.panel]
+        self.controller = model(timings)
+        self.pins = {self.RST_PIN: 1, self.DC_PIN: 0, self.CS_PIN: 1, self.PWR_PIN: 0}
+        self.busy_until = 0.0
+        self.opens = 0
+        self.closes = 0
+        self.stream = collections.deque(maxlen=record_limit)
+        self._lock = threading.Lock()
+        self.transport = epdconfig.SPITransport(self._spi_write, chunk_size=1 << 20)
+        self.busy_waiter = epdconfig.BusyWaiter(self._busy_level, self._wait_busy_edge,
+                                                watch_edge=self._watch_busy_edge)
+
+    def digital_write(self, pin, value):
+        if pin == self.RST_PIN and value == 0 and self.pins.get(pin):
+            self.controller.reset()
+            self.busy_until = 0.0
+        self.pins[pin] = value
+
+    def digital_read(self, pin):
+        if pin == self.BUSY_PIN:
+            return self._busy_level()
+        return self.pins.get(pin, 0)
+
+    def _busy_level(self):
+        level = self.controller.busy_level
+        return level if time.monotonic() < self.busy_until else 1 - level
+
+    def _wait_busy_edge(self, busy_level, timeout):
+        remaining = self.busy_until - time.monotonic()
+        if timeout is not None and remaining > timeout:
+            time.sleep(timeout)
+            return False
+        if remaining > 0:
+            time.sleep(remaining)
+        return True
+
+    def _watch_busy_edge(self, busy_level, callback):
+        timer = threading.Timer(max(0.0, self.busy_until - time.monotonic()), callback)
+        timer.daemon = True
+        timer.start()
+        return timer.cancel
+
+    def wait_busy(self, busy_level, timeout_ms=None):
+        return self.busy_waiter.wait(busy_level, timeout_ms)
+
+    def wait_busy_async(self, busy_level, timeout_ms=None):
+        return self.busy_waiter.wait_async(busy_level, timeout_ms)
+
+    def delay_ms(self, delaytime):
+        if self.time_scale:
+            time.sleep(delaytime * self.time_scale / 1000.0)
+
+    def _spi_write(self, chunk):
+        with self._lock:
+            if self.pins[self.DC_PIN]:
+                if not self.stream:
+                    self.stream.append([None, bytearray()])
+                self.stream[-1][1] += chunk
+                self.controller.data(chunk)
+                return
+            for cmd in bytes(chunk):
+                self.stream.append([cmd, bytearray()])
+                seconds = self.controller.command(cmd)
+                if seconds:
+                    self.busy_until = time.monotonic() + seconds * self.time_scale
+
+    def spi_writebyte(self, data):
+        self.transport.send(data)
+
+    def spi_writebyte2(self, data):
+        self.transport.send(data)
+
+    def DEV_SPI_write(self, data):
+        self.transport.send([data])
+
+    def DEV_SPI_nwrite(self, data):
+        self.transport.send(data)
+
+    def DEV_SPI_read(self):
+        # 0: the driver keeps its UC81xx command set (1 would select the SSD variant)
+        return 0
+
+    def module_init(self, cleanup=False):
+        # counted like SPI.open() on the Pi: every call opens another handle
+        self.opens += 1
+        self.pins[self.PWR_PIN] = 1
+        return 0
+
+    def module_exit(self, cleanup=False):
+        logger.debug("simulated panel power off")
+        self.closes += 1
+        self.pins[self.PWR_PIN] = 0
+
+    @property
+    def refreshes(self):
+        return self.controller.refreshes
+
+    def render(self):
+        """Return the last refreshed frame as a mode '1' PIL image, or None."""
+        from PIL import Image
+        if self.controller.frame is None:
+            return None
+        width, height, data = self.controller.frame
+        return Image.frombytes('1', (width, height), data)
+
+    def save_png(self, path):
+        image = self.render()
+        if image is None:
+            raise RuntimeError("the simulated panel has not been refreshed yet")
+        image.save(path, 'PNG')
+        return path
+
+    def clear_stream(self):
+        with self._lock:
+            self.stream.clear()
+
+### END OF FILE ###
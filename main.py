@@ -1,16 +1,25 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from database import Base, engine
 
 # Importujemy routery z obu serwisów
-from epaper_service import epaper_router
+from epaper_service import epaper_router, epaper_shutdown
 from hdmi_service import hdmi_router
 
 # Inicjalizacja bazy danych (tabele)
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="SmartFrame OS - Modular")
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    # Usypianie matryc czeka na ich wątki - poza pętlą zdarzeń
+    await asyncio.to_thread(epaper_shutdown)
+
+app = FastAPI(title="SmartFrame OS - Modular", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -0,0 +1,47 @@
+"""DisplayQueue: latest-wins frames and the bounded command queue."""
+import threading
+
+import pytest
+
+from epaper_queue import DisplayQueue, QueueFull
+
+
+@pytest.fixture
+def blocked_queue():
+    """A queue whose owner thread is stuck in a first job until the test releases it."""
+    queue = DisplayQueue(maxsize=2, name="test")
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    first = queue.submit(block, coalesce=False, label="block")
+    assert started.wait(5)
+    yield queue
+    release.set()
+    first.wait(5)
+
+
+def test_new_frame_supersedes_pending_frames(blocked_queue):
+    old = blocked_queue.submit(lambda: "old", label="frame")
+    sleep = blocked_queue.submit(lambda: "sleep", coalesce=False)
+    new = blocked_queue.submit(lambda: "new", label="frame")
+    assert old.state == "superseded"
+    assert old.wait(0)["by"] == new.id
+    assert [job.id for job in blocked_queue.pending] == [sleep.id, new.id]
+
+
+def test_full_queue_keeps_pending_frames(blocked_queue):
+    blocked_queue.maxsize = 3
+    frame = blocked_queue.submit(lambda: "frame", label="frame")
+    blocked_queue.submit(lambda: None, coalesce=False)
+    blocked_queue.submit(lambda: None, coalesce=False)
+    blocked_queue.maxsize = 2
+    with pytest.raises(QueueFull):
+        blocked_queue.submit(lambda: "new", label="frame")
+    # the rejected frame must not drop the one already queued
+    assert frame.state == "queued"
+    assert frame in blocked_queue.pending
+    assert blocked_queue.status()["superseded"] == 0
@@ -0,0 +1,47 @@
+"""AsyncEPD on the simulator: same frame as the blocking driver, config always restored."""
+import asyncio
+
+import pytest
+
+from lib.waveshare_epd import epd4in2b_V2, epd7in5_V2, epdsim
+from lib.waveshare_epd.epdasync import AsyncEPD
+
+
+def frame(epd):
+    buf = bytearray([0xFF]) * (epd.width // 8 * epd.height)
+    buf[:epd.width // 8 * 40] = bytes(epd.width // 8 * 40)
+    return bytes(buf)
+
+
+def test_replay_matches_blocking_driver():
+    blocking = epdsim.Simulated(time_scale=0)
+    epd = epd7in5_V2.EPD(blocking)
+    epd.init()
+    epd.display(frame(epd))
+    epd.sleep()
+
+    config = epdsim.Simulated(time_scale=0)
+    epd = epd7in5_V2.EPD(config)
+    panel = AsyncEPD(epd)
+
+    async def draw():
+        assert await panel.init() == 0
+        await panel.display(frame(epd))
+        await panel.sleep()
+
+    asyncio.run(draw())
+    assert epd.config is config
+    assert config.refreshes == blocking.refreshes == 1
+    assert config.render().tobytes() == blocking.render().tobytes()
+    assert list(config.stream) == list(blocking.stream)
+
+
+def test_config_restored_when_the_driver_raises():
+    config = epdsim.Simulated(time_scale=0)
+    epd = epd4in2b_V2.EPD(config)
+    panel = AsyncEPD(epd)
+    # this init reads the controller id over SPI, which a recording cannot answer
+    with pytest.raises(RuntimeError):
+        asyncio.run(panel.init())
+    assert epd.config is config
+    assert not config.stream
@@ -0,0 +1,169 @@
+"""epdbuffer packers vs the per-pixel loops the drivers used before them.
+
+Each reference below is the loop the drivers used before epdbuffer;
+the vectorized packer has to produce the same bytes for the landscape
+image and for the portrait one the drivers rotate.
+"""
+import numpy as np
+import pytest
+from PIL import Image
+
+from lib.waveshare_epd import epdbuffer
+
+PALETTE_4COLOR = ((0, 0, 0), (255, 255, 255), (255, 255, 0), (255, 0, 0))
+PALETTE_7COLOR = ((0, 0, 0), (255, 255, 255), (0, 255, 0), (0, 0, 255), (255, 0, 0), (255, 255, 0), (255, 128, 0))
+LAYOUTS = ("landscape", "portrait")
+
+
+def legacy_1bpp(image, width, height):
+    linewidth = (width + 7) // 8
+    buf = [0xFF] * (linewidth * height)
+    image_monocolor = image.convert('1')
+    imwidth, imheight = image_monocolor.size
+    pixels = image_monocolor.load()
+    if imwidth == width and imheight == height:
+        for y in range(imheight):
+            for x in range(imwidth):
+                if pixels[x, y] == 0:
+                    buf[int(x / 8) + y * linewidth] &= ~(0x80 >> (x % 8))
+    elif imwidth == height and imheight == width:
+        for y in range(imheight):
+            for x in range(imwidth):
+                newx = y
+                newy = height - x - 1
+                if pixels[x, y] == 0:
+                    buf[int(newx / 8) + newy * linewidth] &= ~(0x80 >> (y % 8))
+    return buf
+
+
+def legacy_4gray(image, width, height):
+    buf = [0xFF] * (int(width / 4) * height)
+    image_monocolor = image.convert('L')
+    imwidth, imheight = image_monocolor.size
+    pixels = image_monocolor.load()
+    i = 0
+    if imwidth == width and imheight == height:
+        for y in range(imheight):
+            for x in range(imwidth):
+                if pixels[x, y] == 0xC0:
+                    pixels[x, y] = 0x80
+                elif pixels[x, y] == 0x80:
+                    pixels[x, y] = 0x40
+                i = i + 1
+                if i % 4 == 0:
+                    buf[int((x + (y * width)) / 4)] = ((pixels[x-3, y] & 0xc0) | (pixels[x-2, y] & 0xc0) >> 2 | (pixels[x-1, y] & 0xc0) >> 4 | (pixels[x, y] & 0xc0) >> 6)
+    elif imwidth == height and imheight == width:
+        for x in range(imwidth):
+            for y in range(imheight):
+                newx = y
+                newy = height - x - 1
+                if pixels[x, y] == 0xC0:
+                    pixels[x, y] = 0x80
+                elif pixels[x, y] == 0x80:
+                    pixels[x, y] = 0x40
+                i = i + 1
+                if i % 4 == 0:
+                    buf[int((newx + (newy * width)) / 4)] = ((pixels[x, y-3] & 0xc0) | (pixels[x, y-2] & 0xc0) >> 2 | (pixels[x, y-1] & 0xc0) >> 4 | (pixels[x, y] & 0xc0) >> 6)
+    return buf
+
+
+def quantized(image, width, colors):
+    pal_image = Image.new("P", (1, 1))
+    pal_image.putpalette(sum(colors, ()) + (0, 0, 0) * (256 - len(colors)))
+    if image.size[0] != width:
+        image = image.rotate(90, expand=True)
+    return bytearray(image.convert("RGB").quantize(palette=pal_image).tobytes('raw'))
+
+
+def legacy_2bpp(image, width, height):
+    buf_4color = quantized(image, width, PALETTE_4COLOR)
+    Width = (width + 3) // 4
+    buf = [0x00] * (Width * height)
+    idx = 0
+    for j in range(height):
+        for i in range(Width):
+            if i == Width - 1 and width % 4:
+                buf[i + j * Width] = (buf_4color[idx] << 6) + (buf_4color[idx+1] << 4)
+                idx = idx + 2
+            else:
+                buf[i + j * Width] = (buf_4color[idx] << 6) + (buf_4color[idx+1] << 4) + (buf_4color[idx+2] << 2) + buf_4color[idx+3]
+                idx = idx + 4
+    return buf
+
+
+def legacy_4bpp(image, width, height):
+    buf_7color = quantized(image, width, PALETTE_7COLOR)
+    buf = [0x00] * int(width * height / 2)
+    idx = 0
+    for i in range(0, len(buf_7color), 2):
+        buf[idx] = (buf_7color[i] << 4) + buf_7color[i+1]
+        idx += 1
+    return buf
+
+
+def sized(width, height, layout):
+    return (width, height) if layout == "landscape" else (height, width)
+
+
+def noise(size, seed=0):
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, size[::-1], dtype=np.uint8), 'L')
+
+
+def gray_levels(size, seed=0):
+    rng = np.random.default_rng(seed)
+    levels = np.array([0x00, 0x40, 0x80, 0xC0, 0xFF], dtype=np.uint8)
+    return Image.fromarray(rng.choice(levels, size[::-1]), 'L')
+
+
+def rgb_noise(size, seed=0):
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, size[::-1] + (3,), dtype=np.uint8), 'RGB')
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+@pytest.mark.parametrize("width,height", [(200, 200), (122, 250), (128, 296)])
+def test_1bpp_matches_legacy(width, height, layout):
+    image = noise(sized(width, height, layout))
+    assert bytes(epdbuffer.getbuffer_1bpp(image, width, height)) == bytes(legacy_1bpp(image, width, height))
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+@pytest.mark.parametrize("width,height", [(128, 296), (176, 264)])
+def test_4gray_matches_legacy(width, height, layout):
+    image = gray_levels(sized(width, height, layout))
+    assert bytes(epdbuffer.getbuffer_4gray(image, width, height)) == bytes(legacy_4gray(image, width, height))
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+@pytest.mark.parametrize("width,height", [(168, 168), (122, 250), (184, 360)])
+def test_2bpp_matches_legacy(width, height, layout):
+    image = rgb_noise(sized(width, height, layout))
+    packed = epdbuffer.getbuffer_palette(image, width, height, PALETTE_4COLOR, bpp=2)
+    assert bytes(packed) == bytes(legacy_2bpp(image, width, height))
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+@pytest.mark.parametrize("width,height", [(600, 448), (640, 400)])
+def test_4bpp_matches_legacy(width, height, layout):
+    image = rgb_noise(sized(width, height, layout))
+    packed = epdbuffer.getbuffer_palette(image, width, height, PALETTE_7COLOR)
+    assert bytes(packed) == bytes(legacy_4bpp(image, width, height))
+
+
+def legacy_gray4_planes(buf):
+    high, low = [], []
+    for i in range(0, len(buf), 2):
+        pair = buf[i] << 8 | buf[i + 1]
+        high.append(sum(((pair >> (15 - 2 * k)) & 1) << (7 - k) for k in range(8)))
+        low.append(sum(((pair >> (14 - 2 * k)) & 1) << (7 - k) for k in range(8)))
+    return bytes(high), bytes(low)
+
+
+@pytest.mark.parametrize("kind", (bytes, bytearray, list))
+def test_gray4_planes_accepts_bytes(kind):
+    packed = epdbuffer.getbuffer_4gray(gray_levels((176, 264)), 176, 264)
+    high, low = epdbuffer.gray4_planes(kind(packed))
+    assert (bytes(high), bytes(low)) == legacy_gray4_planes(bytes(packed))
+    high, low = epdbuffer.gray4_planes(kind(packed), invert=True)
+    assert bytes(high) == epdbuffer.inverted(legacy_gray4_planes(bytes(packed))[0])
@@ -0,0 +1,70 @@
+"""Every registered panel refreshes through PanelSession on the simulator.
+
+The session only knows a driver through its epdregistry.Panel call specs,
+so a wrong spec (missing init argument, a display that does not exist,
+a fast or partial mode the driver lacks) fails here, off the Pi.
+"""
+import pytest
+
+from lib.waveshare_epd import epdregistry, epdsim
+from epaper_session import PanelSession, RefreshPolicy
+
+
+def spec_names(spec):
+    if isinstance(spec, str):
+        return [spec]
+    return [spec[0]] + [arg for arg in spec[1:] if isinstance(arg, epdregistry.Attr)]
+
+
+@pytest.mark.parametrize("panel", epdregistry.PANELS.values(), ids=lambda panel: panel.id)
+def test_call_specs_exist(panel):
+    specs = [panel.init, panel.display, panel.sleep, *(panel.fast or ()), *(panel.partial or ())]
+    epd = panel.create(epdsim.Simulated(time_scale=0))
+    for spec in specs:
+        for name in spec_names(spec):
+            assert hasattr(epd, name), "%s has no %s" % (panel.module, name)
+
+
+@pytest.mark.parametrize("panel", epdregistry.PANELS.values(), ids=lambda panel: panel.id)
+def test_refresh_on_simulator(panel):
+    config = epdsim.Simulated(time_scale=0)
+    session = PanelSession(panel.create(config), idle_timeout=3600)
+    try:
+        white = bytes([0xFF]) * panel.bytes_per_frame
+        assert session.refresh(white)["mode"] == "full"
+
+        changed = bytearray(white)
+        changed[:64] = bytes(64)
+        sent = bytes(changed)
+        expected = "partial" if panel.partial else "fast" if panel.fast else "full"
+        assert session.refresh(changed)["mode"] == expected
+        assert config.stream
+        # every driver's BUSY waits go through EPDBase.wait_busy, so they are timed
+        assert session.epd.stats()["busy"]["count"] > 0
+        # the drivers get slices of the session's buffer and must not write into them
+        assert changed == sent
+    finally:
+        session.sleep_now()
+    assert session.sleeps == 1
+
+
+@pytest.mark.parametrize("panel_id", ["7in5_V2", "2in13_V4", "7in5b_V2"])
+def test_mode_switches_keep_one_spi_handle(panel_id):
+    panel = epdregistry.get(panel_id)
+    config = epdsim.Simulated(time_scale=0)
+    # fast_budget=1 and ghosting_budget=1 make the policy change mode on every frame
+    policy = RefreshPolicy(fast_budget=1, ghosting_budget=1)
+    session = PanelSession(panel.create(config), idle_timeout=3600, policy=policy)
+    frame = bytearray([0xFF]) * panel.bytes_per_frame
+    modes = []
+    for i in range(6):
+        frame[i] = 0x00
+        modes.append(session.refresh(frame)["mode"])
+        assert config.opens - config.closes == 1
+    assert session.inits == len(modes) > 1
+    session.sleep_now()
+    assert config.opens == config.closes
+    # the next wake opens the handle again
+    frame[10] = 0x00
+    session.refresh(frame)
+    assert config.opens - config.closes == 1